@@ -0,0 +1,131 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from backend.config import settings
+
+SYSTEM_PROMPT = "You are a helpful campus admin assistant. Help with student management, campus information, and analytics."
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Lines of tool output the rule-based path writes, e.g. "- Alice (S001) - CS"
+_LISTING_LINE = re.compile(r"^\s*-\s")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate: words and punctuation, with long words split roughly every 4 characters."""
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_PATTERN.findall(text or ""))
+
+class ContextBuilder:
+    """Assemble chat messages for the LLM within a token budget.
+
+    The newest turns are kept verbatim as long as they fit; older ones are
+    dropped and replaced by a one-line note. Bulky messages, such as student
+    listings saved from tool output, are collapsed to a summary before they
+    are counted. Compacted messages are cached by content hash, and each
+    session remembers the hashes of its last history and what was kept of it,
+    so the next build only compacts and counts the turns added since.
+    """
+
+    def __init__(self, token_budget: int, max_message_tokens: int, cache_size: int = 5000):
+        self.token_budget = token_budget
+        self.max_message_tokens = max_message_tokens
+        self.cache_size = cache_size
+        self._compacted: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        # Per session: budget, message hashes and the (message, tokens) suffix kept last time
+        self._prefixes: "OrderedDict[str, Tuple[int, Tuple[bytes, ...], List[Tuple[Dict[str, str], int]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.system_tokens = estimate_tokens(SYSTEM_PROMPT)
+
+    def _compact(self, content: str) -> str:
+        lines = content.splitlines()
+        listing = [line for line in lines if _LISTING_LINE.match(line)]
+        if len(listing) > 5:
+            header = next((line for line in lines if not _LISTING_LINE.match(line)), "").strip()
+            preview = "\n".join(listing[:3])
+            return f"{header}\n{preview}\n[... {len(listing) - 3} more items omitted]".strip()
+        if estimate_tokens(content) > self.max_message_tokens:
+            # Roughly 4 characters per token keeps the head of the message within the limit
+            return content[:self.max_message_tokens * 4].rstrip() + " [... truncated]"
+        return content
+
+    def compacted(self, content: str) -> Tuple[str, int]:
+        """Return (compacted content, token estimate) for a history message, cached by content."""
+        key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+        with self._lock:
+            cached = self._compacted.get(key)
+            if cached is not None:
+                self._compacted.move_to_end(key)
+                return cached
+        text = self._compact(content)
+        result = (text, estimate_tokens(text) + 4)  # plus per-message framing overhead
+        with self._lock:
+            self._compacted[key] = result
+            while len(self._compacted) > self.cache_size:
+                self._compacted.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _message_hash(message: Dict[str, str]) -> bytes:
+        return hashlib.blake2b(f"{message['role']}:{message['content']}".encode("utf-8"), digest_size=16).digest()
+
+    def _history_messages(self, session_id: str, history: List[Dict[str, str]], budget: int):
+        hashes = tuple(self._message_hash(m) for m in history)
+        with self._lock:
+            cached = self._prefixes.get(session_id)
+            if cached is not None:
+                self._prefixes.move_to_end(session_id)
+
+        # Line the new history up with the last one built for this session: usually it is the
+        # same turns, minus a few that slid out of the window, plus the latest exchange
+        reusable: List[Tuple[Dict[str, str], int]] = []
+        overlap = 0
+        if cached is not None and cached[0] == budget:
+            old_hashes, old_kept = cached[1], cached[2]
+            shift = next(s for s in range(len(old_hashes) + 1)
+                         if len(old_hashes) - s <= len(hashes) and old_hashes[s:] == hashes[:len(old_hashes) - s])
+            overlap = len(old_hashes) - shift
+            first_kept = len(old_hashes) - len(old_kept)
+            # Newer turns only push older ones out, so turns dropped last time cannot fit now
+            reusable = old_kept[max(shift - first_kept, 0):]
+
+        kept: List[Tuple[Dict[str, str], int]] = []
+        used = 0
+        for message in reversed(history[overlap:]):
+            content, tokens = self.compacted(message["content"])
+            if used + tokens > budget:
+                break
+            kept.append(({"role": message["role"], "content": content}, tokens))
+            used += tokens
+        else:
+            for entry in reversed(reusable):
+                if used + entry[1] > budget:
+                    break
+                kept.append(entry)
+                used += entry[1]
+        kept.reverse()
+
+        with self._lock:
+            self._prefixes[session_id] = (budget, hashes, kept)
+            while len(self._prefixes) > self.cache_size:
+                self._prefixes.popitem(last=False)
+        messages = [message for message, _ in kept]
+        dropped = len(history) - len(kept)
+        if dropped:
+            messages.insert(0, {"role": "system", "content": f"({dropped} earlier messages omitted to fit the context window)"})
+        return messages, used
+
+    def build(self, session_id: str, history: List[Dict[str, str]], user_message: str) -> List[Dict[str, str]]:
+        """Build the message list for a completion.
+
+        ``history`` is oldest first. The system prompt and the new user
+        message are always included; history fills whatever budget remains.
+        """
+        remaining = self.token_budget - self.system_tokens - estimate_tokens(user_message) - 4
+        history_messages, _ = self._history_messages(session_id, history, max(remaining, 0))
+        return (
+            [{"role": "system", "content": SYSTEM_PROMPT}]
+            + history_messages
+            + [{"role": "user", "content": user_message}]
+        )
+
+context_builder = ContextBuilder(settings.CONTEXT_TOKEN_BUDGET, settings.CONTEXT_MAX_MESSAGE_TOKENS)
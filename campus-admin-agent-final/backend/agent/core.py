@@ -1,102 +1,112 @@
+import asyncio
 import json
-from typing import Dict, List, Any, Generator, AsyncGenerator
-from backend.models.database import SessionLocal, ConversationMemory
-from backend.tools import get_tools
+import threading
+import time
+from typing import Dict, List, Any, Generator, AsyncGenerator, Optional
+from backend.agent.memory import memory_store
+from backend.agent.context import context_builder
+from backend.agent.streaming import iterate_in_executor, END_OF_STREAM
+from backend.agent.tool_calling import execute_tool_calls, assistant_tool_call_message, log_tool_call
+from backend.models.schemas import build_tool_schemas
+from backend.tools import get_tools, iter_students, tool_executor, execute_tool, execute_tool_async
+from backend.tools.cache import response_cache, normalize_prompt
+from backend.tools.student_management import DEFAULT_PAGE_SIZE
+from backend.instrumentation import Timer, MEMORY_DURATION
 from backend.config import settings
 
+# Tools the LLM is not offered: bulk payloads do not belong in a chat turn, and one mistaken
+# call to a delete or bulk write could wipe or rewrite the student table; use the API for those
+LLM_EXCLUDED_TOOLS = {"import_students", "delete_student", "bulk_update_students", "bulk_delete_students"}
+
 class CampusAdminAgent:
     def __init__(self):
         self.tools = get_tools()
-        self.groq_client = None
-        
-        # Initialize Groq client with error handling
+        self.llm_tools = {name: func for name, func in self.tools.items() if name not in LLM_EXCLUDED_TOOLS}
+        self.tool_schemas = build_tool_schemas(self.llm_tools)
+        # The Groq SDK is slow to import, so the client is created on first use (or by warm_up)
+        self._llm = None
+        self._llm_enabled = bool(settings.GROQ_API_KEY and settings.GROQ_API_KEY != "GROQ_API_KEY")
+        self._llm_lock = threading.Lock()
+        if not self._llm_enabled:
+            print("⚠️  GROQ_API_KEY not found or invalid, using rule-based responses")
+
+    @property
+    def llm(self):
+        if self._llm is None and self._llm_enabled:
+            with self._llm_lock:
+                if self._llm is None and self._llm_enabled:
+                    self._llm = self._create_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, client):
+        self._llm = client
+        self._llm_enabled = client is not None
+
+    def _create_llm(self):
+        # Initialize the shared Groq client with error handling
         try:
-            import groq
-            
-            if settings.GROQ_API_KEY and settings.GROQ_API_KEY != "GROQ_API_KEY":
-                # Initialize without any extra parameters and handle proxies issue
-                try:
-                    # Clear any proxy environment variables that might interfere
-                    import os
-                    proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'ALL_PROXY', 'http_proxy', 'https_proxy', 'all_proxy']
-                    for var in proxy_vars:
-                        os.environ.pop(var, None)
-                    
-                    # Initialize Groq client with minimal configuration
-                    self.groq_client = groq.AsyncGroq(
-                        api_key=settings.GROQ_API_KEY,
-                        # Explicitly set to avoid proxy issues
-                        http_client=groq.HttpxAsyncClient(proxies=None)
-                    )
-                    print("✅ Groq client initialized successfully")
-                except Exception as e:
-                    print(f"⚠️  Groq client configuration error: {e}")
-                    self.groq_client = None
-            else:
-                print("⚠️  GROQ_API_KEY not found or invalid, using rule-based responses")
-                self.groq_client = None
-            
+            from backend.agent.llm import LLMClient
+            client = LLMClient(api_key=settings.GROQ_API_KEY)
+            print("✅ Groq client initialized successfully")
+            return client
         except ImportError:
             print("⚠️  Groq package not installed, using rule-based responses")
         except Exception as e:
             print(f"⚠️  Failed to initialize Groq client: {e}, using rule-based responses")
-            self.groq_client = None
+        self._llm_enabled = False
+        return None
+
+    def warm_up(self) -> bool:
+        """Create the LLM client ahead of the first chat; returns whether one is available."""
+        return self.llm is not None
+
+    def llm_metrics(self) -> Optional[Dict[str, int]]:
+        """Client metrics without forcing the client to be created."""
+        return self._llm.metrics() if self._llm is not None else None
+
+    async def aclose(self):
+        if self._llm:
+            await self._llm.aclose()
     
     def save_memory(self, session_id: str, role: str, message: str):
-        db = SessionLocal()
         try:
-            mem = ConversationMemory(session_id=session_id, role=role, message=message)
-            db.add(mem)
-            db.commit()
+            with Timer(MEMORY_DURATION, "save"):
+                memory_store.save(session_id, role, message)
         except Exception as e:
             print(f"Error saving memory: {e}")
-        finally:
-            db.close()
 
     def load_memory(self, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
-        db = SessionLocal()
         try:
-            memories = db.query(ConversationMemory).filter(
-                ConversationMemory.session_id == session_id
-            ).order_by(ConversationMemory.created_at.desc()).limit(limit).all()
-            
-            return [{"role": mem.role, "content": mem.message} for mem in memories]
+            with Timer(MEMORY_DURATION, "load"):
+                return memory_store.load(session_id, limit)
         except Exception as e:
             print(f"Error loading memory: {e}")
             return []
-        finally:
-            db.close()
+
+    def _build_messages(self, session_id: str, history: List[Dict[str, str]], user_message: str) -> List[Dict[str, str]]:
+        """Turn newest-first memory into a token-budgeted prompt ending with ``user_message``."""
+        history = list(reversed(history))
+        # handle_message saves the user turn before the LLM call, so it may already be in history
+        if history and history[-1] == {"role": "user", "content": user_message}:
+            history.pop()
+        return context_builder.build(session_id, history, user_message)
 
     def handle_message(self, session_id: str, user_message: str) -> str:
         self.save_memory(session_id, "user", user_message)
         
-        if self.groq_client:
+        if self.llm:
             return self._handle_with_groq(session_id, user_message)
         else:
             return self._handle_rule_based(session_id, user_message)
 
     def _handle_with_groq(self, session_id: str, user_message: str) -> str:
+        """Blocking LLM reply for callers outside the event loop; async code should use async_handle_message."""
         try:
-            history = self.load_memory(session_id)
-            
-            messages = [
-                {"role": "system", "content": "You are a helpful campus admin assistant. Help with student management, campus information, and analytics."}
-            ]
+            history = self.load_memory(session_id, settings.MEMORY_HISTORY_SIZE)
+            messages = self._build_messages(session_id, history, user_message)
             
-            for msg in reversed(history):
-                messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            messages.append({"role": "user", "content": user_message})
-            
-            import asyncio
-            response = asyncio.run(self.groq_client.chat.completions.create(
-                model=settings.AGENT_MODEL,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=1024
-            ))
-            
-            assistant_response = response.choices[0].message.content
+            assistant_response = self._run_blocking(self._collect(self._llm_reply(messages, session_id)))
             self.save_memory(session_id, "assistant", assistant_response)
             return assistant_response
             
@@ -104,34 +114,203 @@ class CampusAdminAgent:
             print(f"Groq API error: {e}")
             return self._handle_rule_based(session_id, user_message)
 
-    def _handle_rule_based(self, session_id: str, user_message: str) -> str:
-        text = user_message.lower()
+    async def async_handle_message(self, session_id: str, user_message: str) -> str:
+        """Non-blocking handle_message: DB work runs on the tool executor and the LLM call is awaited."""
+        await tool_executor.run(self.save_memory, session_id, "user", user_message)
         
-        if "add student" in text:
-            return "Please use the /students endpoint to add students with JSON data"
-        elif "how many students" in text:
-            total = self.tools["get_total_students"]()
-            response = f"There are {total} students in the system."
-            self.save_memory(session_id, "assistant", response)
-            return response
-        elif "list students" in text:
-            result = self.tools["list_students"]()
+        if self.llm:
+            try:
+                history = await tool_executor.run(self.load_memory, session_id, settings.MEMORY_HISTORY_SIZE)
+                messages = self._build_messages(session_id, history, user_message)
+                assistant_response = await self._collect(self._llm_reply(messages, session_id))
+                await tool_executor.run(self.save_memory, session_id, "assistant", assistant_response)
+                return assistant_response
+            except Exception as e:
+                print(f"Groq API error: {e}")
+        
+        return await self._async_rule_based(session_id, user_message)
+
+    def _run_blocking(self, coro):
+        """Run an LLM coroutine from synchronous code.
+
+        If the server's loop is running in another thread the coroutine goes
+        there, sharing its pooled client and concurrency bound; otherwise it
+        gets a private loop whose client is closed before that loop ends.
+        """
+        loop = self.llm.main_loop
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if loop is not None and loop.is_running() and loop is not current:
+            return asyncio.run_coroutine_threadsafe(coro, loop).result()
+        return asyncio.run(self._closing_llm(coro))
+
+    async def _closing_llm(self, coro):
+        try:
+            return await coro
+        finally:
+            await self.llm.aclose()
+
+    @staticmethod
+    async def _collect(chunks: AsyncGenerator[str, None]) -> str:
+        return "".join([chunk async for chunk in chunks])
+
+    async def _llm_reply(self, messages: List[Dict[str, Any]], session_id: str = None) -> AsyncGenerator[str, None]:
+        """Yield the model's reply, running the tools it calls along the way.
+
+        Every tool call in a model turn runs concurrently. The loop is capped
+        at AGENT_MAX_STEPS model calls and AGENT_TIME_BUDGET seconds; the last
+        allowed call is made without tools so the model has to answer.
+        """
+        messages = list(messages)
+        deadline = time.monotonic() + settings.AGENT_TIME_BUDGET
+        for step in range(settings.AGENT_MAX_STEPS):
+            final_step = step == settings.AGENT_MAX_STEPS - 1 or time.monotonic() >= deadline
+            content, tool_calls = [], []
+            async for event in self.llm.stream_chat(messages, tools=None if final_step else self.tool_schemas):
+                if "content" in event:
+                    content.append(event["content"])
+                    yield event["content"]
+                else:
+                    tool_calls = event["tool_calls"]
+            if not tool_calls:
+                return
+            messages.append(assistant_tool_call_message("".join(content), tool_calls))
+            messages.extend(await execute_tool_calls(
+                tool_calls, self.llm_tools, timeout=max(deadline - time.monotonic(), 0.1), session_id=session_id
+            ))
+
+    def _match_intents(self, text: str) -> List[str]:
+        """Tools a rule-based message asks for; compound questions can match several."""
+        intents = []
+        if "how many students" in text:
+            intents.append("get_total_students")
+        if "list students" in text:
+            intents.append("list_students")
+        if "department" in text and "students" in text:
+            intents.append("get_students_by_department")
+        return intents
+
+    @staticmethod
+    def _student_lines(students: List[Dict[str, Any]]) -> str:
+        return "".join(f"\n- {s['name']} ({s['student_id']}) - {s['department']}" for s in students)
+
+    @staticmethod
+    def _more_students_note(shown: int, next_after: Optional[int]) -> str:
+        """Tells the reader a listing stopped at one page, and how to fetch the rest."""
+        if next_after is None:
+            return ""
+        return f"\n\nShowing the first {shown} students; use GET /students?after={next_after} for the rest."
+
+    def _format_result(self, tool_name: str, result: Any) -> str:
+        if tool_name == "get_total_students":
+            return f"There are {result} students in the system."
+        if tool_name == "list_students":
             if "error" in result:
                 return f"Error: {result['error']}"
             students = result["students"]
-            response = "Students:\n" + "\n".join([f"- {s['name']} ({s['student_id']}) - {s['department']}" for s in students])
-            self.save_memory(session_id, "assistant", response)
-            return response
-        elif "department" in text and "students" in text:
-            dept_data = self.tools["get_students_by_department"]()
-            response = "Students by department:\n" + "\n".join([f"- {dept}: {count} students" for dept, count in dept_data.items()])
-            self.save_memory(session_id, "assistant", response)
-            return response
+            return "Students:" + self._student_lines(students) + self._more_students_note(len(students), result["next_after"])
+        return "Students by department:\n" + "\n".join([f"- {dept}: {count} students" for dept, count in result.items()])
+
+    @staticmethod
+    def _log_intents(session_id: str, intents: List[str], results: List[Any]):
+        for name, result in zip(intents, results):
+            log_tool_call(session_id, name, {}, result)
+
+    def _rule_based_response(self, user_message: str, intents: List[str], results: List[Any]) -> str:
+        if not intents:
+            return f"I received: '{user_message}'. I can help with student management, analytics, and campus information."
+        return "\n\n".join(self._format_result(name, result) for name, result in zip(intents, results))
+
+    def _handle_rule_based(self, session_id: str, user_message: str) -> str:
+        # Normalized text is also the response cache key, so equal keys always match the same intents
+        text = normalize_prompt(user_message)
         
-        response = f"I received: '{user_message}'. I can help with student management, analytics, and campus information."
+        if "add student" in text:
+            return "Please use the /students endpoint to add students with JSON data"
+        
+        cache_key, generation = text, response_cache.generation()
+        response = response_cache.get(cache_key) if settings.RESPONSE_CACHE_ENABLED else None
+        if response is None:
+            intents = self._match_intents(text)
+            results = [execute_tool(name) for name in intents]
+            self._log_intents(session_id, intents, results)
+            response = self._rule_based_response(user_message, intents, results)
+            # The fallback reply echoes the exact message, so only tool-backed replies are shared
+            if settings.RESPONSE_CACHE_ENABLED and intents:
+                response_cache.put(cache_key, response, generation)
         self.save_memory(session_id, "assistant", response)
         return response
 
+    async def _async_rule_based(self, session_id: str, user_message: str) -> str:
+        """_handle_rule_based with the matched tools run concurrently."""
+        # Normalized text is also the response cache key, so equal keys always match the same intents
+        text = normalize_prompt(user_message)
+        
+        if "add student" in text:
+            return "Please use the /students endpoint to add students with JSON data"
+        
+        cache_key, generation = text, response_cache.generation()
+        response = response_cache.get(cache_key) if settings.RESPONSE_CACHE_ENABLED else None
+        if response is None:
+            intents = self._match_intents(text)
+            results = await asyncio.gather(*(execute_tool_async(name) for name in intents))
+            self._log_intents(session_id, intents, results)
+            response = self._rule_based_response(user_message, intents, results)
+            # The fallback reply echoes the exact message, so only tool-backed replies are shared
+            if settings.RESPONSE_CACHE_ENABLED and intents:
+                response_cache.put(cache_key, response, generation)
+        await tool_executor.run(self.save_memory, session_id, "assistant", response)
+        return response
+
+    async def _stream_rule_based(self, session_id: str, user_message: str, save_user: bool = True) -> AsyncGenerator[str, None]:
+        """Rule-based replies as a stream; student listings are sent as rows are read from the database.
+
+        The text matches what ``_async_rule_based`` returns for the same message.
+        """
+        if save_user:
+            await tool_executor.run(self.save_memory, session_id, "user", user_message)
+
+        text = normalize_prompt(user_message)
+        if "list students" in text and "add student" not in text:
+            intents = self._match_intents(text)
+            others = [name for name in intents if name != "list_students"]
+            results = await asyncio.gather(*(execute_tool_async(name) for name in others))
+            self._log_intents(session_id, others, results)
+            formatted = dict(zip(others, (self._format_result(name, result) for name, result in zip(others, results))))
+            # Keep the reply's sections in intent order, as the non-streaming reply has them
+            listed_at = intents.index("list_students")
+            parts = [formatted[name] + "\n\n" for name in intents[:listed_at]]
+            parts.append("Students:")
+            for part in parts:
+                yield part
+            # The same first page list_students returns to /chat, sent as its rows are read
+            shown, last_id, more = 0, None, False
+            async for batch in iterate_in_executor(iter_students(batch_size=DEFAULT_PAGE_SIZE + 1)):
+                if shown == DEFAULT_PAGE_SIZE:
+                    more = True
+                    break
+                page = batch[:DEFAULT_PAGE_SIZE - shown]
+                shown, last_id = shown + len(page), page[-1]["id"]
+                lines = self._student_lines(page)
+                parts.append(lines)
+                yield lines
+                if len(batch) > len(page):
+                    more = True
+                    break
+            tail = self._more_students_note(shown, last_id if more else None)
+            tail += "".join("\n\n" + formatted[name] for name in intents[listed_at + 1:])
+            if tail:
+                parts.append(tail)
+                yield tail
+            await tool_executor.run(self.save_memory, session_id, "assistant", "".join(parts))
+        else:
+            response = await self._async_rule_based(session_id, user_message)
+            for word in response.split():
+                yield word + " "
+        yield END_OF_STREAM
+
     def stream_handle_message(self, session_id: str, user_message: str) -> Generator[str, None, None]:
         full_response = self.handle_message(session_id, user_message)
         words = full_response.split()
@@ -140,45 +319,25 @@ class CampusAdminAgent:
         yield "__END__"
 
     async def async_stream_handle_message(self, session_id: str, user_message: str) -> AsyncGenerator[str, None]:
-        if not self.groq_client:
-            for chunk in self.stream_handle_message(session_id, user_message):
+        if not self.llm:
+            async for chunk in self._stream_rule_based(session_id, user_message):
                 yield chunk
             return
         
         try:
-            history = self.load_memory(session_id)
-            messages = [
-                {"role": "system", "content": "You are a helpful campus admin assistant. Help with student management, campus information, and analytics."}
-            ]
-            
-            for msg in reversed(history):
-                messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            messages.append({"role": "user", "content": user_message})
-            self.save_memory(session_id, "user", user_message)
+            history = await tool_executor.run(self.load_memory, session_id, settings.MEMORY_HISTORY_SIZE)
+            messages = self._build_messages(session_id, history, user_message)
+            await tool_executor.run(self.save_memory, session_id, "user", user_message)
             
             full_response = ""
-            stream = await self.groq_client.chat.completions.create(
-                model=settings.AGENT_MODEL,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=1024,
-                stream=True
-            )
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    yield content
+            async for content in self._llm_reply(messages, session_id):
+                full_response += content
+                yield content
             
-            self.save_memory(session_id, "assistant", full_response)
+            await tool_executor.run(self.save_memory, session_id, "assistant", full_response)
             yield "__END__"
             
         except Exception as e:
             print(f"Groq streaming error: {e}")
-            fallback_response = self._handle_rule_based(session_id, user_message)
-            words = fallback_response.split()
-            for word in words:
-                yield word + " "
-            yield "__END__"
\ No newline at end of file
+            async for chunk in self._stream_rule_based(session_id, user_message, save_user=False):
+                yield chunk
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Local stand-in for the Groq chat completions API.
+
+Serves ``POST /openai/v1/chat/completions`` in the OpenAI-compatible shape the
+``groq`` SDK expects, streaming or not, with configurable latency, so the LLM
+path can be exercised and load-tested without network access or an API key.
+When tools are offered, it calls each one whose name appears in the user's
+message and then echoes the tool results back as its answer.
+
+Run it as a server and point the app at it::
+
+    python -m backend.agent.fake_groq --port 8001
+    GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8001 uvicorn backend.main:app
+
+or use it in-process by passing ``httpx.ASGITransport(app=create_app())`` as
+the ``transport`` of ``LLMClient``.
+"""
+import asyncio
+import json
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+def create_app(first_token_delay: float = 0.05, token_delay: float = 0.005,
+               reply: str = "This is a canned reply from the local fake Groq server.") -> FastAPI:
+    """Build the fake API.
+
+    ``first_token_delay`` is the time before the first token (the whole
+    response for non-streaming calls also waits for every token), and
+    ``token_delay`` the gap between streamed tokens.
+    """
+    app = FastAPI(title="Fake Groq API")
+    app.state.requests = 0
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fake-model")
+        messages = body.get("messages", [])
+        last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        tool_calls = []
+        if messages and messages[-1].get("role") == "tool":
+            results = "; ".join(f"{m.get('name')}: {m.get('content')}" for m in messages if m.get("role") == "tool")
+            tokens = f"Tool results: {results}".split(" ")
+        else:
+            tokens = f"{reply} You said: {last_user}".split(" ")
+            # Call every offered tool the user names verbatim, e.g. "use get_total_students"
+            tool_calls = [
+                {"id": f"call_{i}", "type": "function",
+                 "function": {"name": tool["function"]["name"], "arguments": "{}"}}
+                for i, tool in enumerate(body.get("tools") or [])
+                if tool["function"]["name"] in last_user
+            ]
+
+        if tool_calls:
+            await asyncio.sleep(first_token_delay)
+            if not body.get("stream"):
+                return JSONResponse({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": None, "tool_calls": tool_calls},
+                        "finish_reason": "tool_calls",
+                    }],
+                })
+
+            async def tool_call_events():
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"role": "assistant", "tool_calls": [dict(call, index=i) for i, call in enumerate(tool_calls)]},
+                        "finish_reason": "tool_calls",
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(tool_call_events(), media_type="text/event-stream")
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay + token_delay * len(tokens))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+
+        async def events():
+            await asyncio.sleep(first_token_delay)
+            for i, token in enumerate(tokens):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": token if i == 0 else " " + token},
+                        "finish_reason": None,
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_delay)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local fake Groq API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.first_token_delay, args.token_delay), host=args.host, port=args.port)
@@ -0,0 +1,231 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import groq
+import httpx
+from backend.instrumentation import (
+    LLM_REQUEST_DURATION, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS_PER_SECOND, LLM_TOKENS
+)
+from backend.config import settings
+
+# Errors worth retrying: the request may well succeed a moment later
+RETRYABLE_ERRORS = (
+    groq.APIConnectionError,
+    groq.APITimeoutError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+class LLMClient:
+    """Shared async Groq client for one worker.
+
+    Keeps one pooled HTTP client alive for the life of the process instead of
+    connecting per request, caps concurrent completions with a semaphore, and
+    retries transient failures with exponential backoff plus jitter. An HTTP
+    client and semaphore can only be used on the event loop that created them,
+    so each loop gets its own pair; ``aclose`` closes the calling loop's client
+    and must be awaited before a short-lived loop (e.g. ``asyncio.run``) ends.
+    """
+
+    def __init__(self, api_key: str, model: str = settings.AGENT_MODEL,
+                 base_url: Optional[str] = settings.GROQ_BASE_URL or None,
+                 timeout: float = settings.LLM_TIMEOUT,
+                 max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+                 max_retries: int = settings.LLM_MAX_RETRIES,
+                 max_connections: int = settings.LLM_MAX_CONNECTIONS,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.transport = transport
+        self._clients: Dict[asyncio.AbstractEventLoop, Tuple[groq.AsyncGroq, asyncio.Semaphore]] = {}
+        self._lock = threading.Lock()
+        # Each event loop (and thread) using this client updates the counters below
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.retries = 0
+        self.failures = 0
+        self.abandoned_clients = 0
+
+    def _create_client(self) -> groq.AsyncGroq:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            # Ignore proxy environment variables rather than clearing them for the whole process
+            trust_env=False,
+            transport=self.transport,
+        )
+        return groq.AsyncGroq(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=0,  # retries are handled here, with jitter
+            http_client=http_client,
+        )
+
+    def _ensure_client(self) -> Tuple[groq.AsyncGroq, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._clients.get(loop)
+            if entry is None:
+                # A loop that ended without aclose() can no longer close its sockets; drop its client
+                for closed in [other for other in self._clients if other.is_closed()]:
+                    del self._clients[closed]
+                    self.abandoned_clients += 1
+                entry = self._clients[loop] = (self._create_client(), asyncio.Semaphore(self.max_concurrency))
+        return entry
+
+    @property
+    def main_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """The oldest loop with an open client, normally the server's."""
+        with self._lock:
+            return next((loop for loop in self._clients if not loop.is_closed()), None)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    async def _backoff(self, attempt: int):
+        self._count("retries")
+        delay = min(0.25 * 2 ** attempt, 4.0)
+        await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def chat(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                   **kwargs) -> Dict[str, Any]:
+        """One completion, returned as ``{"content": str, "tool_calls": [...]}``."""
+        client, semaphore = self._ensure_client()
+        kwargs.setdefault("temperature", 0.3)
+        kwargs.setdefault("max_tokens", 1024)
+        if tools:
+            kwargs["tools"] = tools
+        async with semaphore:
+            self._count("in_flight")
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        response = await client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            **kwargs
+                        )
+                        message = response.choices[0].message
+                        outcome = "success"
+                        return {
+                            "content": message.content or "",
+                            "tool_calls": [
+                                {"id": call.id, "name": call.function.name, "arguments": call.function.arguments or "{}"}
+                                for call in (message.tool_calls or [])
+                            ],
+                        }
+                    except RETRYABLE_ERRORS:
+                        if attempt == self.max_retries:
+                            self._count("failures")
+                            raise
+                        await self._backoff(attempt)
+            finally:
+                self._count("in_flight", -1)
+                LLM_REQUEST_DURATION.observe(time.perf_counter() - started, "complete", outcome)
+
+    async def complete(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        return (await self.chat(messages, **kwargs))["content"]
+
+    async def stream_chat(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                          **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a completion as ``{"content": delta}`` events.
+
+        Tool call fragments are assembled as they arrive and, if the model
+        requested any, emitted once at the end as ``{"tool_calls": [...]}``.
+        Only failures before the first token are retried.
+        """
+        client, semaphore = self._ensure_client()
+        kwargs.setdefault("temperature", 0.3)
+        kwargs.setdefault("max_tokens", 1024)
+        if tools:
+            kwargs["tools"] = tools
+        async with semaphore:
+            self._count("in_flight")
+            started = time.perf_counter()
+            first_token_at = None
+            tokens = 0
+            outcome = "error"
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        stream = await client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            stream=True,
+                            **kwargs
+                        )
+                        break
+                    except RETRYABLE_ERRORS:
+                        if attempt == self.max_retries:
+                            self._count("failures")
+                            raise
+                        await self._backoff(attempt)
+                tool_calls: Dict[int, Dict[str, str]] = {}
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            tokens += 1
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                                LLM_TIME_TO_FIRST_TOKEN.observe(first_token_at - started)
+                            yield {"content": delta.content}
+                        for call in delta.tool_calls or []:
+                            entry = tool_calls.setdefault(call.index, {"id": "", "name": "", "arguments": ""})
+                            if call.id:
+                                entry["id"] = call.id
+                            if call.function and call.function.name:
+                                entry["name"] += call.function.name
+                            if call.function and call.function.arguments:
+                                entry["arguments"] += call.function.arguments
+                finally:
+                    await stream.response.aclose()
+                outcome = "success"
+                if tool_calls:
+                    yield {"tool_calls": [tool_calls[i] for i in sorted(tool_calls)]}
+            finally:
+                self._count("in_flight", -1)
+                finished = time.perf_counter()
+                LLM_REQUEST_DURATION.observe(finished - started, "stream", outcome)
+                if tokens:
+                    LLM_TOKENS.inc(amount=tokens)
+                    # Rate over the generation phase; a single delta gives no interval to measure
+                    if tokens > 1 and finished > first_token_at:
+                        LLM_TOKENS_PER_SECOND.observe((tokens - 1) / (finished - first_token_at))
+
+    async def stream(self, messages: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """Yield content deltas only."""
+        async for event in self.stream_chat(messages, **kwargs):
+            if "content" in event:
+                yield event["content"]
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "retries": self.retries,
+            "failures": self.failures,
+            "clients": len(self._clients),
+            "abandoned_clients": self.abandoned_clients,
+        }
+
+    async def aclose(self):
+        """Close the calling loop's client; other loops keep theirs."""
+        with self._lock:
+            entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].close()
@@ -0,0 +1,266 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from sqlalchemy import insert
+from backend.models.database import SessionLocal, ConversationMemory
+from backend.shared_state import is_cross_process, shared_key, shared_state
+from backend.instrumentation import MEMORY_DROPPED_TURNS
+from backend.config import settings
+
+class _SessionHistory:
+    __slots__ = ("turns", "touched_at")
+
+    def __init__(self, turns: deque):
+        self.turns = turns
+        self.touched_at = time.monotonic()
+
+class ConversationStore:
+    """Cached, write-behind front end for the ``conversation_memory`` table.
+
+    The most recent turns of up to ``max_sessions`` sessions are kept in
+    per-session ring buffers, evicted least-recently-used or after ``ttl``
+    seconds idle, so reading history for an active chat never hits the
+    database. New turns go into the ring buffer immediately and are inserted
+    in batches by a background thread every ``flush_interval`` seconds or as
+    soon as ``batch_size`` turns are pending. While the database keeps
+    failing, at most ``max_pending`` turns wait; the oldest are dropped (and
+    counted) beyond that.
+
+    With a ``shared`` state store (several worker processes) the ring buffers
+    live there instead, as capped lists that expire after ``ttl`` idle
+    seconds, so a session can move between workers and still see every
+    turn, including those another worker has not flushed yet.
+    """
+
+    def __init__(self, max_sessions: int = 1000, history_size: int = 20, ttl: float = 1800,
+                 batch_size: int = 100, flush_interval: float = 1.0, max_pending: int = 10000, shared=None):
+        self.shared = shared
+        self.max_sessions = max_sessions
+        self.history_size = history_size
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._sessions: "OrderedDict[str, _SessionHistory]" = OrderedDict()
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.dropped = 0
+
+    def _drop_overflow(self):
+        """Drop the oldest pending turns beyond ``max_pending``; call with ``_lock`` held."""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            MEMORY_DROPPED_TURNS.inc(amount=overflow)
+            print(f"Conversation memory backlog full, dropped {overflow} unwritten turns")
+
+    def _cached(self, session_id: str) -> Optional[_SessionHistory]:
+        history = self._sessions.get(session_id)
+        if history is None:
+            return None
+        if time.monotonic() - history.touched_at > self.ttl:
+            del self._sessions[session_id]
+            return None
+        history.touched_at = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return history
+
+    def _remember(self, session_id: str, turns: deque) -> _SessionHistory:
+        history = _SessionHistory(turns)
+        self._sessions[session_id] = history
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return history
+
+    def _load_from_db(self, session_id: str) -> deque:
+        # Holding the flush lock means every turn is either committed or still pending, never in flight
+        with self._flush_lock:
+            db = SessionLocal()
+            try:
+                rows = db.query(ConversationMemory.role, ConversationMemory.message).filter(
+                    ConversationMemory.session_id == session_id
+                ).order_by(ConversationMemory.created_at.desc()).limit(self.history_size).all()
+            finally:
+                db.close()
+            turns = deque(({"role": role, "content": message} for role, message in reversed(rows)),
+                          maxlen=self.history_size)
+            with self._lock:
+                for entry in self._pending:
+                    if entry["session_id"] == session_id:
+                        turns.append({"role": entry["role"], "content": entry["message"]})
+        return turns
+
+    def _history(self, session_id: str) -> _SessionHistory:
+        with self._lock:
+            history = self._cached(session_id)
+            if history is not None:
+                self.hits += 1
+                return history
+            self.misses += 1
+        turns = self._load_from_db(session_id)
+        with self._lock:
+            # Another thread may have loaded the session while we were querying
+            return self._cached(session_id) or self._remember(session_id, turns)
+
+    def _shared_history(self, session_id: str) -> List[Dict[str, str]]:
+        """The session's turns from the shared store, filled from the database on a miss."""
+        key = shared_key(f"memory:{session_id}")
+        entries = self.shared.lrange(key, -self.history_size, -1)
+        with self._lock:
+            if entries:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entries:
+            self.shared.expire(key, int(self.ttl))
+            return [json.loads(entry) for entry in entries]
+        turns = list(self._load_from_db(session_id))
+        if turns:
+            # Two workers filling the same cold session at once may duplicate its history in the
+            # cached window; the database copy is unaffected
+            self.shared.rpush(key, *(json.dumps(turn) for turn in turns))
+            self.shared.expire(key, int(self.ttl))
+        return turns
+
+    def load(self, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Return up to ``limit`` recent turns, newest first."""
+        if self.shared is not None:
+            turns = self._shared_history(session_id)
+        else:
+            history = self._history(session_id)
+            with self._lock:
+                turns = list(history.turns)
+        return list(reversed(turns[-limit:]))
+
+    def _save_shared(self, session_id: str, turn: Dict[str, str]):
+        key = shared_key(f"memory:{session_id}")
+        self._shared_history(session_id)
+        self.shared.rpush(key, json.dumps(turn))
+        self.shared.ltrim(key, -self.history_size, -1)
+        self.shared.expire(key, int(self.ttl))
+
+    def save(self, session_id: str, role: str, message: str):
+        if self.shared is not None:
+            self._save_shared(session_id, {"role": role, "content": message})
+            history = None
+        else:
+            history = self._history(session_id)
+        with self._lock:
+            if history is not None:
+                history.turns.append({"role": role, "content": message})
+            self._pending.append({
+                "session_id": session_id,
+                "role": role,
+                "message": message,
+                "created_at": datetime.utcnow(),
+            })
+            self._drop_overflow()
+            pending = len(self._pending)
+        self._ensure_writer()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Insert every pending turn in one statement. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            db = SessionLocal()
+            try:
+                db.execute(insert(ConversationMemory), batch)
+                db.commit()
+                self.flushed += len(batch)
+                return len(batch)
+            except Exception as e:
+                db.rollback()
+                self.flush_errors += 1
+                print(f"Error flushing conversation memory: {e}")
+                # Put the batch back so the next flush retries it, within the backlog cap
+                with self._lock:
+                    self._pending[:0] = batch
+                    self._drop_overflow()
+                return 0
+            finally:
+                db.close()
+
+    def prune(self, max_age_days: float) -> int:
+        """Delete turns older than ``max_age_days``. Returns the number of rows removed."""
+        cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+        db = SessionLocal()
+        try:
+            deleted = db.query(ConversationMemory).filter(
+                ConversationMemory.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            print(f"Error pruning conversation memory: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._stopping.clear()
+                self._writer = threading.Thread(target=self._write_loop, name="memory-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background writer and flush whatever is still pending."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            self._writer = None
+        self.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "shared": self.shared is not None,
+                "cached_sessions": len(self._sessions),
+                "pending_writes": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "flushed": self.flushed,
+                "flush_errors": self.flush_errors,
+                "dropped": self.dropped,
+            }
+
+memory_store = ConversationStore(
+    max_sessions=settings.MEMORY_CACHE_SESSIONS,
+    history_size=settings.MEMORY_HISTORY_SIZE,
+    ttl=settings.MEMORY_CACHE_TTL,
+    batch_size=settings.MEMORY_FLUSH_BATCH_SIZE,
+    flush_interval=settings.MEMORY_FLUSH_INTERVAL,
+    max_pending=settings.MEMORY_MAX_PENDING,
+    # One process keeps history in its own ring buffers; several share it
+    shared=shared_state if is_cross_process(shared_state) else None,
+)
@@ -0,0 +1,121 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from backend.tools import tool_executor
+from backend.config import settings
+
+END_OF_STREAM = "__END__"
+
+async def iterate_in_executor(iterator: Iterator[Any], batch_size: int = 100) -> AsyncIterator[List[Any]]:
+    """Drain a blocking iterator on the tool executor, yielding lists of up to ``batch_size`` items.
+
+    Closing the returned generator early (e.g. when the client goes away)
+    closes the underlying iterator, so no further rows are read.
+    """
+    def next_batch():
+        return list(itertools.islice(iterator, batch_size))
+
+    try:
+        while True:
+            batch = await tool_executor.run(next_batch)
+            if not batch:
+                return
+            yield batch
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            await tool_executor.run(close)
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def _pump(chunks: AsyncIterator[str], queue: asyncio.Queue):
+    try:
+        async for chunk in chunks:
+            # Blocks when the client falls behind, which pauses the producer
+            await queue.put(chunk)
+        await queue.put(None)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose:
+            await aclose()
+
+async def sse_stream(chunks: AsyncIterator[str], is_disconnected=None,
+                     heartbeat_interval: Optional[float] = None,
+                     flush_interval: Optional[float] = None,
+                     max_batch_chars: Optional[int] = None) -> AsyncIterator[str]:
+    """Turn agent text chunks into SSE events.
+
+    Small chunks are coalesced into one event until ``max_batch_chars`` is
+    reached or ``flush_interval`` seconds have passed since the first
+    buffered chunk. A comment heartbeat is sent whenever the agent is silent
+    for ``heartbeat_interval`` seconds. The producer runs in its own task
+    behind a bounded queue and is cancelled as soon as the client
+    disconnects or the response is torn down, releasing any DB cursor or
+    LLM stream it holds.
+    """
+    heartbeat_interval = heartbeat_interval or settings.STREAM_HEARTBEAT_INTERVAL
+    flush_interval = flush_interval if flush_interval is not None else settings.STREAM_FLUSH_INTERVAL
+    max_batch_chars = max_batch_chars or settings.STREAM_MAX_BATCH_CHARS
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.STREAM_QUEUE_SIZE)
+    producer = asyncio.create_task(_pump(chunks, queue))
+    buffer: List[str] = []
+    buffered = 0
+    buffer_started = 0.0
+    last_sent = time.monotonic()
+
+    def take_buffer() -> str:
+        nonlocal buffer, buffered
+        text, buffer, buffered = "".join(buffer), [], 0
+        return text
+
+    try:
+        while True:
+            if buffer:
+                timeout = max(0.0, buffer_started + flush_interval - time.monotonic())
+            else:
+                timeout = max(0.0, last_sent + heartbeat_interval - time.monotonic())
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if buffer:
+                    yield sse_event({"content": take_buffer(), "complete": False})
+                else:
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+                continue
+
+            if item is None or item == END_OF_STREAM:
+                if buffer:
+                    yield sse_event({"content": take_buffer(), "complete": False})
+                if item == END_OF_STREAM:
+                    yield sse_event({"content": "", "complete": True})
+                return
+            if isinstance(item, Exception):
+                if buffer:
+                    yield sse_event({"content": take_buffer(), "complete": False})
+                yield sse_event({"error": str(item)})
+                return
+
+            if not buffer:
+                buffer_started = time.monotonic()
+            buffer.append(item)
+            buffered += len(item)
+            if buffered >= max_batch_chars:
+                yield sse_event({"content": take_buffer(), "complete": False})
+                last_sent = time.monotonic()
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            pass
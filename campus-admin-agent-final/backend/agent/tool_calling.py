@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+from backend.models.schemas import coerce_arguments
+from backend.tools import WRITE_TOOLS, execute_tool_async
+from backend.tools.activity_log import log_activity
+from backend.config import settings
+
+def serialize_tool_result(result: Any, max_chars: int = None) -> str:
+    """JSON-encode a tool result for the model, truncating very large payloads."""
+    max_chars = max_chars or settings.AGENT_TOOL_RESULT_CHARS
+    text = json.dumps(result, default=str)
+    if len(text) > max_chars:
+        return text[:max_chars] + f" ... [truncated {len(text) - max_chars} characters]"
+    return text
+
+async def _run_tool_call(call: Dict[str, str], tools: Dict[str, Callable], timeout: float) -> Any:
+    name = call["name"]
+    if name not in tools:
+        return {"error": f"Tool {name} not found"}
+    try:
+        arguments = json.loads(call["arguments"] or "{}")
+        if not isinstance(arguments, dict):
+            return {"error": "Tool arguments must be a JSON object"}
+        arguments = coerce_arguments(tools[name], arguments)
+        if name in WRITE_TOOLS:
+            # Abandoning the await would not stop the executor thread from committing, and a model
+            # told "timed out" may retry and write twice, so writes always report their real outcome
+            return await execute_tool_async(name, **arguments)
+        return await asyncio.wait_for(execute_tool_async(name, **arguments), timeout)
+    except asyncio.TimeoutError:
+        return {"error": f"Tool {name} timed out"}
+    except Exception as e:
+        return {"error": str(e)}
+
+def log_tool_call(session_id: Optional[str], name: str, arguments: Any, result: Any, duration_ms: Optional[float] = None):
+    """Queue a ``tool_call`` audit event; safe to call from the event loop."""
+    student_id = arguments.get("student_id") if isinstance(arguments, dict) else None
+    details = {
+        "tool": name,
+        "session_id": session_id,
+        "success": not (isinstance(result, dict) and "error" in result),
+    }
+    if duration_ms is not None:
+        details["duration_ms"] = round(duration_ms, 2)
+    log_activity("tool_call", student_id if isinstance(student_id, str) else None, details, block=False)
+
+async def _run_logged_tool_call(call: Dict[str, str], tools: Dict[str, Callable], timeout: float,
+                                session_id: Optional[str]) -> Any:
+    started = time.perf_counter()
+    result = await _run_tool_call(call, tools, timeout)
+    try:
+        arguments = json.loads(call["arguments"] or "{}")
+    except ValueError:
+        arguments = None
+    log_tool_call(session_id, call["name"], arguments, result, (time.perf_counter() - started) * 1000)
+    return result
+
+async def execute_tool_calls(tool_calls: List[Dict[str, str]], tools: Dict[str, Callable],
+                             timeout: float, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run every tool call from one model turn concurrently and return the ``tool`` messages for them."""
+    results = await asyncio.gather(*(_run_logged_tool_call(call, tools, timeout, session_id) for call in tool_calls))
+    return [
+        {"role": "tool", "tool_call_id": call["id"], "name": call["name"], "content": serialize_tool_result(result)}
+        for call, result in zip(tool_calls, results)
+    ]
+
+def assistant_tool_call_message(content: str, tool_calls: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {
+        "role": "assistant",
+        "content": content,
+        "tool_calls": [
+            {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": call["arguments"]}}
+            for call in tool_calls
+        ],
+    }
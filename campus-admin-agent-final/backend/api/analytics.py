@@ -1,14 +1,124 @@
-from fastapi import APIRouter, HTTPException
-from backend.tools import execute_tool
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+from backend.database.session import get_db
+from backend.tools import execute_tool_async
+from backend.tools.counters import counters
+from backend.tools.cache import student_version
+from backend.tools.analytics_feed import dashboard_feed
+from backend.api.conditional import conditional_json
+from backend.tools.campus_analytics import rollup_engine
+from backend.tools.activity_log import DEFAULT_EVENT_PAGE_SIZE, MAX_EVENT_PAGE_SIZE
 
-router = APIRouter(prefix="/analytics", tags=["analytics"])
+router = APIRouter(prefix="/analytics", tags=["analytics"], dependencies=[Depends(get_db)])
+
+# The reads below depend only on the students table, so they are served conditionally on its version
 
 @router.get("/total-students")
-async def get_total_students():
-    total = execute_tool("get_total_students")
-    return {"total_students": total}
+async def get_total_students(request: Request):
+    async def produce():
+        return {"total_students": await execute_tool_async("get_total_students")}
+    return await conditional_json(request, student_version, produce)
 
 @router.get("/students-by-department")
-async def get_students_by_department():
-    dept_data = execute_tool("get_students_by_department")
-    return {"students_by_department": dept_data}
\ No newline at end of file
+async def get_students_by_department(request: Request):
+    async def produce():
+        return {"students_by_department": await execute_tool_async("get_students_by_department")}
+    return await conditional_json(request, student_version, produce)
+
+@router.get("/department-activity")
+async def get_department_activity_breakdown(request: Request):
+    async def produce():
+        return {"department_activity": await execute_tool_async("get_department_activity_breakdown")}
+    return await conditional_json(request, student_version, produce)
+
+@router.get("/onboarding")
+async def get_onboarding_counts(
+    request: Request,
+    interval: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    async def produce():
+        result = await execute_tool_async("get_onboarding_counts", interval=interval, start=start, end=end)
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return result
+    return await conditional_json(request, student_version, produce)
+
+@router.get("/stream")
+async def stream_dashboard(request: Request):
+    """Live totals over SSE: a snapshot event, then coalesced deltas whenever students change."""
+    return StreamingResponse(
+        dashboard_feed.events(is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/activity-events")
+async def get_activity_event_counts(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    counts = await execute_tool_async("get_activity_event_counts", start=start, end=end)
+    return {"event_counts": counts, "start": start, "end": end}
+
+@router.get("/activity-log")
+async def get_activity_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    student_id: Optional[str] = None,
+    limit: int = Query(DEFAULT_EVENT_PAGE_SIZE, ge=1, le=MAX_EVENT_PAGE_SIZE),
+    before: Optional[int] = Query(None, description="Return events with an id lower than this cursor"),
+):
+    result = await execute_tool_async("get_activity_events", start=start, end=end, event_type=event_type,
+                                      student_id=student_id, limit=limit, before=before)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+@router.get("/timeseries/onboarding")
+async def get_onboarding_timeseries(
+    interval: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    department: Optional[str] = None,
+):
+    result = await execute_tool_async("get_onboarding_timeseries", interval=interval, start=start, end=end,
+                                      department=department)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@router.get("/timeseries/activity")
+async def get_activity_timeseries(
+    interval: str = Query("hour", pattern="^(hour|day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+):
+    result = await execute_tool_async("get_activity_timeseries", interval=interval, start=start, end=end,
+                                      event_type=event_type)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@router.get("/timeseries/chat-volume")
+async def get_chat_volume_timeseries(
+    interval: str = Query("hour", pattern="^(hour|day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    role: Optional[str] = None,
+):
+    result = await execute_tool_async("get_chat_volume_timeseries", interval=interval, start=start, end=end,
+                                      role=role)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@router.get("/rollups")
+async def get_rollup_metrics():
+    return {"rollups": rollup_engine.metrics()}
+
+@router.get("/counters")
+async def get_counter_metrics():
+    return {"counters": counters.metrics()}
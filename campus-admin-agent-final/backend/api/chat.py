@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any
 import json
 from backend.agent.core import CampusAdminAgent
+from backend.agent.streaming import sse_stream
+from backend.tools import ExecutorSaturated
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 agent = CampusAdminAgent()
@@ -15,21 +17,18 @@ class ChatRequest(BaseModel):
 @router.post("")
 async def chat_endpoint(request: ChatRequest):
     try:
-        response = agent.handle_message(request.session_id, request.message)
+        response = await agent.async_handle_message(request.session_id, request.message)
         return {"response": response, "session_id": request.session_id}
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 @router.post("/stream")
-async def chat_stream(request: ChatRequest):
-    async def event_stream():
-        try:
-            async for chunk in agent.async_stream_handle_message(request.session_id, request.message):
-                if chunk == "__END__":
-                    yield f"data: {json.dumps({'content': '', 'complete': True})}\n\n"
-                else:
-                    yield f"data: {json.dumps({'content': chunk, 'complete': False})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
-    
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
\ No newline at end of file
+async def chat_stream(request: ChatRequest, http_request: Request):
+    chunks = agent.async_stream_handle_message(request.session_id, request.message)
+    return StreamingResponse(
+        sse_stream(chunks, is_disconnected=http_request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
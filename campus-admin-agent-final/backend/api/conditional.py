@@ -0,0 +1,62 @@
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Union
+from fastapi import Request, Response
+from backend.tools.cache import DataVersion, http_body_cache
+
+# Bodies larger than this are still served conditionally but not kept in memory
+MAX_CACHED_BODY_BYTES = 1024 * 1024
+
+def json_bytes(payload: Any) -> bytes:
+    """Encode with the C JSON encoder directly, skipping jsonable_encoder and response model validation."""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+def _not_modified(request: Request, etag: str, modified_at: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            # HTTP dates have whole-second precision
+            return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def conditional_json(request: Request, version: DataVersion,
+                           produce: Callable[[], Awaitable[Union[bytes, str, Any]]]) -> Response:
+    """Serve a read that depends only on ``version``'s data with ETag/Last-Modified validation.
+
+    Matching ``If-None-Match`` (or ``If-Modified-Since``) gets a bodyless
+    304. Otherwise the encoded body is reused from the cache while the data
+    is unchanged, or ``produce`` is awaited for the payload (or ready-made
+    JSON text) and encoded once. The version is read before the data, so a
+    write landing in between only makes the ETag older than the body, never
+    newer.
+    """
+    etag, modified_at = version.current()
+    headers = {"ETag": etag, "Last-Modified": formatdate(modified_at, usegmt=True), "Cache-Control": "no-cache"}
+    if _not_modified(request, etag, modified_at):
+        return Response(status_code=304, headers=headers)
+
+    key = (etag, request.url.path, request.url.query)
+    generation = http_body_cache.generation()
+    body = http_body_cache.get(key)
+    if body is None:
+        payload = await produce()
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+        elif isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json_bytes(payload)
+        if len(body) <= MAX_CACHED_BODY_BYTES:
+            http_body_cache.put(key, body, generation)
+    return Response(content=body, media_type="application/json", headers=headers)
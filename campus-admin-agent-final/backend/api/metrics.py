@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import time
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from backend.instrumentation import merge_rendered, registry, profiler
+from backend.shared_state import shared_key, shared_state
+from backend.config import settings
+
+router = APIRouter(tags=["metrics"])
+
+# Hash of worker pid -> {"at": publish time, "text": that worker's rendered metrics}
+_WORKER_METRICS_KEY = "metrics:workers"
+
+class ProfilerToggle(BaseModel):
+    enabled: bool
+    interval: Optional[float] = None
+
+def publish_worker_metrics():
+    """Store this worker's metrics in the shared state, for whichever worker serves the next scrape."""
+    pid = os.getpid()
+    shared_state.hset(shared_key(_WORKER_METRICS_KEY), str(pid),
+                      json.dumps({"at": time.time(), "text": registry.render({"worker_pid": pid})}))
+
+def render_worker_metrics(interval: float = settings.METRICS_PUBLISH_INTERVAL) -> str:
+    """This worker's metrics merged with the last ones every other live worker published."""
+    pid = os.getpid()
+    key = shared_key(_WORKER_METRICS_KEY)
+    texts = [registry.render({"worker_pid": pid})]
+    for worker, value in sorted(shared_state.hgetall(key).items()):
+        if worker == str(pid):
+            continue
+        published = json.loads(value)
+        if published["at"] < time.time() - 3 * interval:
+            # The worker has exited (a restarted one has a new pid)
+            shared_state.hdel(key, worker)
+            continue
+        texts.append(published["text"])
+    return merge_rendered(texts)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Latency histograms and gauges in the Prometheus text exposition format.
+
+    Every worker process keeps its own metrics, and a scrape reaches one
+    arbitrary worker. With SERVER_WORKERS > 1 that worker therefore merges
+    in what the others published to the shared state in the last
+    METRICS_PUBLISH_INTERVAL seconds; each series carries a ``worker_pid``
+    label, so sum over it for service-wide figures.
+    """
+    if settings.SERVER_WORKERS > 1:
+        text = await asyncio.to_thread(render_worker_metrics)
+    else:
+        text = registry.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@router.post("/metrics/profiler", response_model=Dict[str, Any])
+async def toggle_profiler(toggle: ProfilerToggle):
+    """Start (clearing earlier samples) or stop the sampling profiler.
+
+    The profiler is per process: with several workers this toggles the one
+    worker that received the request, whose ``pid`` is in the response.
+    """
+    if toggle.interval is not None and toggle.interval <= 0:
+        raise HTTPException(status_code=422, detail="interval must be positive")
+    if toggle.enabled:
+        profiler.start(toggle.interval)
+    else:
+        # Joins the sampling thread, which can take up to one interval
+        await asyncio.to_thread(profiler.stop)
+    return profiler.metrics()
+
+@router.get("/metrics/profiler", response_class=PlainTextResponse)
+async def profiler_samples(limit: int = 0):
+    """Sampled stacks in collapsed form (``frame;frame count``), ready for flamegraph.pl or speedscope.
+
+    Only the worker that received the request is included; its pid is in
+    the X-Worker-Pid header.
+    """
+    return PlainTextResponse(profiler.collapsed(limit), headers={"X-Worker-Pid": str(os.getpid())})
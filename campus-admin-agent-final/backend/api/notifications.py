@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from backend.database.session import get_db
+from backend.tools import tool_executor
+from backend.tools.notifications import announce_to_department, get_notification_status
+
+router = APIRouter(prefix="/notifications", tags=["notifications"], dependencies=[Depends(get_db)])
+
+class AnnouncementCreate(BaseModel):
+    department: str
+    subject: str
+    body: str
+    idempotency_key: Optional[str] = None
+
+@router.post("/announcements", status_code=202, response_model=Dict[str, Any])
+async def create_announcement(announcement: AnnouncementCreate, idempotency_key: Optional[str] = Header(None)):
+    """Queue an announcement to a department; delivery happens in the background."""
+    result = await tool_executor.run(
+        announce_to_department, announcement.department, announcement.subject, announcement.body,
+        announcement.idempotency_key or idempotency_key,
+    )
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+@router.get("/status", response_model=Dict[str, Any])
+async def notification_status():
+    result = await tool_executor.run(get_notification_status)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
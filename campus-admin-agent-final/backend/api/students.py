@@ -1,9 +1,23 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from backend.tools import execute_tool
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import IO, Optional, Dict, Any, Iterator, List, Tuple
+from datetime import datetime
+import csv
+import io
+import json
+import tempfile
+from backend.database.session import get_db
+from backend.tools import execute_timed_async, execute_tool_async, iter_students, StudentImport, tool_executor
+from backend.tools.cache import student_version
+from backend.tools.student_management import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STUDENT_FIELDS, resolve_fields, list_students_json
+)
+from backend.api.conditional import conditional_json
+from backend.tools.student_search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from backend.config import settings
 
-router = APIRouter(prefix="/students", tags=["students"])
+router = APIRouter(prefix="/students", tags=["students"], dependencies=[Depends(get_db)])
 
 class StudentCreate(BaseModel):
     name: str
@@ -23,14 +37,193 @@ class StudentUpdate(BaseModel):
         validate_all = True
         arbitrary_types_allowed = True
 
+class StudentFilter(BaseModel):
+    department: Optional[str] = None
+    active: Optional[bool] = None
+    onboarded_after: Optional[datetime] = None
+    onboarded_before: Optional[datetime] = None
+
+    class Config:
+        extra = "forbid"
+
+class StudentBulkChanges(BaseModel):
+    department: Optional[str] = None
+    active: Optional[bool] = None
+
+    class Config:
+        extra = "forbid"
+
+class StudentBulkSelection(BaseModel):
+    student_ids: Optional[List[str]] = None
+    filter: Optional[StudentFilter] = None
+    dry_run: bool = False
+    chunk_size: Optional[int] = Field(None, ge=1, le=10000)
+
+    def tool_arguments(self) -> Dict[str, Any]:
+        arguments = self.filter.dict() if self.filter else {}
+        arguments.update(student_ids=self.student_ids, dry_run=self.dry_run, chunk_size=self.chunk_size)
+        return arguments
+
+class StudentBulkUpdate(StudentBulkSelection):
+    set: StudentBulkChanges
+
 @router.post("", response_model=Dict[str, Any])
 async def create_student(student: StudentCreate):
-    result = execute_tool("add_student", name=student.name, student_id=student.student_id, 
+    result = await execute_tool_async("add_student", name=student.name, student_id=student.student_id, 
                          email=student.email, department=student.department)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return {"message": "Student created successfully", "student": result["student"]}
 
+def _parse_rows(text: IO[str], format: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (row_number, row, parse_error) for each non-blank CSV or NDJSON record.
+
+    CSV goes through one ``csv.reader`` over the whole text, so quoted fields
+    may contain newlines; a malformed record is reported and skipped.
+    """
+    records = csv.reader(text) if format == "csv" else text
+    header = None
+    row_number = 0
+    while True:
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            # A body that is not UTF-8 cannot be resumed at the next record
+            raise
+        except (ValueError, csv.Error) as e:
+            row_number += 1
+            yield row_number, None, f"Could not parse row: {e}"
+            continue
+        if format == "csv":
+            if not any(field.strip() for field in record):
+                continue
+            if header is None:
+                header = [h.strip() for h in record]
+                continue
+            row_number += 1
+            yield row_number, dict(zip(header, record)), None
+            continue
+        if not record.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(record)
+            if not isinstance(row, dict):
+                raise ValueError("Expected a JSON object")
+            yield row_number, row, None
+        except ValueError as e:
+            yield row_number, None, f"Could not parse row: {e}"
+
+def _import_body(body: IO[bytes], format: str, chunk_size: Optional[int]) -> Dict[str, Any]:
+    """Parse a fully received import body and insert its rows in one transaction."""
+    importer = StudentImport(chunk_size)
+    try:
+        text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        for row_number, row, error in _parse_rows(text, format):
+            if error:
+                importer.errors.append({"row": row_number, "student_id": None, "error": error})
+            else:
+                importer.add(row, row_number)
+    except Exception as e:
+        importer.rollback()
+        return {"error": f"Import failed: {e}", "invalid": True}
+    return importer.commit()
+
+@router.post("/bulk", response_model=Dict[str, Any])
+async def bulk_create_students(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=10000),
+):
+    """Import many students from a CSV or NDJSON body in a single transaction.
+
+    The body is spooled (in memory, then on disk) until it has fully
+    arrived, so a slow upload never holds the database's write lock.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    body = tempfile.SpooledTemporaryFile(max_size=settings.BULK_IMPORT_SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        result = await tool_executor.run(_import_body, body, format, chunk_size)
+    finally:
+        body.close()
+    if "success" not in result:
+        raise HTTPException(status_code=400 if result.get("invalid") else 500, detail=result["error"])
+    return result
+
+@router.patch("/bulk", response_model=Dict[str, Any])
+async def bulk_update_students(update: StudentBulkUpdate):
+    """Change department and/or active for every student matched by ``student_ids`` and/or ``filter``."""
+    result = await execute_tool_async("bulk_update_students", set_department=update.set.department,
+                                      set_active=update.set.active, **update.tool_arguments())
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@router.post("/bulk/delete", response_model=Dict[str, Any])
+async def bulk_delete_students(selection: StudentBulkSelection):
+    """Delete every student matched by ``student_ids`` and/or ``filter``."""
+    result = await execute_tool_async("bulk_delete_students", **selection.tool_arguments())
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@router.get("/export")
+async def export_students(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    department: Optional[str] = None,
+    active: Optional[bool] = None,
+):
+    """Stream every student matching the filters as CSV or NDJSON."""
+    fields = list(STUDENT_FIELDS)
+    rows = iter_students(department=department, active=active, fields=fields)
+
+    if format == "ndjson":
+        def ndjson_stream():
+            for student in rows:
+                yield json.dumps(student) + "\n"
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+    def csv_stream():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        for student in rows:
+            writer.writerow(student)
+            # Flush in modest blocks rather than one write per row
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return StreamingResponse(
+        csv_stream(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=students.csv"},
+    )
+
+@router.get("/search", response_model=Dict[str, Any])
+async def search_students(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Partial name, email or student ID"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+):
+    """Ranked search over student names, emails and IDs."""
+    async def produce():
+        result = await execute_tool_async("search_students", query=q, limit=limit, offset=offset)
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        return result
+    return await conditional_json(request, student_version, produce)
+
 @router.put("/{student_id}", response_model=Dict[str, Any])
 async def update_student(student_id: str, student_update: StudentUpdate):
     """Update a student's information"""
@@ -55,7 +248,7 @@ async def update_student(student_id: str, student_update: StudentUpdate):
                 detail=f"Invalid field(s) provided: {', '.join(invalid_fields)}. Allowed fields: {', '.join(allowed_fields)}"
             )
         
-        result = execute_tool("update_student", student_id=student_id, **update_data)
+        result = await execute_tool_async("update_student", student_id=student_id, **update_data)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -66,22 +259,49 @@ async def update_student(student_id: str, student_update: StudentUpdate):
         raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
 
 @router.get("", response_model=Dict[str, Any])
-async def list_students():
-    result = execute_tool("list_students")
-    if "error" in result:
-        raise HTTPException(status_code=500, detail=result["error"])
-    return result
+async def list_students(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Return students with an id greater than this cursor"),
+    department: Optional[str] = None,
+    active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated list of columns to return"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        resolve_fields(field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        # Stream the whole filtered listing row by row instead of paging
+        def ndjson_stream():
+            for student in iter_students(after=after, department=department, active=active, fields=field_list):
+                yield json.dumps(student) + "\n"
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+    async def produce():
+        # Encoded straight from the rows; the body cache in conditional_json stands in for the tool cache
+        result = await execute_timed_async("list_students_json", list_students_json, limit=limit, after=after,
+                                           department=department, active=active, fields=field_list)
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        return result["json"]
+    return await conditional_json(request, student_version, produce)
 
 @router.get("/{student_id}", response_model=Dict[str, Any])
-async def get_student(student_id: str):
-    result = execute_tool("get_student", student_id=student_id)
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
-    return result
+async def get_student(student_id: str, request: Request):
+    async def produce():
+        result = await execute_tool_async("get_student", student_id=student_id)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail=result["error"])
+        return result
+    return await conditional_json(request, student_version, produce)
 
 @router.delete("/{student_id}", response_model=Dict[str, Any])
 async def delete_student(student_id: str):
-    result = execute_tool("delete_student", student_id=student_id)
+    result = await execute_tool_async("delete_student", student_id=student_id)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
\ No newline at end of file
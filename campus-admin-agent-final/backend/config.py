@@ -5,9 +5,124 @@ load_dotenv()
 
 class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./campus.db")
+    # Connection pool sizing (SQLite file databases and server backends)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
     AGENT_MODEL = os.getenv("AGENT_MODEL", "llama-3.1-8b-instant")
+    # Override to point the Groq SDK at another endpoint, e.g. backend/agent/fake_groq.py
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
     PDF_STORAGE_PATH = os.getenv("PDF_STORAGE_PATH", "./storage/pdfs")
     VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./storage/vector_db")
+    # Threads available to blocking tool/database calls and how many calls may wait for one
+    TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+    TOOL_MAX_QUEUE = int(os.getenv("TOOL_MAX_QUEUE", "256"))
+    # Tool-calling loop limits per chat turn, and the cap on a tool result sent back to the model
+    AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "4"))
+    AGENT_TIME_BUDGET = float(os.getenv("AGENT_TIME_BUDGET", "20"))
+    AGENT_TOOL_RESULT_CHARS = int(os.getenv("AGENT_TOOL_RESULT_CHARS", "4000"))
+    # Memoized read-only tool results and normalized-prompt rule-based responses
+    TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+    TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    # Encoded bodies of conditional (ETag) student and analytics reads, keyed by data version
+    HTTP_BODY_CACHE_SIZE = int(os.getenv("HTTP_BODY_CACHE_SIZE", "256"))
+    HTTP_BODY_CACHE_TTL = float(os.getenv("HTTP_BODY_CACHE_TTL", "300"))
+    # Conversation memory cache, write-behind batching and retention
+    MEMORY_CACHE_SESSIONS = int(os.getenv("MEMORY_CACHE_SESSIONS", "1000"))
+    MEMORY_HISTORY_SIZE = int(os.getenv("MEMORY_HISTORY_SIZE", "20"))
+    MEMORY_CACHE_TTL = float(os.getenv("MEMORY_CACHE_TTL", "1800"))
+    MEMORY_FLUSH_BATCH_SIZE = int(os.getenv("MEMORY_FLUSH_BATCH_SIZE", "100"))
+    MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "1.0"))
+    MEMORY_RETENTION_DAYS = float(os.getenv("MEMORY_RETENTION_DAYS", "90"))
+    MEMORY_PRUNE_INTERVAL = float(os.getenv("MEMORY_PRUNE_INTERVAL", "3600"))
+    MEMORY_MAX_PENDING = int(os.getenv("MEMORY_MAX_PENDING", "10000"))
+    # Token budget for the prompt sent to the LLM and the cap on any single history message
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_MAX_MESSAGE_TOKENS = int(os.getenv("CONTEXT_MAX_MESSAGE_TOKENS", "400"))
+    # SSE chat streaming: heartbeat period, chunk coalescing window/size and producer queue bound
+    STREAM_HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", "15"))
+    STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", "0.05"))
+    STREAM_MAX_BATCH_CHARS = int(os.getenv("STREAM_MAX_BATCH_CHARS", "512"))
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+    # Audit event pipeline: queue bound, what to do when it is full (block, drop_newest or
+    # drop_oldest), how long "block" may wait, and the writer's batch size and interval
+    ACTIVITY_QUEUE_SIZE = int(os.getenv("ACTIVITY_QUEUE_SIZE", "10000"))
+    ACTIVITY_OVERFLOW_POLICY = os.getenv("ACTIVITY_OVERFLOW_POLICY", "block")
+    ACTIVITY_BLOCK_TIMEOUT = float(os.getenv("ACTIVITY_BLOCK_TIMEOUT", "0.1"))
+    ACTIVITY_FLUSH_BATCH_SIZE = int(os.getenv("ACTIVITY_FLUSH_BATCH_SIZE", "500"))
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "1.0"))
+    # Notification outbox: transport ("file" or "smtp"), dispatcher workers, batch size,
+    # messages per second across all workers (0 = unlimited) and retry policy
+    NOTIFICATION_TRANSPORT = os.getenv("NOTIFICATION_TRANSPORT", "file")
+    NOTIFICATION_FILE_PATH = os.getenv("NOTIFICATION_FILE_PATH", "./storage/notifications.jsonl")
+    NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "4"))
+    NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))
+    NOTIFICATION_RATE_LIMIT = float(os.getenv("NOTIFICATION_RATE_LIMIT", "0"))
+    NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+    NOTIFICATION_RETRY_BASE_DELAY = float(os.getenv("NOTIFICATION_RETRY_BASE_DELAY", "2.0"))
+    NOTIFICATION_POLL_INTERVAL = float(os.getenv("NOTIFICATION_POLL_INTERVAL", "1.0"))
+    NOTIFICATION_CLAIM_TIMEOUT = float(os.getenv("NOTIFICATION_CLAIM_TIMEOUT", "300"))
+    # SMTP transport; point it at a local debug server (e.g. python -m aiosmtpd -n -l localhost:1025)
+    SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+    SMTP_SENDER = os.getenv("SMTP_SENDER", "noreply@campus.local")
+    SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "false").lower() == "true"
+    # Time-series rollups: seconds a rollup may lag before a read brings it up to date,
+    # source rows aggregated per incremental step, and how many ids below the newest one
+    # (for how many seconds) are rechecked in case their transaction commits late
+    ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "5"))
+    ANALYTICS_ROLLUP_CHUNK_SIZE = int(os.getenv("ANALYTICS_ROLLUP_CHUNK_SIZE", "50000"))
+    ANALYTICS_ROLLUP_LAG_IDS = int(os.getenv("ANALYTICS_ROLLUP_LAG_IDS", "1000"))
+    ANALYTICS_ROLLUP_LAG_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_LAG_SECONDS", "300"))
+    # Live dashboard feed: seconds a burst of writes is coalesced for, and per-subscriber backlog
+    ANALYTICS_STREAM_INTERVAL = float(os.getenv("ANALYTICS_STREAM_INTERVAL", "1.0"))
+    ANALYTICS_STREAM_QUEUE_SIZE = int(os.getenv("ANALYTICS_STREAM_QUEUE_SIZE", "16"))
+    # Bulk import: rows per INSERT, and bytes of an upload held in memory before it spools to disk
+    BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+    BULK_IMPORT_SPOOL_BYTES = int(os.getenv("BULK_IMPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+    # Bulk update/delete: rows (and bound IDs) per set-based statement, kept under SQLite's variable limit
+    BULK_UPDATE_CHUNK_SIZE = int(os.getenv("BULK_UPDATE_CHUNK_SIZE", "900"))
+    # Student search: "auto" uses SQLite FTS5 when available, otherwise an in-memory trigram index.
+    # The trigram index is per worker process: with several workers it is rebuilt after other workers'
+    # writes and searches fall back to a slower SQL LIKE scan meanwhile, so prefer FTS5 there
+    STUDENT_SEARCH_BACKEND = os.getenv("STUDENT_SEARCH_BACKEND", "auto")
+    STUDENT_SEARCH_MIN_SIMILARITY = float(os.getenv("STUDENT_SEARCH_MIN_SIMILARITY", "0.5"))
+    # Prometheus /metrics instrumentation, slow-request logging threshold (0 disables it)
+    # and the sampling profiler, which can also be toggled at runtime
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+    PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.01"))
+    # With several workers, seconds between each worker publishing its metrics for /metrics to merge
+    METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "10"))
+    # Seconds between background recounts of the analytics counters; 0 disables reconciliation
+    COUNTERS_RECONCILE_INTERVAL = float(os.getenv("COUNTERS_RECONCILE_INTERVAL", "0"))
+    # Server address and worker processes; more than one pre-forks the app (python -m backend.main)
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+    # State the workers share (data versions, counters, session memory, rate limits): memory://,
+    # sqlite:///path or redis://host:port/db. Empty means memory:// for one worker, a temp SQLite file for more.
+    # Workers check for other workers' writes at least every SHARED_STATE_SYNC_INTERVAL seconds.
+    SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+    SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "campus:")
+    SHARED_STATE_SYNC_INTERVAL = float(os.getenv("SHARED_STATE_SYNC_INTERVAL", "0.5"))
 
 settings = Settings()
\ No newline at end of file
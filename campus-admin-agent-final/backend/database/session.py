@@ -1,8 +1,27 @@
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy.orm import Session
 from backend.models.database import SessionLocal
 
-def get_db():
+# Session bound to the current request by get_db, shared by every tool call it makes
+_request_db: ContextVar[Optional[Session]] = ContextVar("request_db", default=None)
+
+async def get_db():
     db = SessionLocal()
+    _request_db.set(db)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        _request_db.set(None)
+        db.close()
+
+def get_session() -> Session:
+    """Return the current request's session if there is one, otherwise a new session.
+
+    Always pair with ``release_session`` so that only sessions opened here are closed.
+    """
+    return _request_db.get() or SessionLocal()
+
+def release_session(db: Session):
+    if db is not _request_db.get():
+        db.close()
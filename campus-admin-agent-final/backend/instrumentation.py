@@ -0,0 +1,396 @@
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from backend.config import settings
+
+# Latency buckets in seconds: requests, tools and LLM calls, and the much faster database queries
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+RATE_BUCKETS = (5, 10, 25, 50, 100, 200, 400, 800, 1600)
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class CounterMetric:
+    """Monotonic counter per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: Any, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self, constant: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels, constant)} {_format_value(value)}")
+        return lines
+
+class HistogramMetric:
+    """Cumulative-bucket histogram per label combination, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: Any):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict[Tuple, Dict[str, float]]:
+        with self._lock:
+            return {labels: {"count": sum(counts), "sum": total} for labels, (counts, total) in self._series.items()}
+
+    def render(self, constant: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                le_label = f'{constant},le="{le}"' if constant else f'le="{le}"'
+                bucket_labels = _format_labels(self.labelnames, labels, le_label)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels, constant)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Every metric the process exposes, plus gauges read from existing ``metrics()`` methods at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> CounterMetric:
+        metric = CounterMetric(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> HistogramMetric:
+        metric = HistogramMetric(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]):
+        self._gauges.append((name, documentation, read))
+
+    def render(self, constant_labels: Optional[Dict[str, Any]] = None) -> str:
+        """Prometheus text for every metric; ``constant_labels`` (e.g. ``worker_pid``) are added to each sample."""
+        constant = ",".join(f'{name}="{_escape(value)}"' for name, value in (constant_labels or {}).items())
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render(constant))
+        for name, documentation, read in self._gauges:
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge",
+                      f"{name}{_format_labels((), (), constant)} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+def merge_rendered(texts: Sequence[str]) -> str:
+    """Combine ``MetricsRegistry.render`` outputs of several processes under one HELP/TYPE header per metric.
+
+    The samples must already be told apart by a label such as ``worker_pid``.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for text in texts:
+        name = None
+        for line in text.splitlines():
+            if line.startswith("# HELP "):
+                name = line.split(" ", 3)[2]
+                headers.setdefault(name, [line])
+            elif line.startswith("# TYPE "):
+                if len(headers[name]) == 1:
+                    headers[name].append(line)
+            elif line:
+                samples.setdefault(name, []).append(line)
+    lines: List[str] = []
+    for name, header in headers.items():
+        lines += header + samples.get(name, [])
+    return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    "campus_http_request_duration_seconds", "HTTP request latency, until the last body chunk is sent",
+    ("method", "route", "status"))
+REQUEST_DB_QUERIES = registry.histogram(
+    "campus_http_request_db_queries", "Database queries issued while serving one HTTP request",
+    ("route",), COUNT_BUCKETS)
+SLOW_REQUESTS = registry.counter(
+    "campus_http_slow_requests_total", "Requests slower than SLOW_REQUEST_THRESHOLD_MS", ("route",))
+TOOL_DURATION = registry.histogram(
+    "campus_tool_duration_seconds", "Tool execution time, including cache lookups", ("tool", "outcome"))
+QUERY_DURATION = registry.histogram(
+    "campus_db_query_duration_seconds", "Database statement execution time", ("operation", "table"), QUERY_BUCKETS)
+MEMORY_DURATION = registry.histogram(
+    "campus_memory_duration_seconds", "Conversation memory load/save time", ("operation",))
+MEMORY_DROPPED_TURNS = registry.counter(
+    "campus_memory_dropped_turns_total", "Unwritten conversation turns dropped while the database kept failing")
+LLM_REQUEST_DURATION = registry.histogram(
+    "campus_llm_request_duration_seconds", "LLM completion time, including retries", ("mode", "outcome"))
+LLM_TIME_TO_FIRST_TOKEN = registry.histogram(
+    "campus_llm_time_to_first_token_seconds", "Time from sending a streaming completion to its first content delta")
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    "campus_llm_tokens_per_second", "Streamed content deltas per second after the first one", (), RATE_BUCKETS)
+LLM_TOKENS = registry.counter("campus_llm_output_tokens_total", "Streamed content deltas received from the LLM")
+
+class RequestStats:
+    """Database work done on behalf of one request, shared with the tool threads it uses."""
+    __slots__ = ("queries", "query_seconds", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+
+# Set by the middleware; the tool executor copies context, so its threads count into the same object
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+[\"`]?(\w+)", re.IGNORECASE)
+_statement_labels: Dict[str, Tuple[str, str]] = {}
+
+def _query_labels(statement: str) -> Tuple[str, str]:
+    # Statements come from a bounded set of queries, so classify each distinct one only once
+    labels = _statement_labels.get(statement)
+    if labels is None:
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        match = _TABLE_PATTERN.search(statement)
+        labels = (operation, match.group(1).lower() if match else "")
+        if len(_statement_labels) < 4096:
+            _statement_labels[statement] = labels
+    return labels
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started_at"].pop()
+    elapsed = time.perf_counter() - started
+    QUERY_DURATION.observe(elapsed, *_query_labels(statement))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add_query(elapsed)
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started_at") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(db_engine):
+    """Time every statement the engine runs and attribute it to the current request."""
+    from sqlalchemy import event
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(db_engine, "handle_error", _handle_error)
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and database query counts, and logging slow requests.
+
+    Written as plain ASGI rather than ``BaseHTTPMiddleware`` so streamed
+    responses pass straight through; a request is timed until its last body
+    chunk is sent.
+    """
+
+    def __init__(self, app, slow_request_ms: float = settings.SLOW_REQUEST_THRESHOLD_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            # Label by the route template, never the raw path, to keep the label set bounded
+            app = scope.get("app")
+            for route in getattr(app, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            else:
+                path = getattr(endpoint, "__name__", "<unknown>")
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        event_stream = False
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = any(name == b"content-type" and value.startswith(b"text/event-stream")
+                                   for name, value in message.get("headers", ()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = self._route(scope)
+            REQUEST_DURATION.observe(elapsed, scope["method"], route, status)
+            REQUEST_DB_QUERIES.observe(stats.queries, route)
+            # Event streams stay open by design, so their duration says nothing about slowness
+            if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms and not event_stream:
+                SLOW_REQUESTS.inc(route)
+                print(f"Slow request: {scope['method']} {scope['path']} -> {status} in {elapsed * 1000:.0f} ms "
+                      f"({stats.queries} queries, {stats.query_seconds * 1000:.0f} ms in the database)")
+
+class Timer:
+    """``with Timer(histogram, *labels):`` observes the block's duration."""
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: HistogramMetric, *labels: Any):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler: a daemon thread samples every thread's stack.
+
+    Samples are aggregated as collapsed stacks (``frame;frame;frame count``),
+    the input format of flame graph tools. Meant to be switched on briefly
+    while a latency problem is happening, not left running. It samples only
+    the process it runs in, i.e. one worker when there are several.
+    """
+
+    def __init__(self, interval: float = settings.PROFILER_INTERVAL, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, reset: bool = True) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            if interval:
+                self.interval = interval
+            if reset:
+                self._stacks.clear()
+                self.samples = 0
+            self.started_at = time.time()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self) -> bool:
+        thread = self._thread
+        if thread is None:
+            return False
+        self._stopping.set()
+        thread.join(5)
+        self._thread = None
+        return True
+
+    def _collapse(self, frame) -> str:
+        # Walk the frames directly; traceback.extract_stack would also read source lines
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            frames = sys._current_frames()
+            sampled = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                sampled.append(self._collapse(frame))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+
+    def collapsed(self, limit: int = 0) -> str:
+        with self._lock:
+            stacks = self._stacks.most_common(limit or None)
+        return "\n".join(f"{stack} {count}" for stack, count in stacks) + ("\n" if stacks else "")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "running": self.running,
+                "interval": self.interval,
+                "samples": self.samples,
+                "distinct_stacks": len(self._stacks),
+                "started_at": self.started_at,
+            }
+
+profiler = SamplingProfiler()
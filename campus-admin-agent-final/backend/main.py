@@ -1,23 +1,133 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
-from backend.models.database import init_db
-from backend.api import chat, students, analytics
+from backend.models.database import init_db, pool_metrics, engine
+from backend.api import chat, students, analytics, notifications, metrics
+from backend.tools.counters import counters
+from backend.agent.memory import memory_store
+from backend.tools.executor import tool_executor, ExecutorSaturated
+from backend.tools.cache import tool_cache, response_cache, student_version
+from backend.tools.campus_faq import ingest_faq_documents
+from backend.tools.student_search import student_index
+from backend.tools.activity_log import activity_logger
+from backend.tools.notifications import notification_dispatcher
+from backend.tools.campus_analytics import rollup_engine
+from backend.tools.analytics_feed import dashboard_feed
+from backend.instrumentation import MetricsMiddleware, registry, profiler
+from backend.startup import startup_state
+from backend.shared_state import is_cross_process, shared_state
+from backend.config import settings
 from contextlib import asynccontextmanager
+from sqlalchemy import text
+import asyncio
+import os
+
+async def reconcile_counters(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await asyncio.to_thread(counters.reconcile):
+                print("Analytics counters drifted from the database and were repaired")
+        except Exception as e:
+            print(f"Error reconciling analytics counters: {e}")
+
+async def sync_shared_state(interval: float):
+    """Pick up other workers' writes even while this worker serves no reads (e.g. for the dashboard feed)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(student_version.sync)
+        except Exception as e:
+            print(f"Error syncing shared state: {e}")
+
+def prune_memory() -> int:
+    pruned = memory_store.prune(settings.MEMORY_RETENTION_DAYS)
+    if pruned:
+        print(f"Pruned {pruned} conversation turns older than {settings.MEMORY_RETENTION_DAYS:g} days")
+    return pruned
 
-init_db()
+async def prune_memory_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(prune_memory)
+        except Exception as e:
+            print(f"Error pruning conversation memory: {e}")
+
+async def publish_metrics_periodically(interval: float):
+    """Let whichever worker gets scraped include this worker's metrics."""
+    while True:
+        try:
+            await asyncio.to_thread(metrics.publish_worker_metrics)
+        except Exception as e:
+            print(f"Error publishing worker metrics: {e}")
+        await asyncio.sleep(interval)
+
+def warm_up():
+    """Pay one-off costs before the first request would: the Groq SDK import and a pooled connection."""
+    chat.agent.warm_up()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup: schema checks run here once per process, never at import time
     print("Starting up...")
-    init_db()
+    startup_state.begin_startup()
+    await startup_state.run_phase("schema", init_db)
+    # Counts a shared store already holds (e.g. when one of several workers restarts) are kept
+    await startup_state.run_phase("counters", counters.ensure_built)
+    await startup_state.run_phase("notifications", notification_dispatcher.start)
+    background = [
+        # Readiness waits for the warm-up; the rest have fallbacks and only catch up in the background
+        startup_state.run_in_background("warm_up", warm_up),
+        startup_state.run_in_background("memory_prune", prune_memory, required=False),
+        # Index new or changed FAQ documents; searches use the existing index meanwhile
+        startup_state.run_in_background("faq_index", ingest_faq_documents, required=False),
+        # Likewise build the student search index; searches use a LIKE scan until it is ready
+        startup_state.run_in_background("student_search", student_index.setup, required=False),
+        # Catch the analytics rollups up with rows written since the last run
+        startup_state.run_in_background("analytics_rollups", rollup_engine.refresh_if_stale, required=False),
+    ]
+    if settings.PROFILER_ENABLED:
+        profiler.start()
+    reconcile_task = None
+    if settings.COUNTERS_RECONCILE_INTERVAL > 0:
+        reconcile_task = asyncio.create_task(reconcile_counters(settings.COUNTERS_RECONCILE_INTERVAL))
+    prune_task = None
+    if settings.MEMORY_PRUNE_INTERVAL > 0:
+        prune_task = asyncio.create_task(prune_memory_periodically(settings.MEMORY_PRUNE_INTERVAL))
+    sync_task = None
+    if is_cross_process(shared_state) and settings.SHARED_STATE_SYNC_INTERVAL > 0:
+        sync_task = asyncio.create_task(sync_shared_state(settings.SHARED_STATE_SYNC_INTERVAL))
+    metrics_task = None
+    if settings.SERVER_WORKERS > 1 and settings.METRICS_PUBLISH_INTERVAL > 0:
+        metrics_task = asyncio.create_task(publish_metrics_periodically(settings.METRICS_PUBLISH_INTERVAL))
+    startup_state.startup_complete()
     
     yield
     
     # Shutdown - clean up resources
     print("Shutting down...")
-    # Add any cleanup logic here
+    if reconcile_task:
+        reconcile_task.cancel()
+    if prune_task:
+        prune_task.cancel()
+    if sync_task:
+        sync_task.cancel()
+    if metrics_task:
+        metrics_task.cancel()
+    await dashboard_feed.close()
+    await asyncio.gather(*background, return_exceptions=True)
+    await chat.agent.aclose()
+    await asyncio.to_thread(memory_store.close)
+    await asyncio.to_thread(activity_logger.close)
+    await asyncio.to_thread(notification_dispatcher.stop)
+    await asyncio.to_thread(profiler.stop)
 
 app = FastAPI(
     title="Campus Admin Agent API",
@@ -34,9 +144,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Point-in-time gauges, read from the components' own metrics when /metrics is scraped
+registry.gauge("campus_tool_executor_queued", "Tool calls waiting for an executor thread",
+               lambda: tool_executor.metrics()["queued"])
+registry.gauge("campus_tool_executor_running", "Tool calls running on executor threads",
+               lambda: tool_executor.metrics()["running"])
+registry.gauge("campus_db_pool_checked_out", "Database connections currently checked out",
+               lambda: pool_metrics()["checked_out"])
+registry.gauge("campus_llm_in_flight", "LLM completions in progress",
+               lambda: (chat.agent.llm_metrics() or {}).get("in_flight", 0))
+registry.gauge("campus_memory_pending_writes", "Conversation turns waiting to be written",
+               lambda: memory_store.metrics()["pending_writes"])
+registry.gauge("campus_activity_log_queued", "Audit events waiting to be written",
+               lambda: activity_logger.metrics()["queued"])
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 app.include_router(chat.router)
 app.include_router(students.router)
 app.include_router(analytics.router)
+app.include_router(notifications.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -47,14 +180,54 @@ async def root():
             "chat": "/chat",
             "chat_stream": "/chat/stream",
             "students": "/students",
-            "analytics": "/analytics"
+            "analytics": "/analytics",
+            "analytics_stream": "/analytics/stream",
+            "notifications": "/notifications",
+            "metrics": "/metrics"
         }
     }
 
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving; says nothing about its dependencies."""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once startup and warm-up have finished, 503 until then (take no traffic yet)."""
+    report = startup_state.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503,
+                        content={"status": "ready" if report["ready"] else "starting", **report})
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    return {
+        "status": "healthy",
+        "ready": startup_state.ready,
+        "timestamp": datetime.utcnow().isoformat(),
+        "worker_pid": os.getpid(),
+        "startup": startup_state.report(),
+        "tool_executor": tool_executor.metrics(),
+        "db_pool": pool_metrics(),
+        "conversation_memory": memory_store.metrics(),
+        "llm": chat.agent.llm_metrics(),
+        "tool_cache": tool_cache.metrics(),
+        "response_cache": response_cache.metrics(),
+        "student_search": student_index.metrics(),
+        "activity_log": activity_logger.metrics(),
+        "notifications": notification_dispatcher.metrics(),
+        "analytics_rollups": rollup_engine.metrics(),
+        "dashboard_feed": dashboard_feed.metrics(),
+        "shared_state": {
+            "backend": type(shared_state).__name__,
+            "cross_process": is_cross_process(shared_state),
+            "external_changes": student_version.external_changes,
+        },
+        "profiler": profiler.metrics()
+    }
+
+startup_state.import_seconds = time.perf_counter() - _import_started
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    from backend.server import serve
+    serve(app)
\ No newline at end of file
@@ -1,10 +1,101 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import create_engine, event, inspect, text, Index, UniqueConstraint, Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from datetime import datetime
+from typing import Dict, Any
+import threading
+import time
 from backend.config import settings
+from backend.instrumentation import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout counts and how long callers waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        except Exception:
+            with self._metrics_lock:
+                self.checkout_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size={-settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_db_engine(database_url: str = settings.DATABASE_URL):
+    """Build an engine with pooling and connection tuning suited to the backend.
+
+    SQLite gets WAL journaling and tuned pragmas on every new connection; other
+    backends get a sized QueuePool with pre-ping and connection recycling.
+    """
+    url = make_url(database_url)
+    options: Dict[str, Any] = {"query_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if not url.database or url.database == ":memory:":
+            # One shared connection, otherwise every pool thread would see its own empty database
+            options["poolclass"] = StaticPool
+        else:
+            options.update(poolclass=TimedQueuePool, pool_size=settings.DB_POOL_SIZE,
+                           max_overflow=settings.DB_MAX_OVERFLOW, pool_timeout=settings.DB_POOL_TIMEOUT)
+        db_engine = create_engine(database_url, **options)
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+        return db_engine
+
+    return create_engine(
+        database_url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        **options
+    )
+
+def pool_metrics() -> Dict[str, Any]:
+    pool = engine.pool
+    metrics: Dict[str, Any] = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, TimedQueuePool):
+        with pool._metrics_lock:
+            metrics.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checkouts": pool.checkouts,
+                "checkout_timeouts": pool.checkout_timeouts,
+                "avg_wait_ms": 1000 * pool.total_wait_seconds / pool.checkouts if pool.checkouts else 0.0,
+                "max_wait_ms": 1000 * pool.max_wait_seconds,
+            })
+    return metrics
+
+engine = create_db_engine()
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -17,6 +108,11 @@ class Student(Base):
     email = Column(String, nullable=False)
     onboarded_at = Column(DateTime, default=datetime.utcnow)
     active = Column(Boolean, default=True)
+    # Number of department moves so far; numbers the idempotency keys of their notices
+    department_changes = Column(Integer, nullable=True)
+
+    # Never reuse the id of a deleted row: analytics rollups only count ids above their watermark
+    __table_args__ = {"sqlite_autoincrement": True}
 
 class ConversationMemory(Base):
     __tablename__ = "conversation_memory"
@@ -24,14 +120,113 @@ class ConversationMemory(Base):
     session_id = Column(String, index=True)
     role = Column(String)
     message = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_conversation_memory_session_created", "session_id", "created_at"),
+        {"sqlite_autoincrement": True},
+    )
 
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(String, index=True)
     event_type = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    details = Column(Text, nullable=True)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String, unique=True, nullable=False)
+    channel = Column(String, default="email")
+    recipient = Column(String, nullable=False)
+    student_id = Column(String, index=True)
+    subject = Column(String)
+    body = Column(Text)
+    status = Column(String, default="pending")
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class AnalyticsRollup(Base):
+    __tablename__ = "analytics_rollups"
+    id = Column(Integer, primary_key=True)
+    metric = Column(String, nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    dimension = Column(String, nullable=False, default="")
+    value = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("metric", "bucket", "dimension", name="uq_analytics_rollups_metric_bucket_dimension"),
+    )
+
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+    metric = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    # JSON [[id, first_seen], ...] of missing ids below last_id that may still commit
+    pending_ids = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+def _add_missing_columns():
+    """Add nullable columns introduced since a table was created; create_all never alters tables."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    ))
+
+def _enable_sqlite_autoincrement():
+    """Rebuild SQLite tables created before they were declared AUTOINCREMENT; SQLite cannot alter that in place."""
+    if engine.dialect.name != "sqlite":
+        return
+    for table in Base.metadata.sorted_tables:
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        with engine.begin() as conn:
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {"name": table.name}).scalar()
+            if ddl is None or "AUTOINCREMENT" in ddl.upper():
+                continue
+            # Indexes keep their names through a rename and triggers would follow it, so set both aside
+            dependents = conn.execute(text(
+                "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = :name AND type IN ('index', 'trigger') "
+                "AND sql IS NOT NULL"
+            ), {"name": table.name}).all()
+            for kind, name, _ in dependents:
+                conn.execute(text(f'DROP {kind.upper()} "{name}"'))
+            conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {table.name}__rebuild'))
+            table.create(conn)
+            columns = ", ".join(column.name for column in table.columns)
+            conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {table.name}__rebuild"))
+            conn.execute(text(f"DROP TABLE {table.name}__rebuild"))
+            for kind, _, sql in dependents:
+                if kind == "trigger":
+                    conn.exec_driver_sql(sql)
+            print(f"Rebuilt table {table.name} with AUTOINCREMENT ids")
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _enable_sqlite_autoincrement()
+    # create_all skips tables that already exist, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
\ No newline at end of file
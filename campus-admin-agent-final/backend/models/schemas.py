@@ -0,0 +1,83 @@
+import collections.abc
+import inspect
+import typing
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Tools that take **kwargs cannot describe their fields through the signature alone
+VAR_KEYWORD_PROPERTIES: Dict[str, Dict[str, Any]] = {
+    "update_student": {
+        "name": {"type": "string"},
+        "email": {"type": "string"},
+        "department": {"type": "string"},
+        "active": {"type": "boolean"},
+    },
+}
+
+_SCALAR_TYPES = {
+    str: {"type": "string"},
+    int: {"type": "integer"},
+    float: {"type": "number"},
+    bool: {"type": "boolean"},
+    datetime: {"type": "string", "format": "date-time"},
+}
+
+def _unwrap_optional(annotation):
+    if typing.get_origin(annotation) is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+def json_schema_for(annotation) -> Dict[str, Any]:
+    """JSON schema for a type annotation as used in the tool signatures."""
+    annotation = _unwrap_optional(annotation)
+    if annotation in _SCALAR_TYPES:
+        return dict(_SCALAR_TYPES[annotation])
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (list, tuple, set, collections.abc.Sequence, collections.abc.Iterable):
+        return {"type": "array", "items": json_schema_for(args[0]) if args else {}}
+    if origin is dict or annotation is dict:
+        return {"type": "object"}
+    return {}
+
+def tool_schema(name: str, func: Callable) -> Dict[str, Any]:
+    """OpenAI/Groq function-calling schema generated from a tool's signature and docstring."""
+    hints = typing.get_type_hints(func)
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    for param in inspect.signature(func).parameters.values():
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            properties.update(VAR_KEYWORD_PROPERTIES.get(name, {}))
+            continue
+        if param.kind == inspect.Parameter.VAR_POSITIONAL:
+            continue
+        properties[param.name] = json_schema_for(hints.get(param.name, Any))
+        if param.default is inspect.Parameter.empty:
+            required.append(param.name)
+    doc = inspect.getdoc(func)
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": doc.split("\n\n")[0].replace("\n", " ") if doc else name.replace("_", " ").capitalize(),
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        },
+    }
+
+def build_tool_schemas(tools: Dict[str, Callable]) -> List[Dict[str, Any]]:
+    return [tool_schema(name, func) for name, func in tools.items()]
+
+def coerce_arguments(func: Callable, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert JSON arguments from the model to the types the tool expects (e.g. ISO strings to datetime)."""
+    hints = typing.get_type_hints(func)
+    coerced = {}
+    for key, value in arguments.items():
+        if _unwrap_optional(hints.get(key)) is datetime and isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if value.tzinfo is not None:
+                # Timestamps are stored as naive UTC
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        coerced[key] = value
+    return coerced
@@ -0,0 +1,121 @@
+import os
+import signal
+import socket
+import time
+from typing import Dict
+from backend.config import settings
+
+# A worker that dies sooner than this after starting is restarted only after a pause, to avoid a crash loop
+_MIN_WORKER_LIFETIME = 1.0
+
+def preload():
+    """One-off work done in the parent before forking, so workers inherit it copy-on-write.
+
+    Covers the slow imports (the Groq SDK, numpy through the FAQ index), the
+    schema check and the FAQ index, which each worker would otherwise repeat
+    at the same moment. The shared counters are recounted here too, while no
+    worker can be writing, so workers keep them rather than rebuilding over
+    each other's increments. Connections opened here are closed before forking.
+    """
+    from backend.models.database import init_db, engine
+    from backend.tools.campus_faq import ingest_faq_documents
+    from backend.tools.counters import counters
+    from backend.api import chat
+
+    init_db()
+    counters.rebuild()
+    result = ingest_faq_documents()
+    if "error" in result:
+        print(f"FAQ index preload failed: {result['error']}")
+    chat.agent.warm_up()
+    engine.dispose()
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(app, sock: socket.socket):
+    import uvicorn
+    from backend.models.database import engine
+
+    # Pooled connections must never be shared with the parent or sibling workers
+    engine.dispose(close=False)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="on"))
+    server.run(sockets=[sock])
+
+def serve(app, host: str = settings.SERVER_HOST, port: int = settings.SERVER_PORT,
+          workers: int = settings.SERVER_WORKERS):
+    """Serve ``app`` with one process, or pre-fork ``workers`` processes sharing one listening socket.
+
+    The parent preloads the app, binds the socket, forks the workers and
+    restarts any that die; SIGINT or SIGTERM is passed on to every worker
+    for a graceful shutdown. Each worker runs the app's lifespan itself.
+    Workers coordinate through the shared state store, so it must be one
+    that other processes can see (the default with several workers).
+    """
+    import uvicorn
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    from backend.shared_state import is_cross_process, shared_key, shared_state
+    if not is_cross_process(shared_state):
+        raise SystemExit(f"SERVER_WORKERS={workers} needs a cross-process SHARED_STATE_URL "
+                         f"(sqlite:///path or redis://), not {settings.SHARED_STATE_URL}")
+    # A new epoch, so ETags handed out before this start can never match again
+    shared_state.delete(shared_key("epoch"))
+    preload()
+    from backend.models.database import engine
+    if settings.STUDENT_SEARCH_BACKEND == "trigram" or engine.dialect.name != "sqlite":
+        print("Warning: the in-memory trigram search index is per worker and is rebuilt after every other "
+              "worker's write; use SQLite FTS5 (STUDENT_SEARCH_BACKEND=auto) with several workers")
+    sock = _bind(host, port)
+    print(f"Serving on {host}:{port} with {workers} worker processes")
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                _run_worker(app, sock)
+                status = 0
+            finally:
+                os._exit(status)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started_at = children.pop(pid, None)
+        if stopping or started_at is None:
+            continue
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        if time.monotonic() - started_at < _MIN_WORKER_LIFETIME:
+            time.sleep(_MIN_WORKER_LIFETIME)
+        if not stopping:
+            spawn()
+    sock.close()
@@ -0,0 +1,315 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from backend.config import settings
+
+# Expired keys are only dropped when touched, so sweep them every this many writes
+_PURGE_EVERY = 1000
+
+def shared_key(name: str) -> str:
+    return settings.SHARED_STATE_PREFIX + name
+
+def _redis_range(values: List[Any], start: int, end: int) -> List[Any]:
+    """``values[start..end]`` with Redis' inclusive, negative-aware LRANGE/LTRIM indexes."""
+    n = len(values)
+    if start < 0:
+        start = max(n + start, 0)
+    if end < 0:
+        end = n + end
+    return values[start:end + 1]
+
+class _CommandStore(ABC):
+    """Redis command semantics over a key -> (value, expires_at) map.
+
+    Implements the subset of redis-py's client API the app uses, with the
+    same argument names and return values (strings, as with
+    ``decode_responses=True``), so a real ``redis.Redis`` client can stand
+    in for either subclass. Subclasses provide the storage and make each
+    command atomic.
+    """
+
+    cross_process = False
+
+    def __init__(self):
+        self._writes = 0
+
+    @abstractmethod
+    def _atomic(self, write: bool = True):
+        """Context manager making the commands inside it one atomic operation."""
+
+    @abstractmethod
+    def _fetch(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """``(value, expires_at)`` for a live key, or None."""
+
+    @abstractmethod
+    def _put(self, key: str, value: Any, expires_at: Optional[float]):
+        pass
+
+    @abstractmethod
+    def _remove(self, keys: Tuple[str, ...]) -> int:
+        """Delete ``keys``; returns how many existed."""
+
+    @abstractmethod
+    def _purge_expired(self):
+        pass
+
+    def _typed(self, key: str, kind: type, default):
+        entry = self._fetch(key)
+        if entry is None:
+            return default, None
+        if not isinstance(entry[0], kind):
+            raise TypeError(f"WRONGTYPE Operation against key {key} holding the wrong kind of value")
+        return entry
+
+    def _write(self, key: str, value: Any, expires_at: Optional[float]):
+        self._put(key, value, expires_at)
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            self._purge_expired()
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, name: str) -> Optional[str]:
+        with self._atomic(write=False):
+            return self._typed(name, str, None)[0]
+
+    def set(self, name: str, value: Any, ex: Optional[float] = None, nx: bool = False) -> Optional[bool]:
+        with self._atomic():
+            if nx and self._fetch(name) is not None:
+                return None
+            self._write(name, str(value), time.time() + ex if ex else None)
+            return True
+
+    def delete(self, *names: str) -> int:
+        with self._atomic():
+            return self._remove(names)
+
+    def expire(self, name: str, time_seconds: float) -> bool:
+        with self._atomic():
+            entry = self._fetch(name)
+            if entry is None:
+                return False
+            self._write(name, entry[0], time.time() + time_seconds)
+            return True
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._atomic():
+            value, expires_at = self._typed(name, str, "0")
+            value = int(value) + amount
+            self._write(name, str(value), expires_at)
+            return value
+
+    def incrbyfloat(self, name: str, amount: float = 1.0) -> float:
+        with self._atomic():
+            value, expires_at = self._typed(name, str, "0")
+            value = float(value) + amount
+            self._write(name, repr(value), expires_at)
+            return value
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._atomic(write=False):
+            return self._typed(name, dict, {})[0].get(key)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._atomic(write=False):
+            return dict(self._typed(name, dict, {})[0])
+
+    def hset(self, name: str, key: Optional[str] = None, value: Any = None,
+             mapping: Optional[Dict[str, Any]] = None) -> int:
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        with self._atomic():
+            current, expires_at = self._typed(name, dict, {})
+            added = sum(1 for field in items if field not in current)
+            self._write(name, {**current, **{field: str(v) for field, v in items.items()}}, expires_at)
+            return added
+
+    def hsetnx(self, name: str, key: str, value: Any) -> bool:
+        with self._atomic():
+            current, expires_at = self._typed(name, dict, {})
+            if key in current:
+                return False
+            self._write(name, {**current, key: str(value)}, expires_at)
+            return True
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._atomic():
+            current, expires_at = self._typed(name, dict, {})
+            value = int(current.get(key, 0)) + amount
+            self._write(name, {**current, key: str(value)}, expires_at)
+            return value
+
+    def hdel(self, name: str, *keys: str) -> int:
+        with self._atomic():
+            current, expires_at = self._typed(name, dict, {})
+            remaining = {field: v for field, v in current.items() if field not in keys}
+            if not remaining:
+                self._remove((name,))
+            elif len(remaining) != len(current):
+                self._write(name, remaining, expires_at)
+            return len(current) - len(remaining)
+
+    def rpush(self, name: str, *values: Any) -> int:
+        with self._atomic():
+            current, expires_at = self._typed(name, list, [])
+            updated = current + [str(v) for v in values]
+            self._write(name, updated, expires_at)
+            return len(updated)
+
+    def ltrim(self, name: str, start: int, end: int) -> bool:
+        with self._atomic():
+            current, expires_at = self._typed(name, list, [])
+            kept = _redis_range(current, start, end)
+            if not kept:
+                self._remove((name,))
+            elif len(kept) != len(current):
+                self._write(name, kept, expires_at)
+            return True
+
+    def lrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._atomic(write=False):
+            return _redis_range(self._typed(name, list, [])[0], start, end)
+
+class InMemoryRedis(_CommandStore):
+    """Shared state for one process: a dict behind a lock.
+
+    The default for a single worker, and the in-process fake to swap in for
+    Redis in tests.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _atomic(self, write: bool = True) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def _fetch(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def _put(self, key: str, value: Any, expires_at: Optional[float]):
+        self._data[key] = (value, expires_at)
+
+    def _remove(self, keys: Tuple[str, ...]) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def _purge_expired(self):
+        now = time.time()
+        for key in [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]:
+            del self._data[key]
+
+    def flushall(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
+
+class SQLiteSharedState(_CommandStore):
+    """Shared state in a local SQLite file, for worker processes on one host.
+
+    Values (hashes and lists JSON-encoded) live one row per key in WAL mode,
+    so reads never block. Every write command runs in its own IMMEDIATE
+    transaction, which makes read-modify-write commands such as INCR or
+    HINCRBY atomic across processes. Each thread opens its own connection,
+    and a forked child never reuses its parent's.
+    """
+
+    cross_process = True
+
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        super().__init__()
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS shared_state "
+                         "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _atomic(self, write: bool = True) -> Iterator[None]:
+        if not write:
+            # A single SELECT already sees one consistent snapshot
+            yield
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _fetch(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _put(self, key: str, value: Any, expires_at: Optional[float]):
+        self._conn().execute("INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(value, separators=(",", ":")), expires_at))
+
+    def _remove(self, keys: Tuple[str, ...]) -> int:
+        if not keys:
+            return 0
+        placeholders = ",".join("?" for _ in keys)
+        return self._conn().execute(f"DELETE FROM shared_state WHERE key IN ({placeholders})", keys).rowcount
+
+    def _purge_expired(self):
+        self._conn().execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+
+    def flushall(self) -> bool:
+        with self._atomic():
+            self._conn().execute("DELETE FROM shared_state")
+        return True
+
+def is_cross_process(store) -> bool:
+    """Whether other processes see the same data (true for Redis clients, which lack the attribute)."""
+    return getattr(store, "cross_process", True)
+
+def shared_state_url() -> str:
+    """SHARED_STATE_URL, or by default in-process state for one worker and a SQLite file for several."""
+    if settings.SHARED_STATE_URL:
+        return settings.SHARED_STATE_URL
+    if settings.SERVER_WORKERS > 1:
+        path = os.path.join(tempfile.gettempdir(), f"campus-shared-state-{settings.SERVER_PORT}.db")
+        return f"sqlite:///{path}"
+    return "memory://"
+
+def create_shared_state(url: str):
+    """Store for ``memory://``, ``sqlite:///path`` or ``redis://`` URLs (the last needs the redis package)."""
+    if url.startswith("memory://"):
+        return InMemoryRedis()
+    if url.startswith("sqlite:///"):
+        return SQLiteSharedState(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+        return redis.Redis.from_url(url, decode_responses=True)
+    raise ValueError(f"Unsupported shared state URL: {url}. Use memory://, sqlite:///path or redis://")
+
+shared_state = create_shared_state(shared_state_url())
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class StartupState:
+    """Startup phases with their timings, for separating readiness from liveness.
+
+    The process is live as soon as it answers HTTP at all; it is ready once
+    every *required* phase has finished. Optional phases (index builds and
+    other background catch-up work with a slower fallback) are reported but
+    never hold readiness back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Dict[str, Any]] = {}
+        self.import_seconds: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+
+    def begin_startup(self):
+        with self._lock:
+            self._phases.clear()
+            self.started_at = time.perf_counter()
+            self.startup_seconds = None
+            self.ready_seconds = None
+
+    def startup_complete(self):
+        """Mark the end of the lifespan's startup, when the app starts serving."""
+        with self._lock:
+            self.startup_seconds = time.perf_counter() - self.started_at
+        self._check_ready()
+
+    def _set(self, name: str, **values):
+        with self._lock:
+            self._phases.setdefault(name, {}).update(values)
+
+    async def run_phase(self, name: str, func: Callable, *args, required: bool = True) -> Any:
+        """Run a blocking startup step in a thread and record how long it took.
+
+        Failures of required phases propagate (startup should fail loudly);
+        optional phases only record the error.
+        """
+        self._set(name, status="running", required=required)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(func, *args)
+        except Exception as e:
+            self._set(name, status="failed", error=str(e), seconds=round(time.perf_counter() - started, 3))
+            print(f"Startup phase {name} failed: {e}")
+            if required:
+                raise
+            return None
+        if isinstance(result, dict) and "error" in result:
+            self._set(name, status="failed", error=result["error"])
+        else:
+            self._set(name, status="done")
+        self._set(name, seconds=round(time.perf_counter() - started, 3))
+        self._check_ready()
+        return result
+
+    def run_in_background(self, name: str, func: Callable, *args, required: bool = True) -> "asyncio.Task":
+        """Start a phase without waiting for it; it counts against readiness from this moment."""
+        self._set(name, status="pending", required=required)
+        return asyncio.create_task(self.run_phase(name, func, *args, required=required))
+
+    def _check_ready(self):
+        with self._lock:
+            if self.ready_seconds is not None or self.startup_seconds is None:
+                return
+            if any(p["required"] and p["status"] != "done" for p in self._phases.values()):
+                return
+            self.ready_seconds = time.perf_counter() - self.started_at
+        print(f"Ready in {self.ready_seconds:.2f}s (imports {self.import_seconds or 0:.2f}s, "
+              f"startup {self.startup_seconds:.2f}s)")
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_seconds is not None
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready_seconds is not None,
+                "import_seconds": round(self.import_seconds, 3) if self.import_seconds is not None else None,
+                "startup_seconds": round(self.startup_seconds, 3) if self.startup_seconds is not None else None,
+                "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+                "phases": {name: dict(phase) for name, phase in self._phases.items()},
+            }
+
+startup_state = StartupState()
@@ -1,22 +1,86 @@
+import time
 from .student_management import (
     add_student, get_student, update_student, list_students, delete_student,
-    get_total_students, get_students_by_department
+    get_total_students, get_students_by_department, iter_students,
+    get_department_activity_breakdown, get_onboarding_counts, get_activity_event_counts,
+    import_students, StudentImport, bulk_update_students, bulk_delete_students
 )
+from .student_search import search_students, student_index
+from .activity_log import activity_logger, log_activity, get_activity_events
+from .campus_analytics import (
+    get_onboarding_timeseries, get_activity_timeseries, get_chat_volume_timeseries, rollup_engine
+)
+from .campus_faq import search_campus_faq, ingest_faq_documents, faq_index
+from .executor import tool_executor, ExecutorSaturated
+from .cache import tool_cache, tool_cache_key, CACHEABLE_TOOLS
+from backend.instrumentation import TOOL_DURATION
+
+_NOT_CACHED = object()
 
 TOOLS = {
     "add_student": add_student,
     "get_student": get_student,
     "update_student": update_student,
     "list_students": list_students,
+    "search_students": search_students,
     "delete_student": delete_student,
+    "import_students": import_students,
+    "bulk_update_students": bulk_update_students,
+    "bulk_delete_students": bulk_delete_students,
     "get_total_students": get_total_students,
     "get_students_by_department": get_students_by_department,
+    "get_department_activity_breakdown": get_department_activity_breakdown,
+    "get_onboarding_counts": get_onboarding_counts,
+    "get_activity_event_counts": get_activity_event_counts,
+    "get_activity_events": get_activity_events,
+    "get_onboarding_timeseries": get_onboarding_timeseries,
+    "get_activity_timeseries": get_activity_timeseries,
+    "get_chat_volume_timeseries": get_chat_volume_timeseries,
+    "search_campus_faq": search_campus_faq,
+}
+
+# Tools that change data; everything else only reads
+WRITE_TOOLS = {
+    "add_student", "update_student", "delete_student", "import_students",
+    "bulk_update_students", "bulk_delete_students",
 }
 
 def get_tools():
     return TOOLS
 
 def execute_tool(tool_name: str, **kwargs):
-    if tool_name in TOOLS:
+    if tool_name not in TOOLS:
+        return {"error": f"Tool {tool_name} not found"}
+    return _timed(tool_name, _execute_tool, tool_name, **kwargs)
+
+def _timed(label: str, func, *args, **kwargs):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = func(*args, **kwargs)
+        if not (isinstance(result, dict) and "error" in result):
+            outcome = "success"
+        return result
+    finally:
+        TOOL_DURATION.observe(time.perf_counter() - started, label, outcome)
+
+def _execute_tool(tool_name: str, **kwargs):
+    if tool_name not in CACHEABLE_TOOLS:
         return TOOLS[tool_name](**kwargs)
-    return {"error": f"Tool {tool_name} not found"}
\ No newline at end of file
+    
+    key = tool_cache_key(tool_name, kwargs)
+    generation = tool_cache.generation()
+    result = tool_cache.get(key, _NOT_CACHED)
+    if result is _NOT_CACHED:
+        result = TOOLS[tool_name](**kwargs)
+        if not (isinstance(result, dict) and "error" in result):
+            tool_cache.put(key, result, generation)
+    return result
+
+async def execute_tool_async(tool_name: str, **kwargs):
+    """Run a tool on the bounded tool executor so it never blocks the event loop."""
+    return await tool_executor.run(execute_tool, tool_name, **kwargs)
+
+async def execute_timed_async(label: str, func, **kwargs):
+    """Run a tool variant that is not in TOOLS (e.g. pre-encoded JSON) like a tool, timed under ``label``."""
+    return await tool_executor.run(_timed, label, func, **kwargs)
\ No newline at end of file
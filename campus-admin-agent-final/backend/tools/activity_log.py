@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from backend.models.database import ActivityLog, SessionLocal
+from backend.database.session import get_session, release_session
+from backend.config import settings
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+DEFAULT_EVENT_PAGE_SIZE = 100
+MAX_EVENT_PAGE_SIZE = 1000
+
+class ActivityLogger:
+    """Asynchronous, batched writer for ``activity_logs`` audit events.
+
+    ``log`` only appends to a bounded in-memory queue; a background thread
+    inserts queued events in one statement every ``flush_interval`` seconds or
+    as soon as ``batch_size`` are waiting. When the queue is full the
+    ``overflow_policy`` decides: ``block`` waits up to ``block_timeout`` for
+    the writer to make room and then drops the new event, ``drop_newest``
+    drops it straight away and ``drop_oldest`` evicts the oldest queued event.
+    Dropped events are counted in ``metrics``.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0,
+                 overflow_policy: str = "block", block_timeout: float = 0.1):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {overflow_policy}. Allowed: {', '.join(OVERFLOW_POLICIES)}")
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.flush_errors = 0
+        self.max_queue_depth = 0
+
+    def log(self, event_type: str, student_id: Optional[str] = None,
+            details: Optional[Dict[str, Any]] = None, block: bool = True) -> bool:
+        """Queue an event. Returns False if it was dropped because the queue is full.
+
+        Pass ``block=False`` from the event loop: the ``block`` policy then
+        drops the event instead of stalling every other request.
+        """
+        entry = {
+            "student_id": student_id,
+            "event_type": event_type,
+            "timestamp": datetime.utcnow(),
+            "details": json.dumps(details, default=str) if details else None,
+        }
+        with self._not_full:
+            if len(self._queue) >= self.max_queue:
+                if self.overflow_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.overflow_policy == "block" and block:
+                    self._wakeup.set()
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and time.monotonic() < deadline:
+                        self._not_full.wait(deadline - time.monotonic())
+                if len(self._queue) >= self.max_queue:
+                    self.dropped += 1
+                    return False
+            self._queue.append(entry)
+            self.logged += 1
+            depth = len(self._queue)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._ensure_writer()
+        if depth >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Insert queued events in batches of ``batch_size``. Returns the number written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._not_full:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    self._not_full.notify_all()
+                if not batch:
+                    return written
+                db = SessionLocal()
+                try:
+                    db.execute(insert(ActivityLog), batch)
+                    db.commit()
+                    self.written += len(batch)
+                    written += len(batch)
+                except Exception as e:
+                    db.rollback()
+                    self.flush_errors += 1
+                    print(f"Error writing activity log: {e}")
+                    # Requeue for the next flush, keeping only as much as still fits
+                    with self._not_full:
+                        room = max(self.max_queue - len(self._queue), 0)
+                        self.dropped += max(len(batch) - room, 0)
+                        self._queue.extendleft(reversed(batch[:room]))
+                    return written
+                finally:
+                    db.close()
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._stopping.clear()
+                self._writer = threading.Thread(target=self._write_loop, name="activity-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background writer and flush whatever is still queued."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            self._writer = None
+        self.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "logged": self.logged,
+                "written": self.written,
+                "dropped": self.dropped,
+                "flush_errors": self.flush_errors,
+                "overflow_policy": self.overflow_policy,
+            }
+
+activity_logger = ActivityLogger(
+    max_queue=settings.ACTIVITY_QUEUE_SIZE,
+    batch_size=settings.ACTIVITY_FLUSH_BATCH_SIZE,
+    flush_interval=settings.ACTIVITY_FLUSH_INTERVAL,
+    overflow_policy=settings.ACTIVITY_OVERFLOW_POLICY,
+    block_timeout=settings.ACTIVITY_BLOCK_TIMEOUT,
+)
+
+def log_activity(event_type: str, student_id: Optional[str] = None, details: Optional[Dict[str, Any]] = None,
+                 block: bool = True):
+    """Record an audit event without waiting on the database; never raises."""
+    try:
+        activity_logger.log(event_type, student_id, details, block)
+    except Exception as e:
+        print(f"Error logging activity: {e}")
+
+def get_activity_events(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        event_type: Optional[str] = None, student_id: Optional[str] = None,
+                        limit: int = DEFAULT_EVENT_PAGE_SIZE, before: Optional[int] = None) -> Dict[str, Any]:
+    """Audit events within [start, end), newest first, optionally for one event type or student.
+
+    Pass the returned ``next_before`` back as ``before`` to fetch the next
+    (older) page; it is ``None`` once there are no more events. Events reach
+    the table within ACTIVITY_FLUSH_INTERVAL seconds of being logged.
+    """
+    db: Session = get_session()
+    try:
+        limit = max(1, min(limit, MAX_EVENT_PAGE_SIZE))
+        query = db.query(ActivityLog.id, ActivityLog.timestamp, ActivityLog.event_type,
+                         ActivityLog.student_id, ActivityLog.details)
+        if start is not None:
+            query = query.filter(ActivityLog.timestamp >= start)
+        if end is not None:
+            query = query.filter(ActivityLog.timestamp < end)
+        if event_type is not None:
+            query = query.filter(ActivityLog.event_type == event_type)
+        if student_id is not None:
+            query = query.filter(ActivityLog.student_id == student_id)
+        if before is not None:
+            query = query.filter(ActivityLog.id < before)
+        rows = query.order_by(ActivityLog.id.desc()).limit(limit + 1).all()
+        events = [
+            {
+                "id": event_id,
+                "timestamp": timestamp.isoformat() if timestamp else None,
+                "event_type": event,
+                "student_id": sid,
+                "details": json.loads(details) if details else None,
+            }
+            for event_id, timestamp, event, sid, details in rows[:limit]
+        ]
+        return {
+            "success": True,
+            "events": events,
+            "next_before": events[-1]["id"] if len(rows) > limit else None,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        release_session(db)
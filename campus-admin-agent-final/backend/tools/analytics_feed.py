@@ -0,0 +1,189 @@
+import asyncio
+import contextvars
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from backend.tools.cache import student_version
+from backend.tools.executor import tool_executor
+from backend.tools.student_management import get_department_activity_breakdown
+from backend.config import settings
+
+# Queue markers: the subscriber fell behind and needs a fresh snapshot, or the feed is shutting down
+_RESYNC = object()
+_CLOSED = object()
+
+def _event(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of ``new`` that differ from ``old``; a department that disappeared maps to None."""
+    delta = {key: new[key] for key in ("total_students", "active_students") if old[key] != new[key]}
+    departments = {name: counts for name, counts in new["departments"].items()
+                   if old["departments"].get(name) != counts}
+    departments.update({name: None for name in old["departments"] if name not in new["departments"]})
+    if departments:
+        delta["departments"] = departments
+    return delta
+
+class DashboardBroadcaster:
+    """In-process fan-out of live student totals to every dashboard subscriber.
+
+    Subscribers first get a snapshot of the totals and per-department
+    counts, then only what changed. Writes announce themselves through the
+    students DataVersion; the broadcaster waits ``interval`` seconds after
+    the first change so a burst becomes one message, recomputes the totals
+    (from the in-memory counters when they are ready) and encodes a single
+    delta for all subscribers. A subscriber whose queue is full is not
+    waited for: its backlog is dropped and it gets a fresh snapshot instead.
+    Like the LLM client, the feed belongs to the event loop that first used
+    it and restarts if a different loop shows up.
+    """
+
+    def __init__(self, interval: float = 1.0, queue_size: int = 16):
+        self.interval = interval
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._state: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[str] = None
+        self.seq = 0
+        self.published = 0
+        self.resyncs = 0
+        self.max_subscribers = 0
+        student_version.add_listener(self._notify)
+
+    def _notify(self):
+        # Runs on whichever thread committed the write
+        loop, changed = self._loop, self._changed
+        if loop is None or changed is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:
+            pass
+
+    async def _compute_state(self) -> Dict[str, Any]:
+        breakdown = await tool_executor.run(get_department_activity_breakdown)
+        return {
+            "total_students": sum(counts["total"] for counts in breakdown.values()),
+            "active_students": sum(counts["active"] for counts in breakdown.values()),
+            "departments": {name: {"total": counts["total"], "active": counts["active"]}
+                            for name, counts in breakdown.items()},
+        }
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        self._loop = loop
+        self._changed = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._subscribers = set()
+        self._state = None
+        self._snapshot = None
+        # Start from an empty context so the feed never picks up the first subscriber's request session
+        self._task = contextvars.Context().run(loop.create_task, self._run())
+
+    async def _run(self):
+        while self._state is None:
+            try:
+                self._state = await self._compute_state()
+            except Exception as e:
+                print(f"Error computing dashboard snapshot: {e}")
+                await asyncio.sleep(self.interval)
+        self._ready.set()
+        while True:
+            await self._changed.wait()
+            # Let the rest of a burst of writes land before recomputing
+            await asyncio.sleep(self.interval)
+            self._changed.clear()
+            try:
+                state = await self._compute_state()
+            except Exception as e:
+                print(f"Error computing dashboard delta: {e}")
+                continue
+            self._publish(state)
+
+    def _publish(self, state: Dict[str, Any]):
+        delta = _diff(self._state, state)
+        self._state = state
+        if not delta:
+            return
+        self.seq += 1
+        self.published += 1
+        self._snapshot = None
+        message = _event({"type": "delta", "seq": self.seq, **delta})
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+
+    def _snapshot_event(self) -> str:
+        # Encoded once per state and shared by every subscriber that needs it
+        if self._snapshot is None:
+            self._snapshot = _event({"type": "snapshot", "seq": self.seq, **self._state})
+        return self._snapshot
+
+    async def events(self, is_disconnected=None, heartbeat_interval: Optional[float] = None) -> AsyncIterator[str]:
+        """SSE stream for one subscriber: a snapshot, then deltas, with comment heartbeats while idle."""
+        heartbeat_interval = heartbeat_interval or settings.STREAM_HEARTBEAT_INTERVAL
+        self._ensure_started()
+        await self._ready.wait()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # Registering and taking the snapshot happen without an await in between, so no delta is missed
+        self._subscribers.add(queue)
+        self.max_subscribers = max(self.max_subscribers, len(self._subscribers))
+        try:
+            yield self._snapshot_event()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), heartbeat_interval)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is _CLOSED:
+                    return
+                if message is _RESYNC:
+                    self.resyncs += 1
+                    # The snapshot already covers every delta queued behind the marker
+                    stale = []
+                    while not queue.empty():
+                        stale.append(queue.get_nowait())
+                    if _CLOSED in stale:
+                        return
+                    yield self._snapshot_event()
+                    continue
+                yield message
+        finally:
+            self._subscribers.discard(queue)
+
+    async def close(self):
+        """End every subscriber's stream and stop the feed (call from the loop that runs it)."""
+        for queue in self._subscribers:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_CLOSED)
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "seq": self.seq,
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "interval": self.interval,
+        }
+
+dashboard_feed = DashboardBroadcaster(settings.ANALYTICS_STREAM_INTERVAL, settings.ANALYTICS_STREAM_QUEUE_SIZE)
@@ -0,0 +1,207 @@
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from backend.shared_state import InMemoryRedis, is_cross_process, shared_key, shared_state
+from backend.config import settings
+
+_MISSING = object()
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and write-aware invalidation.
+
+    ``invalidate`` empties the cache and bumps a generation counter. A value
+    computed from data read before an invalidation is refused by ``put`` when
+    the caller passes the generation it observed in ``generation()`` at the
+    start, so a slow read racing a write can never re-populate stale data.
+    A cache derived from a ``DataVersion``'s data syncs it before each lookup,
+    so writes made by other workers invalidate it too.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, version: Optional["DataVersion"] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if self.version is not None:
+            self.version.sync()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+class DataVersion:
+    """Change counter for a dataset, used as its ETag and Last-Modified.
+
+    Bumped after every committed write, once the counters and caches have
+    been updated, so a reader that sees a version never gets data older
+    than it. The counter lives in the shared state store, so every worker
+    process hands out the same ETag for the same data, and the store's
+    epoch keeps versions from before a restart from ever matching again.
+    With a cross-process store ``sync`` (which ``current`` also does)
+    notices writes made by other workers and runs the sync hooks, which
+    drop this worker's derived caches, and then the listeners.
+    """
+
+    def __init__(self, name: str, store=None):
+        self.name = name
+        self._store = store if store is not None else InMemoryRedis()
+        self._shared = is_cross_process(self._store)
+        self._key = shared_key(f"version:{name}")
+        self._lock = threading.Lock()
+        self._epoch: Optional[str] = None
+        # Highest version this process has seen; None until the first look
+        self._seen: Optional[int] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._sync_hooks: List[Callable[[], None]] = []
+        self.external_changes = 0
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call ``callback`` (from the thread that noticed it) after every change, local or not."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_sync_hook(self, callback: Callable[[], None]):
+        """Call ``callback`` when another worker's write is noticed, before the new version is reported."""
+        self._sync_hooks.append(callback)
+
+    def _notify(self, callbacks: List[Callable[[], None]]):
+        for callback in list(callbacks):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error notifying {self.name} change listener: {e}")
+
+    def _observe(self, version: int) -> bool:
+        """Record ``version``; True if it is news to this process."""
+        with self._lock:
+            if self._seen is not None and version <= self._seen:
+                return False
+            first, self._seen = self._seen is None, version
+        return not first
+
+    def bump(self):
+        # Last-Modified first, so a reader in between gets an old ETag rather than an old date
+        self._store.hset(self._key, "modified_at", repr(time.time()))
+        self._observe(self._store.hincrby(self._key, "version", 1))
+        self._notify(self._listeners)
+
+    def sync(self):
+        """Apply writes made by other workers since the last look (a no-op with a single-process store)."""
+        if self._shared:
+            self._sync_to(int(self._store.hget(self._key, "version") or 0))
+
+    def _sync_to(self, version: int):
+        if self._shared and self._observe(version):
+            self.external_changes += 1
+            self._notify(self._sync_hooks)
+            self._notify(self._listeners)
+
+    def _epoch_id(self) -> str:
+        if self._epoch is None:
+            key = shared_key("epoch")
+            self._store.set(key, uuid.uuid4().hex[:8], nx=True)
+            # Nothing is known about writes before the epoch began, so claim its start time
+            self._store.hsetnx(self._key, "modified_at", repr(time.time()))
+            self._epoch = self._store.get(key)
+        return self._epoch
+
+    def current(self) -> Tuple[str, float]:
+        """``(etag, modified_at)`` for the data as it is now."""
+        epoch = self._epoch_id()
+        state = self._store.hgetall(self._key)
+        version = int(state.get("version", 0))
+        self._sync_to(version)
+        return f'"{self.name}-{epoch}-{version}"', float(state.get("modified_at") or time.time())
+
+# Read-only tools whose results depend only on student data and their arguments
+CACHEABLE_TOOLS = {
+    "get_student",
+    "list_students",
+    "search_students",
+    "get_total_students",
+    "get_students_by_department",
+    "get_department_activity_breakdown",
+    "get_onboarding_counts",
+}
+
+def tool_cache_key(tool_name: str, kwargs: Dict[str, Any]) -> str:
+    return tool_name + ":" + json.dumps(kwargs, sort_keys=True, default=str)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_prompt(text: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a chat message, used as a cache key."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+student_version = DataVersion("students", shared_state)
+tool_cache = TTLCache(settings.TOOL_CACHE_SIZE, settings.TOOL_CACHE_TTL, student_version)
+response_cache = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL, student_version)
+http_body_cache = TTLCache(settings.HTTP_BODY_CACHE_SIZE, settings.HTTP_BODY_CACHE_TTL, student_version)
+
+def _drop_student_caches():
+    tool_cache.invalidate()
+    response_cache.invalidate()
+    http_body_cache.invalidate()
+
+# Other workers' writes reach this worker's caches through the shared version
+student_version.add_sync_hook(_drop_student_caches)
+
+def invalidate_student_caches():
+    """Drop every cached tool result, agent response and HTTP body derived from student data.
+
+    Called by every student write path after it commits; the version bump
+    comes last so conditional reads never pair a new ETag with old data.
+    """
+    _drop_student_caches()
+    student_version.bump()
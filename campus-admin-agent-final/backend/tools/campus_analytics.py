@@ -0,0 +1,315 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from backend.models.database import (
+    Student, ActivityLog, ConversationMemory, AnalyticsRollup, AnalyticsWatermark, SessionLocal
+)
+from backend.database.session import get_session, release_session
+from backend.tools.student_management import _date_bucket
+from backend.config import settings
+
+class Rollup:
+    """A count of source rows per time bucket and dimension value, kept in ``analytics_rollups``."""
+
+    def __init__(self, name: str, model, time_column, dimension_column, granularity: str):
+        self.name = name
+        self.model = model
+        self.time_column = time_column
+        self.dimension_column = dimension_column
+        self.granularity = granularity
+
+ROLLUPS = {
+    rollup.name: rollup for rollup in (
+        Rollup("onboarding_daily", Student, Student.onboarded_at, Student.department, "day"),
+        Rollup("activity_hourly", ActivityLog, ActivityLog.timestamp, ActivityLog.event_type, "hour"),
+        Rollup("chat_hourly", ConversationMemory, ConversationMemory.created_at, ConversationMemory.role, "hour"),
+    )
+}
+
+def _as_datetime(value) -> datetime:
+    # SQLite returns bucket starts as text, other backends as timestamps
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
+
+class RollupEngine:
+    """Incrementally maintained time-series rollups.
+
+    Each rollup remembers the highest source primary key it has counted (its
+    watermark). ``refresh`` aggregates only rows above the watermark, one
+    GROUP BY per ``chunk_size`` ids, adds the counts to the stored buckets
+    and advances the watermark in the same transaction. The watermark is
+    moved with a compare-and-set, so concurrent refreshes, even from other
+    processes, can never count a row twice.
+
+    Ids are handed out when a row is inserted but become visible when its
+    transaction commits, which need not be in id order. Ids missing from the
+    last ``lag_ids`` below the watermark are therefore remembered with it and
+    rechecked on every refresh for ``lag_seconds``; ones that turn up late are
+    counted then, the rest are taken as rolled back or deleted.
+
+    Rollups count rows as they were inserted: later updates or deletes of a
+    student do not rewrite its onboarding history. Source tables therefore
+    must never reuse an id (they are AUTOINCREMENT on SQLite).
+    """
+
+    def __init__(self, chunk_size: int = 50000, refresh_interval: float = 5.0,
+                 lag_ids: int = 1000, lag_seconds: float = 300):
+        self.chunk_size = chunk_size
+        self.refresh_interval = refresh_interval
+        self.lag_ids = lag_ids
+        self.lag_seconds = lag_seconds
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[float] = None
+        self._reserved = set()
+        self.refreshes = 0
+        self.rows_rolled_up = 0
+        self.late_rows = 0
+        self.conflicts = 0
+        self.last_refresh_ms = 0.0
+
+    def _watermark(self, db: Session, name: str) -> tuple:
+        """(last_id, pending_ids text) of a rollup, creating its watermark on first use."""
+        query = db.query(AnalyticsWatermark.last_id, AnalyticsWatermark.pending_ids).filter(
+            AnalyticsWatermark.metric == name
+        )
+        row = query.first()
+        if row is not None:
+            return row[0], row[1]
+        try:
+            db.add(AnalyticsWatermark(metric=name, last_id=0, updated_at=datetime.utcnow()))
+            db.commit()
+            return 0, None
+        except IntegrityError:
+            # Created concurrently by another process
+            db.rollback()
+            return tuple(query.one())
+
+    def _reserve_ids(self, db: Session, rollup: Rollup, last_id: int):
+        """Make sure SQLite never hands out an id at or below the watermark again.
+
+        A table rebuilt as AUTOINCREMENT starts its sequence at the largest id
+        it still holds, which is below the watermark if the newest rows were
+        deleted before the rebuild.
+        """
+        if last_id <= 0 or rollup.name in self._reserved or db.get_bind().dialect.name != "sqlite":
+            return
+        params = {"name": rollup.model.__tablename__, "seq": last_id}
+        if not db.execute(text("UPDATE sqlite_sequence SET seq = max(seq, :seq) WHERE name = :name"), params).rowcount:
+            db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), params)
+        db.commit()
+        self._reserved.add(rollup.name)
+
+    def _upsert(self, db: Session):
+        """INSERT into the rollups that adds to the bucket's value if the bucket already exists."""
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            return None
+        statement = dialect_insert(AnalyticsRollup)
+        return statement.on_conflict_do_update(
+            index_elements=["metric", "bucket", "dimension"],
+            set_={"value": AnalyticsRollup.value + statement.excluded.value},
+        )
+
+    def _add_counts(self, db: Session, name: str, counts: Dict[tuple, int]):
+        if not counts:
+            return
+        upsert = self._upsert(db)
+        if upsert is not None:
+            # One statement per bucket that cannot fail when another refresher creates the same bucket first
+            db.execute(upsert, [
+                {"metric": name, "bucket": bucket, "dimension": dimension, "value": count}
+                for (bucket, dimension), count in counts.items()
+            ])
+            return
+        for (bucket, dimension), count in counts.items():
+            updated = db.execute(
+                update(AnalyticsRollup)
+                .where(AnalyticsRollup.metric == name, AnalyticsRollup.bucket == bucket,
+                       AnalyticsRollup.dimension == dimension)
+                .values(value=AnalyticsRollup.value + count)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not updated:
+                db.add(AnalyticsRollup(metric=name, bucket=bucket, dimension=dimension, value=count))
+
+    def _count(self, db: Session, rollup: Rollup, condition, counts: Dict[tuple, int]) -> int:
+        id_column = rollup.model.id
+        bucket = _date_bucket(db, rollup.time_column, rollup.granularity).label("bucket")
+        rows = db.query(bucket, rollup.dimension_column, func.count(id_column)).filter(
+            condition, rollup.time_column.isnot(None)
+        ).group_by(bucket, rollup.dimension_column).all()
+        for bucket_value, dimension, count in rows:
+            key = (_as_datetime(bucket_value), dimension or "")
+            counts[key] = counts.get(key, 0) + count
+        return sum(count for _, _, count in rows)
+
+    def _refresh_rollup(self, db: Session, rollup: Rollup) -> int:
+        id_column = rollup.model.id
+        rolled_up = 0
+        while True:
+            low, pending_text = self._watermark(db, rollup.name)
+            self._reserve_ids(db, rollup, low)
+            pending = {int(i): seen for i, seen in json.loads(pending_text or "[]")}
+            high = db.query(func.max(id_column)).filter(
+                id_column > low, id_column <= low + self.chunk_size
+            ).scalar()
+            if high is None:
+                # Ids can have gaps larger than a chunk; jump to the next existing one
+                high = db.query(func.min(id_column)).filter(id_column > low).scalar()
+            if high is None and not pending:
+                return rolled_up
+
+            counts: Dict[tuple, int] = {}
+            counted = 0
+            now = time.time()
+            if pending:
+                arrived = {i for (i,) in db.query(id_column).filter(id_column.in_(list(pending)))}
+                if arrived:
+                    late = self._count(db, rollup, id_column.in_(list(arrived)), counts)
+                    counted += late
+                    self.late_rows += late
+                pending = {i: seen for i, seen in pending.items()
+                           if i not in arrived and now - seen < self.lag_seconds}
+            if high is not None:
+                counted += self._count(db, rollup, (id_column > low) & (id_column <= high), counts)
+                # Missing ids just below the newest one may belong to transactions that have not committed yet
+                recent = max(low, high - self.lag_ids)
+                present = {i for (i,) in db.query(id_column).filter(id_column > recent, id_column <= high)}
+                pending.update((i, now) for i in range(recent + 1, high + 1) if i not in present)
+            new_text = json.dumps(sorted(pending.items())) if pending else None
+            if high is None and not counts and new_text == pending_text:
+                return rolled_up
+
+            self._add_counts(db, rollup.name, counts)
+            advanced = db.execute(
+                update(AnalyticsWatermark)
+                .where(AnalyticsWatermark.metric == rollup.name, AnalyticsWatermark.last_id == low,
+                       func.coalesce(AnalyticsWatermark.pending_ids, "") == (pending_text or ""))
+                .values(last_id=high if high is not None else low, pending_ids=new_text,
+                        updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not advanced:
+                # Another refresh counted this range first; drop our increments
+                db.rollback()
+                self.conflicts += 1
+                continue
+            db.commit()
+            rolled_up += counted
+
+    def refresh(self, names: Optional[List[str]] = None) -> Dict[str, int]:
+        """Bring rollups up to date. Returns the number of source rows counted per rollup."""
+        started = time.perf_counter()
+        with self._lock:
+            db = SessionLocal()
+            try:
+                result = {name: self._refresh_rollup(db, ROLLUPS[name]) for name in (names or ROLLUPS)}
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            self.rows_rolled_up += sum(result.values())
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    def refresh_if_stale(self):
+        """Refresh when the last refresh is older than ``refresh_interval``; never waits on a running one."""
+        if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        if self._lock.locked():
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing analytics rollups: {e}")
+
+    def series(self, name: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               dimension: Optional[str] = None) -> List[tuple]:
+        """Stored (bucket, dimension, value) rows of one rollup with bucket start in [start, end)."""
+        db: Session = get_session()
+        try:
+            query = db.query(AnalyticsRollup.bucket, AnalyticsRollup.dimension, AnalyticsRollup.value).filter(
+                AnalyticsRollup.metric == name
+            )
+            if start is not None:
+                query = query.filter(AnalyticsRollup.bucket >= start)
+            if end is not None:
+                query = query.filter(AnalyticsRollup.bucket < end)
+            if dimension is not None:
+                query = query.filter(AnalyticsRollup.dimension == dimension)
+            return query.order_by(AnalyticsRollup.bucket).all()
+        finally:
+            release_session(db)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "refreshes": self.refreshes,
+            "rows_rolled_up": self.rows_rolled_up,
+            "late_rows": self.late_rows,
+            "conflicts": self.conflicts,
+            "last_refresh_ms": round(self.last_refresh_ms, 2),
+            "staleness_seconds": time.monotonic() - self._refreshed_at if self._refreshed_at else None,
+        }
+
+rollup_engine = RollupEngine(settings.ANALYTICS_ROLLUP_CHUNK_SIZE, settings.ANALYTICS_REFRESH_INTERVAL,
+                             settings.ANALYTICS_ROLLUP_LAG_IDS, settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+
+def _period_start(bucket: datetime, interval: str) -> datetime:
+    if interval == "hour":
+        return bucket.replace(minute=0, second=0, microsecond=0)
+    day = bucket.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+def _timeseries(name: str, interval: str, allowed: tuple, start: Optional[datetime], end: Optional[datetime],
+                dimension: Optional[str], dimension_label: str) -> Dict[str, Any]:
+    if interval not in allowed:
+        return {"error": f"Invalid interval: {interval}. Allowed: {', '.join(allowed)}"}
+    try:
+        rollup_engine.refresh_if_stale()
+        totals: Dict[datetime, Dict[str, int]] = {}
+        for bucket, dim, value in rollup_engine.series(name, start, end, dimension):
+            by_dimension = totals.setdefault(_period_start(bucket, interval), {})
+            by_dimension[dim] = by_dimension.get(dim, 0) + value
+        return {
+            "success": True,
+            "interval": interval,
+            "series": [
+                {"period": period.isoformat(), "total": sum(values.values()), dimension_label: values}
+                for period, values in sorted(totals.items())
+            ],
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+def get_onboarding_timeseries(interval: str = "day", start: Optional[datetime] = None,
+                              end: Optional[datetime] = None, department: Optional[str] = None) -> Dict[str, Any]:
+    """Students onboarded per day, week or month and department, from precomputed rollups."""
+    return _timeseries("onboarding_daily", interval, ("day", "week", "month"), start, end, department, "by_department")
+
+def get_activity_timeseries(interval: str = "hour", start: Optional[datetime] = None,
+                            end: Optional[datetime] = None, event_type: Optional[str] = None) -> Dict[str, Any]:
+    """Activity log events per hour, day, week or month and event type, from precomputed rollups."""
+    return _timeseries("activity_hourly", interval, ("hour", "day", "week", "month"), start, end, event_type,
+                       "by_event_type")
+
+def get_chat_volume_timeseries(interval: str = "hour", start: Optional[datetime] = None,
+                               end: Optional[datetime] = None, role: Optional[str] = None) -> Dict[str, Any]:
+    """Chat messages per hour, day, week or month and role (user/assistant), from precomputed rollups."""
+    return _timeseries("chat_hourly", interval, ("hour", "day", "week", "month"), start, end, role, "by_role")
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from backend.config import settings
+
+# numpy is imported where it is used, so importing the tools does not pay for it at startup
+if TYPE_CHECKING:
+    import numpy as np
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+class HashingEmbedder:
+    """CPU-only text embedder using the hashing trick.
+
+    Words and word bigrams are hashed into ``dim`` signed buckets with
+    sublinear term frequency and the result is L2-normalized, so the dot
+    product of two embeddings is their cosine similarity. No model download
+    and no fitted vocabulary, so documents can be embedded independently.
+    """
+
+    def __init__(self, dim: int = 2048):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_PATTERN.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[int, float] = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                bucket = h % self.dim
+                counts[bucket] = counts.get(bucket, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+            for bucket, value in counts.items():
+                vectors[row, bucket] = np.sign(value) * (1.0 + np.log(abs(value))) if value else 0.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+def chunk_text(text: str, chunk_words: int = 200, overlap: int = 40) -> List[str]:
+    words = text.split()
+    if not words:
+        return []
+    step = max(chunk_words - overlap, 1)
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, max(len(words) - overlap, 1), step)]
+
+def extract_text(path: str) -> str:
+    if path.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            print(f"⚠️  pypdf not installed, skipping {path}")
+            return ""
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class FAQIndex:
+    """Persistent vector index over the documents in ``PDF_STORAGE_PATH``.
+
+    Vectors live in ``vectors.npy`` under ``VECTOR_DB_PATH`` and are opened
+    memory-mapped, so searches do not load the whole index into RAM. Chunk
+    texts and a per-file manifest (size, mtime, SHA-1) are kept alongside in
+    JSON. ``ingest`` re-embeds only files whose content changed and drops
+    chunks of deleted files, then swaps the new files in atomically.
+    """
+
+    def __init__(self, documents_path: str, index_path: str, embedder: Optional[HashingEmbedder] = None):
+        self.documents_path = documents_path
+        self.index_path = index_path
+        self.embedder = embedder or HashingEmbedder()
+        self._lock = threading.Lock()
+        self._vectors: Optional["np.ndarray"] = None
+        self._chunks: List[Dict[str, Any]] = []
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+
+    @property
+    def _vectors_file(self) -> str:
+        return os.path.join(self.index_path, "vectors.npy")
+
+    @property
+    def _meta_file(self) -> str:
+        return os.path.join(self.index_path, "index.json")
+
+    def load(self):
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self):
+        import numpy as np
+        self._loaded = True
+        if not (os.path.exists(self._vectors_file) and os.path.exists(self._meta_file)):
+            return
+        with open(self._meta_file, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dim") != self.embedder.dim:
+            print("FAQ index was built with a different embedding size and will be rebuilt")
+            return
+        self._chunks = meta["chunks"]
+        self._manifest = meta["files"]
+        self._vectors = np.load(self._vectors_file, mmap_mode="r")
+
+    def _scan(self) -> Dict[str, str]:
+        files = {}
+        if not os.path.isdir(self.documents_path):
+            return files
+        for root, _, names in os.walk(self.documents_path):
+            for name in names:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    files[os.path.relpath(path, self.documents_path)] = path
+        return files
+
+    def ingest(self) -> Dict[str, Any]:
+        """Bring the index up to date with the documents folder."""
+        import numpy as np
+        with self._lock:
+            if not self._loaded:
+                self._load_locked()
+            files = self._scan()
+            if not files and not self._manifest:
+                return {"success": True, "changed": [], "removed": [], "chunks": 0}
+            keep_rows: List[int] = []
+            chunks: List[Dict[str, Any]] = []
+            manifest: Dict[str, Dict[str, Any]] = {}
+            new_texts: List[str] = []
+            new_chunks: List[Dict[str, Any]] = []
+            changed = []
+
+            rows_by_source: Dict[str, List[int]] = {}
+            for row, chunk in enumerate(self._chunks):
+                rows_by_source.setdefault(chunk["source"], []).append(row)
+
+            for source, path in sorted(files.items()):
+                stat = os.stat(path)
+                previous = self._manifest.get(source)
+                if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+                    digest = previous["sha1"]
+                else:
+                    digest = _file_digest(path)
+                manifest[source] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": digest}
+                if previous and previous["sha1"] == digest and self._vectors is not None:
+                    rows = rows_by_source.get(source, [])
+                    keep_rows.extend(rows)
+                    chunks.extend(self._chunks[row] for row in rows)
+                    continue
+                changed.append(source)
+                for text in chunk_text(extract_text(path)):
+                    new_texts.append(text)
+                    new_chunks.append({"source": source, "text": text})
+
+            removed = [source for source in self._manifest if source not in files]
+            if not changed and not removed and self._vectors is not None:
+                return {"success": True, "changed": [], "removed": [], "chunks": len(self._chunks)}
+
+            parts = []
+            if keep_rows:
+                parts.append(np.asarray(self._vectors[keep_rows], dtype=np.float32))
+            if new_texts:
+                parts.append(self.embedder.embed(new_texts))
+            vectors = np.concatenate(parts) if parts else np.zeros((0, self.embedder.dim), dtype=np.float32)
+            chunks.extend(new_chunks)
+
+            os.makedirs(self.index_path, exist_ok=True)
+            tmp_vectors = self._vectors_file + ".tmp.npy"
+            tmp_meta = self._meta_file + ".tmp"
+            np.save(tmp_vectors, vectors)
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.embedder.dim, "chunks": chunks, "files": manifest}, f)
+            # Drop our mapping of the old file before replacing it
+            self._vectors = None
+            os.replace(tmp_vectors, self._vectors_file)
+            os.replace(tmp_meta, self._meta_file)
+            self._chunks = chunks
+            self._manifest = manifest
+            self._vectors = np.load(self._vectors_file, mmap_mode="r")
+            return {"success": True, "changed": changed, "removed": removed, "chunks": len(chunks)}
+
+    def search_many(self, queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+        """Top-k chunks for each query, scored with one matrix product for the whole batch."""
+        import numpy as np
+        with self._lock:
+            if not self._loaded:
+                self._load_locked()
+            vectors, chunks = self._vectors, self._chunks
+        if vectors is None or not len(chunks) or not queries:
+            return [[] for _ in queries]
+        scores = self.embedder.embed(queries) @ vectors.T
+        k = min(top_k, scores.shape[1])
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([
+                {"source": chunks[i]["source"], "score": round(float(row[i]), 4), "text": chunks[i]["text"]}
+                for i in top if row[i] > 0
+            ])
+        return results
+
+faq_index = FAQIndex(settings.PDF_STORAGE_PATH, settings.VECTOR_DB_PATH)
+
+def search_campus_faq(query: str, top_k: int = 3) -> Dict[str, Any]:
+    """Search campus FAQ and policy documents for passages relevant to a question."""
+    try:
+        return {"success": True, "results": faq_index.search_many([query], top_k)[0]}
+    except Exception as e:
+        return {"error": str(e)}
+
+def ingest_faq_documents() -> Dict[str, Any]:
+    """Re-index campus documents that were added, changed or removed."""
+    try:
+        return faq_index.ingest()
+    except Exception as e:
+        return {"error": str(e)}
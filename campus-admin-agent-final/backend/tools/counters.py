@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy import func
+from backend.models.database import Student, SessionLocal
+from backend.shared_state import InMemoryRedis, shared_key, shared_state
+
+def _field(kind: str, department: Optional[str]) -> str:
+    # Department names are JSON-encoded so a NULL department stays distinct from any name
+    return f"{kind}:{json.dumps(department)}"
+
+class StudentCounters:
+    """Materialized student counts kept in the shared state store.
+
+    Built once from the ``students`` table and then kept current by the write
+    tools with atomic per-field increments, so analytics reads never touch
+    the database and every worker process sees the same numbers. Until
+    ``rebuild`` has run the store reports itself unready and callers fall
+    back to SQL.
+    """
+
+    def __init__(self, store=None):
+        self._store = store if store is not None else InMemoryRedis()
+        self._key = shared_key("counters:students")
+        # Guards this process' hit/miss statistics; the counts themselves live in the store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reconciliations = 0
+        self.drift_corrections = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._store.hget(self._key, "ready") is not None
+
+    def _load(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(Student.department, Student.active, func.count(Student.id)).group_by(
+                Student.department, Student.active
+            ).all()
+        finally:
+            db.close()
+        total = 0
+        by_department: Dict[str, int] = {}
+        active_by_department: Dict[str, int] = {}
+        for department, active, count in rows:
+            total += count
+            by_department[department] = by_department.get(department, 0) + count
+            active_by_department.setdefault(department, 0)
+            if active:
+                active_by_department[department] += count
+        return total, by_department, active_by_department
+
+    def _read(self):
+        """``(total, by_department, active_by_department)`` from the store, or None when unready."""
+        fields = self._store.hgetall(self._key)
+        if "ready" not in fields:
+            return None
+        by_department: Dict[str, int] = {}
+        active: Dict[str, int] = {}
+        for field, value in fields.items():
+            kind, _, department = field.partition(":")
+            if kind == "count" and int(value) > 0:
+                by_department[json.loads(department)] = int(value)
+            elif kind == "active":
+                active[json.loads(department)] = int(value)
+        return (int(fields.get("total", 0)), by_department,
+                {department: active.get(department, 0) for department in by_department})
+
+    def _write(self, counts):
+        total, by_department, active_by_department = counts
+        mapping = {"total": total, "ready": 1, "rebuilt_at": repr(time.time())}
+        for department, count in by_department.items():
+            mapping[_field("count", department)] = count
+            mapping[_field("active", department)] = active_by_department.get(department, 0)
+        # Readers fall back to SQL for the moment between the two commands
+        self._store.delete(self._key)
+        self._store.hset(self._key, mapping=mapping)
+
+    def rebuild(self):
+        self._write(self._load())
+
+    def ensure_built(self, lock_timeout: float = 60.0) -> bool:
+        """Rebuild only if the store holds no counts yet. Returns True if this call rebuilt them.
+
+        Other worker processes may be incrementing counts in a shared store,
+        and a rebuild racing them loses or double-counts their changes, so a
+        (re)starting worker keeps counts that are already there. A SET NX
+        lock keeps workers that start together from rebuilding at once; the
+        losers serve SQL fallbacks until the winner is done.
+        """
+        if self.ready:
+            return False
+        lock = shared_key("counters:students:rebuilding")
+        if not self._store.set(lock, os.getpid(), ex=lock_timeout, nx=True):
+            return False
+        try:
+            if self.ready:
+                return False
+            self.rebuild()
+            return True
+        finally:
+            self._store.delete(lock)
+
+    def reconcile(self) -> bool:
+        """Recount from the database and repair any drift. Returns True if drift was found."""
+        fresh = self._load()
+        current = self._read()
+        drifted = current is not None and current != fresh
+        self._write(fresh)
+        with self._lock:
+            self.reconciliations += 1
+            if drifted:
+                self.drift_corrections += 1
+        return drifted
+
+    def _adjust(self, department: str, active: bool, delta: int):
+        self._store.hincrby(self._key, "total", delta)
+        remaining = self._store.hincrby(self._key, _field("count", department), delta)
+        if active:
+            self._store.hincrby(self._key, _field("active", department), delta)
+        if remaining <= 0:
+            self._store.hdel(self._key, _field("count", department), _field("active", department))
+
+    def student_added(self, department: str, active: bool = True):
+        self._adjust(department, active, 1)
+
+    def students_added(self, counts_by_department: Dict[str, int]):
+        """Apply a bulk insert of active students."""
+        for department, count in counts_by_department.items():
+            self._adjust(department, True, count)
+
+    def student_removed(self, department: str, active: bool):
+        self._adjust(department, active, -1)
+
+    def student_changed(self, old_department: str, old_active: bool, new_department: str, new_active: bool):
+        if old_department == new_department and bool(old_active) == bool(new_active):
+            return
+        self._adjust(old_department, old_active, -1)
+        self._adjust(new_department, new_active, 1)
+
+    def students_removed(self, counts: Dict[Tuple[str, bool], int]):
+        """Apply a bulk delete, given counts per (department, active)."""
+        for (department, active), count in counts.items():
+            self._adjust(department, active, -count)
+
+    def students_changed(self, counts: Dict[Tuple[str, bool, str, bool], int]):
+        """Apply a bulk update, given counts per (old department, old active, new department, new active)."""
+        for (old_department, old_active, new_department, new_active), count in counts.items():
+            if old_department == new_department and bool(old_active) == bool(new_active):
+                continue
+            self._adjust(old_department, old_active, -count)
+            self._adjust(new_department, new_active, count)
+
+    def invalidate(self):
+        """Mark the store stale so reads fall back to SQL until the next rebuild."""
+        self._store.hdel(self._key, "ready")
+
+    def _counted(self, counts) -> bool:
+        with self._lock:
+            if counts is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            return True
+
+    def total(self) -> Optional[int]:
+        counts = self._read()
+        return counts[0] if self._counted(counts) else None
+
+    def by_department(self) -> Optional[Dict[str, int]]:
+        counts = self._read()
+        return counts[1] if self._counted(counts) else None
+
+    def activity_breakdown(self) -> Optional[Dict[str, Dict[str, int]]]:
+        counts = self._read()
+        if not self._counted(counts):
+            return None
+        _, by_department, active_by_department = counts
+        return {
+            department: {
+                "active": active_by_department[department],
+                "inactive": total - active_by_department[department],
+                "total": total,
+            }
+            for department, total in by_department.items()
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        rebuilt_at = self._store.hget(self._key, "rebuilt_at")
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ready": self.ready,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "reconciliations": self.reconciliations,
+                "drift_corrections": self.drift_corrections,
+                "staleness_seconds": time.time() - float(rebuilt_at) if rebuilt_at else None,
+            }
+
+counters = StudentCounters(shared_state)
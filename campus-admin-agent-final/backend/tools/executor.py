@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from backend.config import settings
+
+class ExecutorSaturated(Exception):
+    """Raised when more calls are waiting for a worker than the queue allows."""
+
+class ToolExecutor:
+    """Bounded thread pool for running blocking database and tool calls.
+
+    Async routes await ``run`` instead of calling SQLAlchemy directly, so a slow
+    write only ties up one pool thread rather than the whole event loop. At most
+    ``max_workers`` calls run at once; up to ``max_queue`` more wait for a thread
+    and anything beyond that is rejected with ``ExecutorSaturated``.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _call(self, submitted_at: float, func: Callable, *args, **kwargs):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait_seconds += started_at - submitted_at
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_run_seconds += time.perf_counter() - started_at
+        return result
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"Tool executor queue is full ({self.max_queue} waiting)")
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, time.perf_counter(), func, *args, **kwargs)
+        # Carry context variables (such as the request's database session) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._pool, context.run, call)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": 1000 * self.total_wait_seconds / self.completed if self.completed else 0.0,
+                "avg_run_ms": 1000 * self.total_run_seconds / self.completed if self.completed else 0.0,
+            }
+
+tool_executor = ToolExecutor(settings.TOOL_MAX_WORKERS, settings.TOOL_MAX_QUEUE)
@@ -0,0 +1,476 @@
+import hashlib
+import json
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+from sqlalchemy import String, cast, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from backend.models.database import NotificationOutbox, Student, SessionLocal
+from backend.database.session import get_session, release_session
+from backend.shared_state import is_cross_process, shared_key, shared_state
+from backend.config import settings
+
+class FileTransport:
+    """Appends each message to a JSON-lines file; the local stand-in for an email server."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[Dict[str, Any]]) -> Dict[int, str]:
+        lines = "".join(json.dumps({
+            "idempotency_key": m["idempotency_key"],
+            "to": m["recipient"],
+            "subject": m["subject"],
+            "body": m["body"],
+            "sent_at": datetime.utcnow().isoformat(),
+        }) + "\n" for m in messages)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        return {}
+
+class SMTPTransport:
+    """Sends a batch over one SMTP connection.
+
+    For local testing run a debugging server such as
+    ``python -m aiosmtpd -n -l localhost:1025`` and keep the default
+    SMTP_HOST/SMTP_PORT. The idempotency key becomes the Message-ID so
+    receivers can discard the rare duplicate of an at-least-once retry.
+    """
+
+    def __init__(self, host: str, port: int, sender: str, username: str = "", password: str = "",
+                 use_tls: bool = False, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def _message(self, m: Dict[str, Any]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = m["recipient"]
+        message["Subject"] = m["subject"] or ""
+        message["Message-ID"] = f"<{m['idempotency_key']}@campus-admin>"
+        message.set_content(m["body"] or "")
+        return message
+
+    def send_batch(self, messages: List[Dict[str, Any]]) -> Dict[int, str]:
+        failures = {}
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for m in messages:
+                try:
+                    smtp.send_message(self._message(m))
+                except smtplib.SMTPException as e:
+                    # A refused recipient fails only that message; connection errors fail the batch
+                    failures[m["id"]] = str(e)
+        return failures
+
+TRANSPORTS = {
+    "file": lambda: FileTransport(settings.NOTIFICATION_FILE_PATH),
+    "smtp": lambda: SMTPTransport(settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_SENDER,
+                                  settings.SMTP_USERNAME, settings.SMTP_PASSWORD, settings.SMTP_USE_TLS),
+}
+
+def create_transport(name: str):
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown notification transport: {name}. Allowed: {', '.join(TRANSPORTS)}")
+    return TRANSPORTS[name]()
+
+class RateLimiter:
+    """Token bucket shared by every dispatcher worker; a rate of 0 disables it.
+
+    ``acquire`` reserves tokens up front and sleeps off any deficit, so a
+    batch larger than the bucket is still admitted, just later. Given a
+    shared state ``store`` the bucket is shared by every process using it:
+    the store holds the time by which all reserved tokens are paid for, and
+    a reservation is one atomic INCRBYFLOAT.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, store=None, key: str = "ratelimit"):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.store = store
+        self.key = shared_key(key)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _reserve_shared(self, n: int) -> float:
+        now = time.time()
+        cost = n / self.rate
+        # A full bucket means the paid-up time is ``capacity`` tokens in the past
+        floor = now - self.capacity / self.rate
+        paid_until = self.store.incrbyfloat(self.key, cost)
+        if paid_until - cost < floor:
+            # The bucket had refilled while idle; concurrent resets only drop one reservation
+            paid_until = floor + cost
+            self.store.set(self.key, repr(paid_until))
+        return max(0.0, paid_until - now)
+
+    def acquire(self, n: int = 1):
+        if self.rate <= 0:
+            return
+        if self.store is not None:
+            wait = self._reserve_shared(n)
+            with self._lock:
+                self.waited += wait
+        else:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= n
+                wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+                self.waited += wait
+        if wait:
+            time.sleep(wait)
+
+def _outbox_insert(db: Session):
+    """INSERT into the outbox that skips rows whose idempotency key is already queued."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(NotificationOutbox)
+    return dialect_insert(NotificationOutbox).on_conflict_do_nothing(index_elements=["idempotency_key"])
+
+def enqueue_notification(db: Session, idempotency_key: str, recipient: str, subject: str, body: str,
+                         student_id: Optional[str] = None, channel: str = "email"):
+    """Stage a notification in ``db``'s transaction.
+
+    Nothing is sent unless that transaction commits, and a key that is
+    already in the outbox is ignored, so the key must be derived from the
+    event (e.g. ``welcome:<student_id>``) for retries to be deduplicated.
+    Call ``notification_dispatcher.wake()`` after the commit to dispatch
+    without waiting for the next poll.
+    """
+    now = datetime.utcnow()
+    db.execute(_outbox_insert(db).values(
+        idempotency_key=idempotency_key,
+        channel=channel,
+        recipient=recipient,
+        student_id=student_id,
+        subject=subject,
+        body=body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now,
+    ))
+
+def department_change_key(student_id: str, moves_before: int) -> str:
+    """Idempotency key of a department change notice, numbered by the student's earlier moves.
+
+    ``moves_before`` must come from the UPDATE that moves the student (see
+    ``Student.department_changes``), so concurrent moves get different keys.
+    """
+    return f"department-change:{student_id}:{moves_before}"
+
+def enqueue_department_changes(db: Session, student_pks: List[int], old_department: Optional[str],
+                               new_department: str) -> int:
+    """Stage "department change" notices for students that moved, with one INSERT ... SELECT.
+
+    Must run in ``db``'s transaction *after* the UPDATE that moved the
+    students out of ``old_department`` and bumped their
+    ``department_changes``; notices are keyed like ``department_change_key``.
+    Returns the number of rows queued.
+    """
+    now = datetime.utcnow()
+    recipients = select(
+        literal("department-change:") + Student.student_id + literal(":")
+        + cast(Student.department_changes - 1, String),
+        literal("email"),
+        Student.email,
+        Student.student_id,
+        literal("Department change"),
+        literal("Hi ") + Student.name + literal(f", you have moved from {old_department} to {new_department}."),
+        literal("pending"),
+        literal(0),
+        literal(now),
+        literal(now),
+    ).where(Student.id.in_(student_pks))
+    columns = ["idempotency_key", "channel", "recipient", "student_id", "subject", "body",
+               "status", "attempts", "next_attempt_at", "created_at"]
+    return db.execute(_outbox_insert(db).from_select(columns, recipients)).rowcount
+
+class NotificationDispatcher:
+    """Worker pool that drains the ``notification_outbox`` table.
+
+    Each worker claims up to ``batch_size`` due messages with one conditional
+    UPDATE (so workers in other processes never claim the same rows), passes
+    them to the transport as a batch after the shared rate limiter admits
+    them, and records the outcome with one statement per outcome. Failures
+    are retried with exponential backoff and jitter until ``max_attempts``.
+    Claims older than ``claim_timeout`` (a worker died mid-send) are
+    returned to the queue by a sweep every ``claim_timeout / 2`` seconds,
+    which makes delivery at-least-once.
+    """
+
+    def __init__(self, transport_name: str = "file", workers: int = 4, batch_size: int = 100,
+                 rate_limit: float = 0.0, max_attempts: int = 5, retry_base_delay: float = 2.0,
+                 poll_interval: float = 1.0, claim_timeout: float = 300.0, shared=None):
+        self.transport_name = transport_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        # With a shared store the rate limit holds across every worker process
+        self.rate_limiter = RateLimiter(rate_limit, store=shared, key="ratelimit:notifications")
+        self._transport = None
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._recovery_lock = threading.Lock()
+        self._next_recovery = 0.0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.recovered = 0
+        self.batches = 0
+        self.total_batch_ms = 0.0
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = create_transport(self.transport_name)
+        return self._transport
+
+    def start(self):
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            self._stopping.clear()
+            # The first worker loop requeues claims left behind by a previous run
+            self._next_recovery = 0.0
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work_loop, name=f"notification-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers after their current batch; undelivered messages stay in the outbox."""
+        self._stopping.set()
+        self._wakeup.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _work_loop(self):
+        while not self._stopping.is_set():
+            try:
+                self._recover_if_due()
+                if self.dispatch_once():
+                    continue
+            except Exception as e:
+                print(f"Error dispatching notifications: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _recover_if_due(self):
+        """Requeue stale claims every ``claim_timeout / 2`` seconds, from whichever worker gets there first."""
+        now = time.monotonic()
+        with self._recovery_lock:
+            if now < self._next_recovery:
+                return
+            self._next_recovery = now + self.claim_timeout / 2
+        recovered = self.recover_stale()
+        if recovered:
+            self.recovered += recovered
+            print(f"Requeued {recovered} notifications whose sender stopped mid-send")
+
+    def recover_stale(self) -> int:
+        """Return claims older than ``claim_timeout`` to the queue. Returns the number requeued."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.claim_timeout)
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.status == "sending", NotificationOutbox.claimed_at < cutoff)
+                .values(status="pending", claimed_by=None, claimed_at=None)
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            due = select(NotificationOutbox.id).where(
+                NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now
+            ).order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id).limit(self.batch_size)
+            claimed = db.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_(due.scalar_subquery()), NotificationOutbox.status == "pending")
+                .values(status="sending", claimed_by=token, claimed_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return []
+            rows = db.query(
+                NotificationOutbox.id, NotificationOutbox.idempotency_key, NotificationOutbox.recipient,
+                NotificationOutbox.subject, NotificationOutbox.body, NotificationOutbox.attempts,
+            ).filter(NotificationOutbox.claimed_by == token, NotificationOutbox.status == "sending").all()
+            return [
+                {"id": r[0], "idempotency_key": r[1], "recipient": r[2], "subject": r[3], "body": r[4], "attempts": r[5]}
+                for r in rows
+            ]
+        finally:
+            db.close()
+
+    def _record(self, batch: List[Dict[str, Any]], failures: Dict[int, str]):
+        now = datetime.utcnow()
+        sent_ids = [m["id"] for m in batch if m["id"] not in failures]
+        retries = []
+        for m in batch:
+            if m["id"] not in failures:
+                continue
+            attempts = m["attempts"] + 1
+            entry = {"id": m["id"], "attempts": attempts, "last_error": failures[m["id"]][:1000],
+                     "claimed_by": None, "claimed_at": None}
+            if attempts >= self.max_attempts:
+                entry.update(status="failed")
+            else:
+                delay = self.retry_base_delay * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+                entry.update(status="pending", next_attempt_at=now + timedelta(seconds=delay))
+            retries.append(entry)
+        db = SessionLocal()
+        try:
+            if sent_ids:
+                db.execute(
+                    update(NotificationOutbox).where(NotificationOutbox.id.in_(sent_ids))
+                    .values(status="sent", sent_at=now, claimed_by=None, attempts=NotificationOutbox.attempts + 1)
+                    .execution_options(synchronize_session=False)
+                )
+            # Rows that will be retried and rows that gave up have different columns, so update them separately
+            for group in ([r for r in retries if r["status"] == "pending"], [r for r in retries if r["status"] == "failed"]):
+                if group:
+                    db.execute(update(NotificationOutbox), group)
+            db.commit()
+        finally:
+            db.close()
+        self.sent += len(sent_ids)
+        self.failed += sum(1 for r in retries if r["status"] == "failed")
+        self.retried += sum(1 for r in retries if r["status"] == "pending")
+
+    def dispatch_once(self) -> int:
+        """Claim, send and record one batch. Returns the number of messages claimed."""
+        batch = self._claim()
+        if not batch:
+            return 0
+        self.rate_limiter.acquire(len(batch))
+        started = time.perf_counter()
+        try:
+            failures = self.transport.send_batch(batch)
+        except Exception as e:
+            failures = {m["id"]: str(e) for m in batch}
+        self._record(batch, failures)
+        self.batches += 1
+        self.total_batch_ms += (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "transport": self.transport_name,
+            "workers": len(self._threads),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "recovered": self.recovered,
+            "batches": self.batches,
+            "avg_batch_ms": self.total_batch_ms / self.batches if self.batches else 0.0,
+            "rate_limited_seconds": round(self.rate_limiter.waited, 3),
+        }
+
+notification_dispatcher = NotificationDispatcher(
+    transport_name=settings.NOTIFICATION_TRANSPORT,
+    workers=settings.NOTIFICATION_WORKERS,
+    batch_size=settings.NOTIFICATION_BATCH_SIZE,
+    rate_limit=settings.NOTIFICATION_RATE_LIMIT,
+    max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+    retry_base_delay=settings.NOTIFICATION_RETRY_BASE_DELAY,
+    poll_interval=settings.NOTIFICATION_POLL_INTERVAL,
+    claim_timeout=settings.NOTIFICATION_CLAIM_TIMEOUT,
+    shared=shared_state if is_cross_process(shared_state) else None,
+)
+
+def announce_to_department(department: str, subject: str, body: str,
+                           idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """Queue an announcement to every active student in a department.
+
+    ``{name}`` in the body is replaced with each student's name. Recipients
+    are written to the outbox with a single INSERT ... SELECT; repeating a
+    request with the same ``idempotency_key`` queues nothing new. Without a
+    key the announcement's content is the key, so a resubmitted request is
+    not sent twice; pass a new key to deliberately send it again.
+    """
+    key = idempotency_key or hashlib.sha256(
+        json.dumps([department, subject, body]).encode("utf-8")
+    ).hexdigest()[:32]
+    now = datetime.utcnow()
+    db: Session = get_session()
+    try:
+        recipients = select(
+            literal(f"announcement:{key}:") + Student.student_id,
+            literal("email"),
+            Student.email,
+            Student.student_id,
+            literal(subject),
+            func.replace(literal(body), "{name}", Student.name),
+            literal("pending"),
+            literal(0),
+            literal(now),
+            literal(now),
+        ).where(Student.department == department, Student.active.is_(True))
+        columns = ["idempotency_key", "channel", "recipient", "student_id", "subject", "body",
+                   "status", "attempts", "next_attempt_at", "created_at"]
+        queued = db.execute(_outbox_insert(db).from_select(columns, recipients)).rowcount
+        db.commit()
+        notification_dispatcher.wake()
+        return {"success": True, "department": department, "queued": queued, "idempotency_key": key}
+    except Exception as e:
+        db.rollback()
+        return {"error": str(e)}
+    finally:
+        release_session(db)
+
+def get_notification_status() -> Dict[str, Any]:
+    """Outbox message counts by status, plus dispatcher metrics."""
+    db: Session = get_session()
+    try:
+        rows = db.query(NotificationOutbox.status, func.count(NotificationOutbox.id)).group_by(
+            NotificationOutbox.status
+        ).all()
+        return {"success": True, "outbox": dict(rows), "dispatcher": notification_dispatcher.metrics()}
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        release_session(db)
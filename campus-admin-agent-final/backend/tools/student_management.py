@@ -1,10 +1,23 @@
+from sqlalchemy import case, delete, func, insert, or_, update
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from collections import Counter
+from json.encoder import encode_basestring
 from backend.models.database import Student, ActivityLog, SessionLocal
+from backend.database.session import get_session, release_session
+from backend.tools.counters import counters
+from backend.tools.cache import invalidate_student_caches
+from backend.tools.student_search import student_index
+from backend.tools.activity_log import log_activity
+from backend.tools.notifications import (
+    department_change_key, enqueue_department_changes, enqueue_notification, notification_dispatcher
+)
 from datetime import datetime
+from backend.config import settings
 
 def add_student(name: str, student_id: str, email: str, department: str = "General") -> Dict[str, Any]:
-    db: Session = SessionLocal()
+    """Add a new student record."""
+    db: Session = get_session()
     try:
         existing = db.query(Student).filter(Student.student_id == student_id).first()
         if existing:
@@ -12,8 +25,16 @@ def add_student(name: str, student_id: str, email: str, department: str = "Gener
         
         student = Student(name=name, student_id=student_id, email=email, department=department)
         db.add(student)
+        # The welcome email is committed together with the student, or not at all
+        enqueue_notification(db, f"welcome:{student_id}", email, "Welcome to campus",
+                             f"Hi {name}, welcome! You are enrolled in {department}.", student_id=student_id)
         db.commit()
+        notification_dispatcher.wake()
         db.refresh(student)
+        counters.student_added(student.department, student.active)
+        student_index.student_saved(student.id, student.name, student.student_id, student.email, student.department)
+        invalidate_student_caches()
+        log_activity("student_created", student.student_id, {"department": student.department})
         
         return {
             "success": True,
@@ -29,10 +50,11 @@ def add_student(name: str, student_id: str, email: str, department: str = "Gener
         db.rollback()
         return {"error": str(e)}
     finally:
-        db.close()
+        release_session(db)
 
 def get_student(student_id: str) -> Dict[str, Any]:
-    db: Session = SessionLocal()
+    """Look up one student by student ID."""
+    db: Session = get_session()
     try:
         student = db.query(Student).filter(Student.student_id == student_id).first()
         if not student:
@@ -51,10 +73,11 @@ def get_student(student_id: str) -> Dict[str, Any]:
     except Exception as e:
         return {"error": str(e)}
     finally:
-        db.close()
+        release_session(db)
 
 def update_student(student_id: str, **kwargs) -> Dict[str, Any]:
-    db: Session = SessionLocal()
+    """Update a student's name, email, department or active flag."""
+    db: Session = get_session()
     try:
         student = db.query(Student).filter(Student.student_id == student_id).first()
         if not student:
@@ -65,6 +88,7 @@ def update_student(student_id: str, **kwargs) -> Dict[str, Any]:
         if invalid_fields:
             return {"error": f"Invalid field(s): {', '.join(invalid_fields)}"}
         
+        old_department, old_active = student.department, student.active
         update_count = 0
         for field, value in kwargs.items():
             if hasattr(student, field) and value is not None:
@@ -74,8 +98,23 @@ def update_student(student_id: str, **kwargs) -> Dict[str, Any]:
         if update_count == 0:
             return {"error": "No valid fields provided"}
         
+        department_changed = student.department != old_department
+        if department_changed:
+            # Counted by the UPDATE itself, so two concurrent moves never share a key
+            student.department_changes = func.coalesce(Student.department_changes, 0) + 1
+            db.flush()
+            key = department_change_key(student_id, student.department_changes - 1)
+            enqueue_notification(db, key, student.email, "Department change",
+                                 f"Hi {student.name}, you have moved from {old_department} to {student.department}.",
+                                 student_id=student_id)
         db.commit()
+        if department_changed:
+            notification_dispatcher.wake()
         db.refresh(student)
+        counters.student_changed(old_department, old_active, student.department, student.active)
+        student_index.student_saved(student.id, student.name, student.student_id, student.email, student.department)
+        invalidate_student_caches()
+        log_activity("student_updated", student_id, {"fields": sorted(f for f, v in kwargs.items() if v is not None)})
         
         return {
             "success": True,
@@ -93,63 +132,538 @@ def update_student(student_id: str, **kwargs) -> Dict[str, Any]:
         db.rollback()
         return {"error": str(e)}
     finally:
-        db.close()
+        release_session(db)
 
-def list_students() -> Dict[str, Any]:
-    db: Session = SessionLocal()
+STUDENT_FIELDS = ("id", "name", "student_id", "email", "department", "active", "onboarded_at")
+DEFAULT_LIST_FIELDS = ("id", "name", "student_id", "email", "department")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def resolve_fields(fields: Optional[Sequence[str]]) -> List[str]:
+    if not fields:
+        return list(DEFAULT_LIST_FIELDS)
+    invalid = [f for f in fields if f not in STUDENT_FIELDS]
+    if invalid:
+        raise ValueError(f"Invalid field(s): {', '.join(invalid)}")
+    # The primary key is always selected because it is the pagination cursor
+    return ["id"] + [f for f in dict.fromkeys(fields) if f != "id"]
+
+def _student_listing_query(db: Session, fields: List[str], after: Optional[int] = None,
+                           department: Optional[str] = None, active: Optional[bool] = None):
+    # Select plain columns instead of Student entities so rows skip ORM hydration
+    query = db.query(*[getattr(Student, f) for f in fields])
+    if after is not None:
+        query = query.filter(Student.id > after)
+    if department is not None:
+        query = query.filter(Student.department == department)
+    if active is not None:
+        query = query.filter(Student.active == active)
+    return query.order_by(Student.id)
+
+def _row_to_dict(row, fields: List[str]) -> Dict[str, Any]:
+    data = dict(zip(fields, row))
+    if data.get("onboarded_at") is not None:
+        data["onboarded_at"] = data["onboarded_at"].isoformat()
+    return data
+
+def list_students(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                  department: Optional[str] = None, active: Optional[bool] = None,
+                  fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Return one keyset page of students ordered by primary key.
+
+    Pass the returned ``next_after`` back as ``after`` to fetch the next page;
+    it is ``None`` once the listing is exhausted.
+    """
+    db: Session = get_session()
     try:
-        students = db.query(Student).all()
+        columns = resolve_fields(fields)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # Fetch one extra row to know whether another page exists without a COUNT(*)
+        rows = _student_listing_query(db, columns, after, department, active).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        students = [_row_to_dict(row, columns) for row in rows[:limit]]
         return {
             "success": True,
-            "students": [
-                {
-                    "id": s.id,
-                    "name": s.name,
-                    "student_id": s.student_id,
-                    "email": s.email,
-                    "department": s.department
-                } for s in students
-            ]
+            "students": students,
+            "next_after": students[-1]["id"] if has_more else None,
         }
     except Exception as e:
         return {"error": str(e)}
     finally:
-        db.close()
+        release_session(db)
+
+def _json_bool(value) -> str:
+    return "true" if value else "false"
+
+def _json_datetime(value) -> str:
+    return '"' + value.isoformat() + '"'
+
+# Per-column JSON encoders for list_students_json; anything else is a string column
+_COLUMN_ENCODERS = {"id": str, "active": _json_bool, "onboarded_at": _json_datetime}
+
+def list_students_json(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                       department: Optional[str] = None, active: Optional[bool] = None,
+                       fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Same page as ``list_students``, already encoded as JSON text under ``"json"``.
+
+    Rows are written straight from the result tuples with per-column
+    encoders, skipping the per-row dict and the generic encoder, for HTTP
+    responses that would only serialize the dicts again.
+    """
+    db: Session = get_session()
+    try:
+        columns = resolve_fields(fields)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        rows = _student_listing_query(db, columns, after, department, active).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        encoders = [(encode_basestring(c) + ":", _COLUMN_ENCODERS.get(c, encode_basestring)) for c in columns]
+        body = ",".join([
+            "{" + ",".join([key + ("null" if value is None else encode(value))
+                            for (key, encode), value in zip(encoders, row)]) + "}"
+            for row in rows
+        ])
+        next_after = str(rows[-1][0]) if has_more else "null"
+        return {"success": True, "json": '{"success":true,"students":[' + body + '],"next_after":' + next_after + "}"}
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        release_session(db)
+
+def iter_students(after: Optional[int] = None, department: Optional[str] = None,
+                  active: Optional[bool] = None, fields: Optional[Sequence[str]] = None,
+                  batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """Yield students one at a time, reading the table in keyset batches.
+
+    Only ``batch_size`` rows are held in memory at once, so this is safe to
+    stream over the whole table.
+    """
+    columns = resolve_fields(fields)
+    while True:
+        db: Session = SessionLocal()
+        try:
+            rows = _student_listing_query(db, columns, after, department, active).limit(batch_size).all()
+        finally:
+            db.close()
+        for row in rows:
+            yield _row_to_dict(row, columns)
+        if len(rows) < batch_size:
+            return
+        after = rows[-1][0]
 
 def delete_student(student_id: str) -> Dict[str, Any]:
-    db: Session = SessionLocal()
+    """Delete a student by student ID."""
+    db: Session = get_session()
     try:
         student = db.query(Student).filter(Student.student_id == student_id).first()
         if not student:
             return {"error": f"Student with ID {student_id} not found"}
         
+        student_pk, department, active = student.id, student.department, student.active
         db.delete(student)
         db.commit()
+        counters.student_removed(department, active)
+        student_index.student_removed(student_pk)
+        invalidate_student_caches()
+        log_activity("student_deleted", student_id, {"department": department})
         return {"success": True, "message": f"Student {student_id} deleted"}
     except Exception as e:
         db.rollback()
         return {"error": str(e)}
     finally:
-        db.close()
+        release_session(db)
+
+class StudentImport:
+    """Batched bulk insert of students inside a single transaction.
+
+    Rows are buffered and written ``chunk_size`` at a time: each chunk costs one
+    set-based duplicate check and one multi-row INSERT for students plus one for
+    their ActivityLog entries. Nothing is visible to other sessions until
+    ``commit``. Invalid or duplicate rows are skipped and reported in ``errors``.
+    """
+
+    REQUIRED_FIELDS = ("name", "student_id", "email")
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or settings.BULK_IMPORT_CHUNK_SIZE
+        self.db: Session = SessionLocal()
+        self.errors: List[Dict[str, Any]] = []
+        self.inserted = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._seen_ids = set()
+        self._inserted_ids: List[str] = []
+        self._added_by_department = Counter()
+
+    def add(self, row: Dict[str, Any], row_number: int):
+        missing = [f for f in self.REQUIRED_FIELDS if not row.get(f)]
+        if missing:
+            self.errors.append({"row": row_number, "student_id": row.get("student_id"),
+                                "error": f"Missing field(s): {', '.join(missing)}"})
+            return
+        student_id = str(row["student_id"])
+        if student_id in self._seen_ids:
+            self.errors.append({"row": row_number, "student_id": student_id,
+                                "error": f"Duplicate student ID {student_id} in import"})
+            return
+        self._seen_ids.add(student_id)
+        self._buffer.append({
+            "row": row_number,
+            "name": str(row["name"]),
+            "student_id": student_id,
+            "email": str(row["email"]),
+            "department": row.get("department") or "General",
+        })
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def add_rows(self, rows: Iterable[Tuple[int, Dict[str, Any]]]):
+        for row_number, row in rows:
+            self.add(row, row_number)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        chunk, self._buffer = self._buffer, []
+        ids = [r["student_id"] for r in chunk]
+        existing = {sid for (sid,) in self.db.query(Student.student_id).filter(Student.student_id.in_(ids))}
+        rows = []
+        for r in chunk:
+            if r["student_id"] in existing:
+                self.errors.append({"row": r["row"], "student_id": r["student_id"],
+                                    "error": f"Student with ID {r['student_id']} already exists"})
+                continue
+            rows.append({k: r[k] for k in ("name", "student_id", "email", "department")})
+        if not rows:
+            return
+        now = datetime.utcnow()
+        for r in rows:
+            r["onboarded_at"] = now
+        self.db.execute(insert(Student), rows)
+        self.db.execute(insert(ActivityLog), [
+            {"student_id": r["student_id"], "event_type": "student_created", "timestamp": now} for r in rows
+        ])
+        self.inserted += len(rows)
+        self._inserted_ids.extend(r["student_id"] for r in rows)
+        self._added_by_department.update(r["department"] for r in rows)
+
+    def commit(self) -> Dict[str, Any]:
+        try:
+            self.flush()
+            self.db.commit()
+            counters.students_added(self._added_by_department)
+            student_index.students_imported(self._inserted_ids)
+            invalidate_student_caches()
+            self.errors.sort(key=lambda e: e["row"])
+            return {"success": True, "inserted": self.inserted, "failed": len(self.errors), "errors": self.errors}
+        except Exception as e:
+            self.db.rollback()
+            return {"error": str(e), "inserted": 0, "errors": self.errors}
+        finally:
+            self.db.close()
+
+    def rollback(self):
+        self.db.rollback()
+        self.db.close()
+
+def import_students(students: Iterable[Dict[str, Any]], chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Insert many students in one transaction.
+
+    See ``StudentImport`` for how rows are batched and errors reported.
+    """
+    importer = StudentImport(chunk_size)
+    try:
+        for row_number, row in enumerate(students, start=1):
+            importer.add(row, row_number)
+    except Exception as e:
+        importer.rollback()
+        return {"error": str(e)}
+    return importer.commit()
+
+BULK_UPDATE_FIELDS = ("department", "active")
+
+def _bulk_conditions(department: Optional[str], active: Optional[bool],
+                     onboarded_after: Optional[datetime], onboarded_before: Optional[datetime]) -> List[Any]:
+    conditions = []
+    if department is not None:
+        conditions.append(Student.department == department)
+    if active is not None:
+        conditions.append(Student.active.is_(active))
+    if onboarded_after is not None:
+        conditions.append(Student.onboarded_at >= onboarded_after)
+    if onboarded_before is not None:
+        conditions.append(Student.onboarded_at < onboarded_before)
+    return conditions
+
+def _bulk_targets(db: Session, student_ids: Optional[List[str]], conditions: List[Any],
+                  chunk_size: int) -> Iterator[List[Any]]:
+    """Matching (id, student_id, department, active) rows, at most ``chunk_size`` at a time.
+
+    An ID list is looked up ``chunk_size`` IDs per query; a filter is walked
+    in primary-key order so each chunk is one indexed range scan.
+    """
+    columns = (Student.id, Student.student_id, Student.department, Student.active)
+    if student_ids is not None:
+        for i in range(0, len(student_ids), chunk_size):
+            rows = db.query(*columns).filter(Student.student_id.in_(student_ids[i:i + chunk_size]), *conditions).all()
+            if rows:
+                yield rows
+        return
+    after = 0
+    while True:
+        rows = db.query(*columns).filter(Student.id > after, *conditions).order_by(Student.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1].id
+
+def _bulk_differs(values: Dict[str, Any]):
+    """SQL condition for rows that ``values`` would actually change."""
+    return or_(*[or_(getattr(Student, field).is_(None), getattr(Student, field) != value)
+                 for field, value in values.items()])
+
+def _bulk_dry_run(db: Session, student_ids: Optional[List[str]], conditions: List[Any],
+                  values: Dict[str, Any], chunk_size: int) -> Dict[str, Any]:
+    by_department: Counter = Counter()
+    would_change = 0
+    missing: List[str] = []
+    if student_ids is None:
+        rows = db.query(Student.department, func.count(Student.id),
+                        func.sum(case((_bulk_differs(values), 1), else_=0)) if values else func.count(Student.id)
+                        ).filter(*conditions).group_by(Student.department).all()
+        for department, matched, changing in rows:
+            by_department[department] += matched
+            would_change += changing or 0
+    else:
+        found = set()
+        for rows in _bulk_targets(db, student_ids, conditions, chunk_size):
+            for row in rows:
+                found.add(row.student_id)
+                by_department[row.department] += 1
+                if not values or any(getattr(row, f) != v for f, v in values.items()):
+                    would_change += 1
+        missing = [sid for sid in student_ids if sid not in found]
+    result = {"success": True, "dry_run": True, "matched": sum(by_department.values()),
+              "by_department": dict(by_department), "would_change": would_change}
+    if student_ids is not None:
+        result["missing"] = missing
+    return result
+
+def _bulk_operation(action: str, student_ids: Optional[List[str]], department: Optional[str], active: Optional[bool],
+                    onboarded_after: Optional[datetime], onboarded_before: Optional[datetime],
+                    values: Dict[str, Any], dry_run: bool, chunk_size: Optional[int]) -> Dict[str, Any]:
+    conditions = _bulk_conditions(department, active, onboarded_after, onboarded_before)
+    if student_ids is None and not conditions:
+        return {"error": "Provide student_ids or at least one filter (department, active, onboarded_after, onboarded_before)"}
+    if student_ids is not None:
+        student_ids = list(dict.fromkeys(str(sid) for sid in student_ids))
+    chunk_size = chunk_size or settings.BULK_UPDATE_CHUNK_SIZE
+    if chunk_size < 1:
+        return {"error": "chunk_size must be positive"}
+
+    db: Session = get_session()
+    try:
+        if dry_run:
+            return _bulk_dry_run(db, student_ids, conditions, values, chunk_size)
+
+        new_department = values.get("department")
+        matched = chunks = notified = 0
+        found = set()
+        written_pks: List[int] = []
+        counter_changes: Counter = Counter()
+        for rows in _bulk_targets(db, student_ids, conditions, chunk_size):
+            matched += len(rows)
+            chunks += 1
+            found.update(row.student_id for row in rows)
+            if action == "delete":
+                pks = [row.id for row in rows]
+                db.execute(delete(Student).where(Student.id.in_(pks)).execution_options(synchronize_session=False))
+                counter_changes.update((row.department, row.active) for row in rows)
+            else:
+                changed = [row for row in rows if any(getattr(row, f) != v for f, v in values.items())]
+                if not changed:
+                    continue
+                pks = [row.id for row in changed]
+                updates = dict(values)
+                if new_department is not None:
+                    # Numbers the moved students' notices, as in update_student
+                    updates["department_changes"] = case(
+                        (_bulk_differs({"department": new_department}),
+                         func.coalesce(Student.department_changes, 0) + 1),
+                        else_=Student.department_changes,
+                    )
+                db.execute(update(Student).where(Student.id.in_(pks)).values(**updates)
+                           .execution_options(synchronize_session=False))
+                moved: Dict[Optional[str], List[int]] = {}
+                for row in changed:
+                    if new_department is not None and row.department != new_department:
+                        moved.setdefault(row.department, []).append(row.id)
+                for old_department, moved_pks in moved.items():
+                    notified += enqueue_department_changes(db, moved_pks, old_department, new_department)
+                counter_changes.update((row.department, row.active, values.get("department", row.department),
+                                        values.get("active", row.active)) for row in changed)
+            written_pks.extend(pks)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        return {"error": str(e)}
+    finally:
+        release_session(db)
+
+    # One round of cache, counter and index maintenance for the whole batch
+    if written_pks:
+        if action == "delete":
+            counters.students_removed(counter_changes)
+        else:
+            counters.students_changed(counter_changes)
+        student_index.students_changed(written_pks)
+        invalidate_student_caches()
+    if notified:
+        notification_dispatcher.wake()
+    affected_key = "deleted" if action == "delete" else "updated"
+    criteria = {k: v for k, v in (("department", department), ("active", active),
+                                  ("onboarded_after", onboarded_after), ("onboarded_before", onboarded_before))
+                if v is not None}
+    log_activity(f"students_bulk_{affected_key}", None, {
+        "criteria": criteria, "student_ids": len(student_ids) if student_ids is not None else None,
+        "set": values, affected_key: len(written_pks),
+    })
+    result = {"success": True, "matched": matched, affected_key: len(written_pks), "chunks": chunks}
+    if action == "update":
+        result["notified"] = notified
+    if student_ids is not None:
+        result["missing"] = [sid for sid in student_ids if sid not in found]
+    return result
+
+def bulk_update_students(student_ids: Optional[List[str]] = None, department: Optional[str] = None,
+                         active: Optional[bool] = None, onboarded_after: Optional[datetime] = None,
+                         onboarded_before: Optional[datetime] = None, set_department: Optional[str] = None,
+                         set_active: Optional[bool] = None, dry_run: bool = False,
+                         chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Move students to another department and/or (de)activate them, matched by IDs or a filter.
+
+    Filters combine with AND, and with ``student_ids`` when both are given.
+    Matching rows are written with one set-based UPDATE per ``chunk_size``
+    rows, all in one transaction; rows that already hold the new values are
+    left alone. Counters, the search index and caches are refreshed once for
+    the whole batch. ``dry_run`` only counts what would be matched and changed.
+    """
+    values = {field: value for field, value in (("department", set_department), ("active", set_active))
+              if value is not None}
+    if not values:
+        return {"error": "Nothing to set: provide set_department and/or set_active"}
+    return _bulk_operation("update", student_ids, department, active, onboarded_after, onboarded_before,
+                           values, dry_run, chunk_size)
+
+def bulk_delete_students(student_ids: Optional[List[str]] = None, department: Optional[str] = None,
+                         active: Optional[bool] = None, onboarded_after: Optional[datetime] = None,
+                         onboarded_before: Optional[datetime] = None, dry_run: bool = False,
+                         chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Delete students matched by IDs or a filter with one set-based DELETE per ``chunk_size`` rows.
+
+    Same matching, transaction and batch maintenance as ``bulk_update_students``.
+    """
+    return _bulk_operation("delete", student_ids, department, active, onboarded_after, onboarded_before,
+                           {}, dry_run, chunk_size)
 
 def get_total_students() -> int:
-    db: Session = SessionLocal()
+    """Total number of students."""
+    cached = counters.total()
+    if cached is not None:
+        return cached
+    db: Session = get_session()
     try:
-        return db.query(Student).count()
+        # Plain COUNT(*) rather than Query.count(), which wraps the entity select in a subquery
+        return db.query(func.count(Student.id)).scalar() or 0
     except Exception as e:
         return 0
     finally:
-        db.close()
+        release_session(db)
 
 def get_students_by_department() -> Dict[str, int]:
-    db: Session = SessionLocal()
+    """Number of students in each department."""
+    cached = counters.by_department()
+    if cached is not None:
+        return cached
+    db: Session = get_session()
+    try:
+        rows = db.query(Student.department, func.count(Student.id)).group_by(Student.department).all()
+        return {department: count for department, count in rows}
+    except Exception as e:
+        return {}
+    finally:
+        release_session(db)
+
+def get_department_activity_breakdown() -> Dict[str, Dict[str, int]]:
+    """Active and inactive student counts per department, computed in one GROUP BY."""
+    cached = counters.activity_breakdown()
+    if cached is not None:
+        return cached
+    db: Session = get_session()
+    try:
+        active_count = func.sum(case((Student.active.is_(True), 1), else_=0))
+        rows = db.query(Student.department, active_count, func.count(Student.id)).group_by(Student.department).all()
+        return {
+            department: {"active": int(active or 0), "inactive": total - int(active or 0), "total": total}
+            for department, active, total in rows
+        }
+    except Exception as e:
+        return {}
+    finally:
+        release_session(db)
+
+ONBOARDING_INTERVALS = ("day", "week", "month")
+
+def _date_bucket(db: Session, column, interval: str):
+    """SQL expression truncating ``column`` to the start of its hour/day/week/month bucket."""
+    if db.get_bind().dialect.name == "sqlite":
+        if interval == "hour":
+            return func.strftime("%Y-%m-%d %H:00:00", column)
+        if interval == "day":
+            return func.date(column)
+        if interval == "week":
+            # Roll back to the Monday of the ISO week
+            return func.date(column, "-6 days", "weekday 1")
+        return func.strftime("%Y-%m-01", column)
+    return func.date_trunc(interval, column)
+
+def get_onboarding_counts(interval: str = "day", start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Number of students onboarded per day, week or month within [start, end)."""
+    if interval not in ONBOARDING_INTERVALS:
+        return {"error": f"Invalid interval: {interval}. Allowed: {', '.join(ONBOARDING_INTERVALS)}"}
+    db: Session = get_session()
+    try:
+        bucket = _date_bucket(db, Student.onboarded_at, interval).label("bucket")
+        query = db.query(bucket, func.count(Student.id)).filter(Student.onboarded_at.isnot(None))
+        if start is not None:
+            query = query.filter(Student.onboarded_at >= start)
+        if end is not None:
+            query = query.filter(Student.onboarded_at < end)
+        rows = query.group_by(bucket).order_by(bucket).all()
+        return {
+            "success": True,
+            "interval": interval,
+            "counts": [
+                {"period": period.isoformat() if hasattr(period, "isoformat") else str(period), "count": count}
+                for period, count in rows
+            ]
+        }
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        release_session(db)
+
+def get_activity_event_counts(start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+    """ActivityLog event counts grouped by event_type within [start, end)."""
+    db: Session = get_session()
     try:
-        departments = {}
-        students = db.query(Student).all()
-        for student in students:
-            departments[student.department] = departments.get(student.department, 0) + 1
-        return departments
+        query = db.query(ActivityLog.event_type, func.count(ActivityLog.id))
+        if start is not None:
+            query = query.filter(ActivityLog.timestamp >= start)
+        if end is not None:
+            query = query.filter(ActivityLog.timestamp < end)
+        return {event_type: count for event_type, count in query.group_by(ActivityLog.event_type).all()}
     except Exception as e:
         return {}
     finally:
-        db.close()
\ No newline at end of file
+        release_session(db)
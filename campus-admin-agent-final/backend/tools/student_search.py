@@ -0,0 +1,355 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import or_, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from backend.models.database import Student, SessionLocal, engine
+from backend.database.session import get_session, release_session
+from backend.tools.cache import student_version
+from backend.config import settings
+
+SEARCH_FIELDS = ("id", "name", "student_id", "email", "department")
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 200
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# External-content FTS5 table over ``students``; the triggers keep it in step with every
+# write, including bulk imports, so the application never has to update it itself
+_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+    "name, email, student_id, department, content='students', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN "
+    "INSERT INTO students_fts(rowid, name, email, student_id, department) "
+    "VALUES (new.id, new.name, new.email, new.student_id, new.department); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN "
+    "INSERT INTO students_fts(students_fts, rowid, name, email, student_id, department) "
+    "VALUES ('delete', old.id, old.name, old.email, old.student_id, old.department); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_au AFTER UPDATE ON students BEGIN "
+    "INSERT INTO students_fts(students_fts, rowid, name, email, student_id, department) "
+    "VALUES ('delete', old.id, old.name, old.email, old.student_id, old.department); "
+    "INSERT INTO students_fts(rowid, name, email, student_id, department) "
+    "VALUES (new.id, new.name, new.email, new.student_id, new.department); END",
+)
+
+# Column weights for bm25(): a hit in the name counts most, the department least
+_FTS_SEARCH_SQL = text(
+    "SELECT s.id, s.name, s.student_id, s.email, s.department, "
+    "bm25(students_fts, 10.0, 4.0, 6.0, 1.0) AS rank "
+    "FROM students_fts JOIN students s ON s.id = students_fts.rowid "
+    "WHERE students_fts MATCH :match ORDER BY rank, s.id LIMIT :limit OFFSET :offset"
+)
+
+def _trigrams(value: str) -> Set[str]:
+    grams = set()
+    for token in _TOKEN_PATTERN.findall(value.lower()):
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class StudentSearchIndex:
+    """Ranked name/email/student ID search over the ``students`` table.
+
+    On SQLite builds with FTS5 the index is an FTS5 table maintained by
+    triggers and ranked with bm25, matching every query word as a prefix.
+    Otherwise students are held in an in-memory trigram index: candidates are
+    gathered from the rarest trigrams of the query and ranked by the share of
+    query trigrams they contain, so small typos still match. The write tools
+    keep it current through ``student_saved``/``student_removed``/
+    ``students_imported``. Until ``setup`` has finished searches fall back to
+    a SQL LIKE scan.
+
+    The trigram index lives in one process and only sees that process'
+    writes. With several workers, another worker's write (noticed through
+    the shared students version) triggers a rebuild in the background, and
+    searches use the LIKE scan until it has caught up.
+    """
+
+    def __init__(self, backend: str = "auto", min_similarity: float = 0.5):
+        self.requested_backend = backend
+        self.min_similarity = min_similarity
+        self.backend: Optional[str] = None
+        self._lock = threading.Lock()
+        self._ready = False
+        self._building = False
+        self._dirty: Set[int] = set()
+        self._dirty_student_ids: Set[str] = set()
+        self._resync_lock = threading.Lock()
+        self._resync_pending = False
+        self._stale = False
+        self._docs: Dict[int, Tuple[Tuple[Any, ...], Set[str], str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self.searches = 0
+        self.fallback_searches = 0
+        self.total_search_ms = 0.0
+        self.resyncs = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def setup(self):
+        """Create or load the index. Safe to call again, e.g. after a restore."""
+        if self.requested_backend in ("auto", "fts5") and engine.dialect.name == "sqlite":
+            try:
+                self._setup_fts()
+                self.backend = "fts5"
+                self._ready = True
+                return
+            except OperationalError as e:
+                if self.requested_backend == "fts5":
+                    raise
+                print(f"SQLite FTS5 is unavailable ({e}), using the in-memory trigram index")
+        self.backend = "trigram"
+        try:
+            self._rebuild_trigrams()
+        except Exception as e:
+            with self._lock:
+                self._building = False
+            print(f"Error building the student search index: {e}")
+
+    def _setup_fts(self):
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'"
+            )).first()
+            for statement in _FTS_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                # Index the rows written before the triggers existed
+                conn.execute(text("INSERT INTO students_fts(students_fts) VALUES ('rebuild')"))
+
+    # --- trigram backend -------------------------------------------------
+
+    def _rebuild_trigrams(self):
+        with self._lock:
+            self._building = True
+            self._dirty.clear()
+            self._dirty_student_ids.clear()
+        docs: Dict[int, Tuple[Tuple[Any, ...], Set[str], str]] = {}
+        postings: Dict[str, Set[int]] = {}
+        db = SessionLocal()
+        try:
+            rows = db.query(*[getattr(Student, f) for f in SEARCH_FIELDS]).yield_per(5000)
+            for row in rows:
+                self._index_row(tuple(row), docs, postings)
+        finally:
+            db.close()
+        with self._lock:
+            self._docs, self._postings = docs, postings
+            dirty, self._dirty = self._dirty, set()
+            dirty_student_ids, self._dirty_student_ids = self._dirty_student_ids, set()
+            self._building = False
+            self._ready = True
+        # Re-read students written while the snapshot above was being loaded
+        if dirty:
+            self._reload(Student.id.in_(list(dirty)), dirty)
+        if dirty_student_ids:
+            self.students_imported(list(dirty_student_ids))
+
+    @staticmethod
+    def _index_row(row: Tuple[Any, ...], docs, postings):
+        student_pk, name, student_id, email, department = row
+        searchable = " ".join(str(v) for v in (name, student_id, email, department) if v)
+        grams = _trigrams(searchable)
+        docs[student_pk] = (row, grams, searchable.lower())
+        for gram in grams:
+            postings.setdefault(gram, set()).add(student_pk)
+
+    def _unindex(self, student_pk: int):
+        doc = self._docs.pop(student_pk, None)
+        if doc is None:
+            return
+        for gram in doc[1]:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(student_pk)
+                if not posting:
+                    del self._postings[gram]
+
+    def _reload(self, condition, expected_pks: Iterable[int] = ()):
+        db = SessionLocal()
+        try:
+            rows = db.query(*[getattr(Student, f) for f in SEARCH_FIELDS]).filter(condition).all()
+        finally:
+            db.close()
+        with self._lock:
+            found = set()
+            for row in rows:
+                self._unindex(row[0])
+                self._index_row(tuple(row), self._docs, self._postings)
+                found.add(row[0])
+            for student_pk in set(expected_pks) - found:
+                self._unindex(student_pk)
+
+    def student_saved(self, student_pk: int, name: str, student_id: str, email: str, department: str):
+        if self.backend != "trigram":
+            return
+        with self._lock:
+            if self._building:
+                self._dirty.add(student_pk)
+            if self._ready:
+                self._unindex(student_pk)
+                self._index_row((student_pk, name, student_id, email, department), self._docs, self._postings)
+
+    def student_removed(self, student_pk: int):
+        if self.backend != "trigram":
+            return
+        with self._lock:
+            if self._building:
+                self._dirty.add(student_pk)
+            if self._ready:
+                self._unindex(student_pk)
+
+    def students_imported(self, student_ids: List[str], chunk_size: int = 500):
+        """Index students inserted in bulk, looked up by their student IDs."""
+        if self.backend != "trigram" or not student_ids:
+            return
+        with self._lock:
+            if self._building:
+                self._dirty_student_ids.update(student_ids)
+            if not self._ready:
+                return
+        for i in range(0, len(student_ids), chunk_size):
+            self._reload(Student.student_id.in_(student_ids[i:i + chunk_size]))
+
+    def students_changed(self, student_pks: List[int], chunk_size: int = 500):
+        """Re-index (or drop, if they no longer exist) students written by a set-based UPDATE or DELETE."""
+        if self.backend != "trigram" or not student_pks:
+            return
+        with self._lock:
+            if self._building:
+                self._dirty.update(student_pks)
+            if not self._ready:
+                return
+        for i in range(0, len(student_pks), chunk_size):
+            chunk = student_pks[i:i + chunk_size]
+            self._reload(Student.id.in_(chunk), chunk)
+
+    def external_change(self):
+        """Another worker process wrote students; rebuild the trigram index from the database."""
+        if self.backend != "trigram":
+            return
+        with self._lock:
+            self._stale = True
+            if self._resync_pending:
+                # The queued rebuild has not started yet, so it will see this change too
+                return
+            self._resync_pending = True
+        threading.Thread(target=self._resync, name="student-search-resync", daemon=True).start()
+
+    def _resync(self):
+        with self._resync_lock:
+            with self._lock:
+                self._resync_pending = False
+            try:
+                self._rebuild_trigrams()
+            except Exception as e:
+                print(f"Error rebuilding the student search index: {e}")
+                return
+            self.resyncs += 1
+            with self._lock:
+                # A change noticed during the rebuild may be missing from it; its own rebuild clears the flag
+                if not self._resync_pending:
+                    self._stale = False
+
+    def _search_trigrams(self, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        query_grams = _trigrams(query)
+        if not query_grams:
+            return []
+        needle = query.lower().strip()
+        with self._lock:
+            # Any document sharing at least ``required`` of the n query trigrams must contain one
+            # of the n - required + 1 rarest, so only those posting lists are scanned in full
+            required = max(1, math.ceil(self.min_similarity * len(query_grams)))
+            by_rarity = sorted(query_grams, key=lambda g: len(self._postings.get(g, ())))
+            split = len(query_grams) - required + 1
+            shared = Counter(chain.from_iterable(self._postings.get(g, ()) for g in by_rarity[:split]))
+            candidates = shared.keys()
+            for gram in by_rarity[split:]:
+                shared.update(candidates & self._postings.get(gram, set()))
+            matches = [pk for pk, count in shared.items() if count >= required]
+            scored = heapq.nsmallest(offset + limit, (
+                (-(shared[pk] / len(query_grams) + (1.0 if needle in self._docs[pk][2] else 0.0)), pk)
+                for pk in matches
+            ))[offset:]
+            rows = [(neg_score, self._docs[pk][0]) for neg_score, pk in scored]
+        return [dict(zip(SEARCH_FIELDS, row), score=round(-neg_score, 4)) for neg_score, row in rows]
+
+    # --- FTS5 and fallback ----------------------------------------------
+
+    def _search_fts(self, db: Session, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        tokens = _TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return []
+        match = " ".join(f'"{token}"*' for token in tokens)
+        rows = db.execute(_FTS_SEARCH_SQL, {"match": match, "limit": limit, "offset": offset}).all()
+        # bm25 is lower for better matches, so negate it to make higher scores rank first
+        return [dict(zip(SEARCH_FIELDS, row[:-1]), score=round(-row[-1], 4)) for row in rows]
+
+    def _search_like(self, db: Session, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        # A literal "%" or "_" in the query (e.g. in an email) must not act as a wildcard
+        escaped = query.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        rows = db.query(*[getattr(Student, f) for f in SEARCH_FIELDS]).filter(or_(
+            Student.name.ilike(pattern, escape="\\"), Student.email.ilike(pattern, escape="\\"),
+            Student.student_id.ilike(pattern, escape="\\"),
+        )).order_by(Student.id).offset(offset).limit(limit).all()
+        return [dict(zip(SEARCH_FIELDS, row), score=None) for row in rows]
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            if self._ready and self.backend == "trigram" and not self._stale:
+                return self._search_trigrams(query, limit, offset)
+            db: Session = get_session()
+            try:
+                if self._ready and self.backend == "fts5":
+                    return self._search_fts(db, query, limit, offset)
+                self.fallback_searches += 1
+                return self._search_like(db, query, limit, offset)
+            finally:
+                release_session(db)
+        finally:
+            self.searches += 1
+            self.total_search_ms += (time.perf_counter() - started) * 1000
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "ready": self._ready,
+            "indexed_students": len(self._docs) if self.backend == "trigram" else None,
+            "searches": self.searches,
+            "fallback_searches": self.fallback_searches,
+            "resyncs": self.resyncs,
+            "avg_search_ms": self.total_search_ms / self.searches if self.searches else 0.0,
+        }
+
+student_index = StudentSearchIndex(settings.STUDENT_SEARCH_BACKEND, settings.STUDENT_SEARCH_MIN_SIMILARITY)
+student_version.add_sync_hook(student_index.external_change)
+
+def search_students(query: str, limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0) -> Dict[str, Any]:
+    """Find students by partial name, email or student ID, best matches first.
+
+    Results are paginated: pass the returned ``next_offset`` back as
+    ``offset`` for the next page; it is ``None`` after the last one.
+    """
+    try:
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+        offset = max(0, offset)
+        # Fetch one extra result to know whether another page exists
+        results = student_index.search(query, limit + 1, offset)
+        return {
+            "success": True,
+            "query": query,
+            "students": results[:limit],
+            "next_offset": offset + limit if len(results) > limit else None,
+        }
+    except Exception as e:
+        return {"error": str(e)}
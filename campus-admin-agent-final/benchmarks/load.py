@@ -0,0 +1,178 @@
+"""In-process load test: concurrent clients drive the FastAPI app directly over ASGI.
+
+Requests go straight to ``backend.main.app`` without sockets, so the numbers
+measure the application rather than a network stack. A small ASGI driver is
+used instead of ``httpx.ASGITransport`` because the latter buffers whole
+responses, which would hide the time to the first SSE event. The LLM is the
+fake Groq server from ``backend/agent/fake_groq.py`` running on a local port,
+so its tokens really are streamed. It shares this process (and its GIL) unless
+``llm_base_url`` points at one started separately, which gives cleaner
+numbers at high concurrency.
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from benchmarks.stats import summarize, peak_rss_mb
+
+class Response:
+    __slots__ = ("status", "body", "first_event_at")
+
+    def __init__(self):
+        self.status = 0
+        self.body = b""
+        self.first_event_at: Optional[float] = None
+
+async def asgi_request(app, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Response:
+    """Send one request through the ASGI interface, noting when the first SSE ``data:`` event arrives."""
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    headers = [(b"host", b"bench")]
+    if body is not None:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    response = Response()
+    done = asyncio.Event()
+    chunks: List[bytes] = []
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # Only report a disconnect once the response is finished, like a patient client
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if chunk:
+                if response.first_event_at is None and chunk.startswith(b"data:"):
+                    response.first_event_at = time.perf_counter()
+                chunks.append(chunk)
+            if not message.get("more_body", False):
+                done.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    response.body = b"".join(chunks)
+    return response
+
+def start_fake_llm(first_token_delay: float, token_delay: float) -> Tuple[str, Callable[[], None]]:
+    """Run the fake Groq API on a free local port in a background thread; returns (base_url, stop)."""
+    import uvicorn
+    from backend.agent.fake_groq import create_app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(first_token_delay, token_delay), host="127.0.0.1",
+                                           port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="fake-llm", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join(5)
+
+    return f"http://127.0.0.1:{port}", stop
+
+def default_scenarios(students: int, rng: random.Random) -> Dict[str, Callable[[int], Tuple[str, str, Any]]]:
+    """Scenario name -> function building (method, path, body) for the i-th request."""
+    seeded_id = lambda: f"B{rng.randrange(max(students, 1)):07d}"
+    names = ["smith", "garcia", "maria", "lee", "patel", "nguyen", "john", "kim"]
+    return {
+        "students_list": lambda i: ("GET", f"/students?limit=100&after={rng.randrange(max(students, 1))}", None),
+        "students_get": lambda i: ("GET", f"/students/{seeded_id()}", None),
+        "students_search": lambda i: ("GET", f"/students/search?q={rng.choice(names)}&limit=20", None),
+        "analytics_total": lambda i: ("GET", "/analytics/total-students", None),
+        "analytics_departments": lambda i: ("GET", "/analytics/students-by-department", None),
+        "analytics_onboarding": lambda i: ("GET", "/analytics/onboarding?interval=month", None),
+        "analytics_timeseries": lambda i: ("GET", "/analytics/timeseries/activity?interval=day", None),
+        "chat": lambda i: ("POST", "/chat", {"session_id": f"load-{i % 50}", "message": "how many students"}),
+        "chat_stream": lambda i: ("POST", "/chat/stream",
+                                  {"session_id": f"load-stream-{i % 50}", "message": "list students in physics"}),
+    }
+
+async def run_scenario(app, build: Callable[[int], Tuple[str, str, Any]], requests: int,
+                       concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    first_events: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for i in counter:
+            method, path, body = build(i)
+            started = time.perf_counter()
+            try:
+                response = await asgi_request(app, method, path, body)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status >= 400:
+                errors += 1
+            if response.first_event_at is not None:
+                first_events.append(response.first_event_at - started)
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - wall_started, errors, first_events or None)
+    result["concurrency"] = concurrency
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+async def run_load(students: int, requests: int = 500, concurrency: int = 32, scenarios: Optional[List[str]] = None,
+                   llm: bool = True, first_token_delay: float = 0.05, token_delay: float = 0.005,
+                   llm_base_url: Optional[str] = None, random_seed: int = 11) -> Dict[str, Dict[str, Any]]:
+    """Run each scenario in turn against the app, with its lifespan started as in production."""
+    from backend.main import app
+    from backend.api import chat
+    from backend.agent.llm import LLMClient
+
+    rng = random.Random(random_seed)
+    available = default_scenarios(students, rng)
+    selected = scenarios or list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(available)}")
+
+    stop_llm = None
+    previous_llm = chat.agent.llm
+    if llm:
+        base_url = llm_base_url
+        if base_url is None:
+            base_url, stop_llm = start_fake_llm(first_token_delay, token_delay)
+        chat.agent.llm = LLMClient(api_key="benchmark", base_url=base_url)
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        async with app.router.lifespan_context(app):
+            for name in selected:
+                results[name] = await run_scenario(app, available[name], requests, concurrency)
+                print(f"  {name}: {results[name]['throughput_rps']:.0f} req/s, "
+                      f"p50 {results[name]['p50_ms']:.1f} ms, p99 {results[name]['p99_ms']:.1f} ms")
+    finally:
+        if llm:
+            await chat.agent.aclose()
+            chat.agent.llm = previous_llm
+        if stop_llm:
+            stop_llm()
+    return results
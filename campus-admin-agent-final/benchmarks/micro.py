@@ -0,0 +1,111 @@
+"""Microbenchmarks for every public function in ``backend/tools/student_management.py``."""
+import random
+import time
+from typing import Any, Callable, Dict, List
+from backend.models.database import Student, SessionLocal
+from backend.tools import student_management as sm
+from backend.tools.cache import invalidate_student_caches
+from backend.tools.counters import counters
+from benchmarks.stats import summarize
+
+def _time_calls(call: Callable[[int], Any], iterations: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    wall_started = time.perf_counter()
+    for i in range(iterations):
+        started = time.perf_counter()
+        result = call(i)
+        latencies.append(time.perf_counter() - started)
+        if isinstance(result, dict) and "error" in result:
+            errors += 1
+    return summarize(latencies, time.perf_counter() - wall_started, errors)
+
+def _remove_imported(prefix: str = "IB"):
+    """Delete benchmark rows with this ID prefix so the next run starts from the seeded data again."""
+    db = SessionLocal()
+    try:
+        db.query(Student).filter(Student.student_id.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    counters.reconcile()
+    invalidate_student_caches()
+
+def run_micro(students: int, iterations: int = 200, random_seed: int = 7) -> Dict[str, Dict[str, Any]]:
+    """Time each tool against a seeded database of ``students`` rows (ids ``B0000000``...)."""
+    rng = random.Random(random_seed)
+    seeded_id = lambda: f"B{rng.randrange(max(students, 1)):07d}"
+    departments = list(sm.get_students_by_department()) or ["General"]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    results["resolve_fields"] = _time_calls(lambda i: sm.resolve_fields(["name", "email", "department"]), iterations)
+    results["get_student"] = _time_calls(lambda i: sm.get_student(seeded_id()), iterations)
+    results["list_students"] = _time_calls(
+        lambda i: sm.list_students(limit=100, after=rng.randrange(max(students, 1))), iterations
+    )
+    results["list_students_json"] = _time_calls(
+        lambda i: sm.list_students_json(limit=100, after=rng.randrange(max(students, 1))), iterations
+    )
+    results["list_students_filtered"] = _time_calls(
+        lambda i: sm.list_students(limit=100, department=rng.choice(departments), active=True), iterations
+    )
+    results["get_total_students"] = _time_calls(lambda i: sm.get_total_students(), iterations)
+    results["get_students_by_department"] = _time_calls(lambda i: sm.get_students_by_department(), iterations)
+    results["get_department_activity_breakdown"] = _time_calls(
+        lambda i: sm.get_department_activity_breakdown(), iterations
+    )
+    results["get_onboarding_counts"] = _time_calls(
+        lambda i: sm.get_onboarding_counts(rng.choice(sm.ONBOARDING_INTERVALS)), max(iterations // 10, 1)
+    )
+    results["get_activity_event_counts"] = _time_calls(lambda i: sm.get_activity_event_counts(),
+                                                       max(iterations // 10, 1))
+
+    # Writes use their own ids so they never collide with the seeded rows
+    results["add_student"] = _time_calls(
+        lambda i: sm.add_student(f"Micro Bench {i}", f"MB{i:07d}", f"micro{i}@campus.edu", rng.choice(departments)),
+        iterations,
+    )
+    results["update_student"] = _time_calls(
+        lambda i: sm.update_student(f"MB{i:07d}", department=rng.choice(departments), active=i % 2 == 0),
+        iterations,
+    )
+    results["delete_student"] = _time_calls(lambda i: sm.delete_student(f"MB{i:07d}"), iterations)
+
+    import_batches = max(iterations // 50, 1)
+    results["import_students_1000"] = _time_calls(
+        lambda i: sm.import_students(
+            {"name": f"Import Bench {i}-{j}", "student_id": f"IB{i:04d}{j:04d}", "email": f"ib{i}.{j}@campus.edu"}
+            for j in range(1000)
+        ),
+        import_batches,
+    )
+
+    _remove_imported()
+
+    # Bulk writes each get a fresh 1000-row batch, imported untimed under its own department
+    bulk_batches = max(iterations // 50, 1)
+    bulk_ids = lambda i: [f"BB{i:04d}{j:04d}" for j in range(1000)]
+    _remove_imported("BB")
+    for i in range(bulk_batches):
+        sm.import_students({"name": f"Bulk Bench {sid}", "student_id": sid, "email": f"{sid.lower()}@campus.edu",
+                            "department": f"Bulk Bench {i}"} for sid in bulk_ids(i))
+    results["bulk_update_students_dry_run"] = _time_calls(
+        lambda i: sm.bulk_update_students(department=rng.choice(departments), set_active=False, dry_run=True),
+        max(iterations // 10, 1),
+    )
+    results["bulk_update_students_1000"] = _time_calls(
+        lambda i: sm.bulk_update_students(department=f"Bulk Bench {i}", set_active=False), bulk_batches
+    )
+    results["bulk_delete_students_1000"] = _time_calls(
+        lambda i: sm.bulk_delete_students(student_ids=bulk_ids(i)), bulk_batches
+    )
+    _remove_imported("BB")
+
+    rows = 0
+    started = time.perf_counter()
+    for _ in sm.iter_students(fields=["name", "student_id"]):
+        rows += 1
+    elapsed = time.perf_counter() - started
+    results["iter_students_full_scan"] = {"rows": rows, "seconds": elapsed,
+                                          "rows_per_second": rows / elapsed if elapsed else 0.0}
+    return results
@@ -0,0 +1,68 @@
+"""Benchmark result files and comparison against a baseline."""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Metrics where a lower value is better; everything else compared is higher-is-better
+LOWER_IS_BETTER = {"mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "ttft_p50_ms", "ttft_p95_ms", "ttft_p99_ms",
+                   "peak_rss_mb", "seconds"}
+COMPARED_METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms", "ttft_p95_ms",
+                    "rows_per_second", "peak_rss_mb")
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except Exception:
+        return "unknown"
+
+def build_report(config: Dict[str, Any], results: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "config": config,
+        "results": results,
+    }
+
+def write_report(report: Dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float = 0.2) -> List[Dict[str, Any]]:
+    """Per-metric changes relative to the baseline; ``regression`` marks a change worse than ``max_regression``."""
+    rows = []
+    for suite, benchmarks in current["results"].items():
+        for name, metrics in benchmarks.items():
+            base_metrics = baseline.get("results", {}).get(suite, {}).get(name)
+            if not base_metrics:
+                continue
+            for metric in COMPARED_METRICS:
+                new, old = metrics.get(metric), base_metrics.get(metric)
+                if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+                    continue
+                change = (new - old) / old
+                worse = change > max_regression if metric in LOWER_IS_BETTER else change < -max_regression
+                rows.append({"suite": suite, "benchmark": name, "metric": metric, "baseline": old,
+                             "current": new, "change": change, "regression": worse})
+    return rows
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    if not rows:
+        print("No overlapping benchmarks to compare with the baseline")
+        return
+    width = max(len(f"{r['suite']}.{r['benchmark']}") for r in rows)
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['suite'] + '.' + r['benchmark']:<{width}}  {r['metric']:<16} "
+              f"{r['baseline']:>12.2f} -> {r['current']:>12.2f}  {r['change']:+7.1%}{flag}")
@@ -0,0 +1,124 @@
+"""Benchmark and load-test runner.
+
+Seed a database, time every student management tool, drive the API with
+concurrent in-process clients (LLM calls go to a local fake Groq server) and
+write the results as JSON, optionally compared against an earlier run::
+
+    python -m benchmarks.run --reset --students 100000 --output baseline.json
+    # ... change something ...
+    python -m benchmarks.run --skip-seed --students 100000 --output current.json --baseline baseline.json
+    # throughput of the pre-forked server over HTTP at 1, 2, 4 and 8 worker processes
+    python -m benchmarks.run --skip-seed --students 100000 --suites scaling --workers 1,2,4,8
+
+Run it from the repository root. ``--database-url`` defaults to the app's
+DATABASE_URL (campus.db); seeding refuses to touch a database that already
+has students unless ``--reset`` is given. Exits with status 1 when a metric
+regressed by more than ``--max-regression``.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Campus Admin Agent benchmarks")
+    parser.add_argument("--database-url", help="Database to seed and benchmark (default: DATABASE_URL)")
+    parser.add_argument("--students", type=int, default=10000, help="Synthetic students to seed (10k-1M)")
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per seeded conversation")
+    parser.add_argument("--activity-events", type=int, default=50000)
+    parser.add_argument("--reset", action="store_true", help="Delete existing data before seeding")
+    parser.add_argument("--skip-seed", action="store_true", help="Benchmark the database as it is")
+    parser.add_argument("--suites", default="micro,load", help="Comma-separated: micro, load, scaling")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per microbenchmark")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per load scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent load-test clients")
+    parser.add_argument("--scenarios", help="Comma-separated load scenarios (default: all)")
+    parser.add_argument("--no-llm", action="store_true", help="Use the rule-based agent instead of the fake LLM")
+    parser.add_argument("--llm-first-token-delay", type=float, default=0.05)
+    parser.add_argument("--llm-token-delay", type=float, default=0.005)
+    parser.add_argument("--llm-base-url", help="Use an already running fake Groq server instead of an in-process one")
+    parser.add_argument("--workers", default="1,2,4", help="Server worker counts for the scaling suite")
+    parser.add_argument("--load-clients", type=int, default=4,
+                        help="Client processes generating load in the scaling suite")
+    parser.add_argument("--disable-caches", action="store_true", help="Turn off the tool and response caches")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown, e.g. 0.2")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Settings are read when backend modules are imported, so configure the environment first
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    if args.disable_caches:
+        os.environ["TOOL_CACHE_TTL"] = "0"
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("STREAM_FLUSH_INTERVAL", "0")
+
+    from benchmarks.seed import seed
+    from benchmarks.report import build_report, write_report, load_report, compare, print_comparison
+    from benchmarks.stats import peak_rss_mb
+    from backend.config import settings
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    results = {}
+    print(f"Database: {settings.DATABASE_URL}")
+    if not args.skip_seed:
+        print(f"Seeding {args.students} students ...")
+        results["seed"] = {"seed": seed(args.students, args.conversations, args.turns, args.activity_events,
+                                        reset=args.reset)}
+        print(f"  {results['seed']['seed']}")
+
+    if "micro" in suites:
+        from benchmarks.micro import run_micro
+        from backend.tools.counters import counters
+        counters.rebuild()
+        print("Microbenchmarks ...")
+        results["micro"] = run_micro(args.students, args.iterations)
+        for name, metrics in results["micro"].items():
+            if "p50_ms" in metrics:
+                print(f"  {name}: p50 {metrics['p50_ms']:.3f} ms, p99 {metrics['p99_ms']:.3f} ms")
+            else:
+                print(f"  {name}: {metrics['rows_per_second']:.0f} rows/s")
+
+    if "load" in suites:
+        from benchmarks.load import run_load
+        print(f"Load test: {args.requests} requests per scenario, {args.concurrency} clients ...")
+        scenarios = [s.strip() for s in args.scenarios.split(",")] if args.scenarios else None
+        results["load"] = asyncio.run(run_load(
+            args.students, args.requests, args.concurrency, scenarios, llm=not args.no_llm,
+            first_token_delay=args.llm_first_token_delay, token_delay=args.llm_token_delay,
+            llm_base_url=args.llm_base_url,
+        ))
+
+    if "scaling" in suites:
+        from benchmarks.scaling import run_scaling
+        print(f"Scaling test: {args.requests} requests per scenario, {args.concurrency} connections "
+              f"from {args.load_clients} client processes, {os.cpu_count()} CPUs ...")
+        scenarios = [s.strip() for s in args.scenarios.split(",")] if args.scenarios else None
+        # Chat scenarios use the rule-based agent unless a fake Groq server is given
+        env = ({"GROQ_API_KEY": "benchmark", "GROQ_BASE_URL": args.llm_base_url} if args.llm_base_url
+               else {"GROQ_API_KEY": ""})
+        results["scaling"] = run_scaling(
+            args.students, [int(w) for w in args.workers.split(",")], args.requests, args.concurrency,
+            args.load_clients, scenarios, env,
+        )
+
+    results["process"] = {"process": {"peak_rss_mb": round(peak_rss_mb(), 1)}}
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    config["database_url"] = settings.DATABASE_URL
+    report = build_report(config, results)
+    write_report(report, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        rows = compare(report, load_report(args.baseline), args.max_regression)
+        print_comparison(rows)
+        if any(r["regression"] for r in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
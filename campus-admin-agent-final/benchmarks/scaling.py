@@ -0,0 +1,163 @@
+"""Multi-worker scaling test: throughput of the real server as SERVER_WORKERS grows.
+
+Unlike ``load`` this goes over HTTP. For each worker count the server is
+started with ``python -m backend.main`` (pre-forked, sharing state through
+the default SQLite store) and driven by several client processes, so
+neither one server process nor one load generator caps the result.
+Throughput can only grow with the worker count when there is a core per
+worker plus spare cores for the clients, so ``cpu_count`` is recorded next
+to the results; speedup is measured, not assumed.
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.load import default_scenarios
+from benchmarks.stats import summarize
+
+DEFAULT_SCENARIOS = ["students_get", "students_list", "students_search", "analytics_total"]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_ready(base_url: str, workers: int, timeout: float = 60.0):
+    """Wait until every worker answers /health as ready (new connections land on different workers)."""
+    import httpx
+    ready = set()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with httpx.Client(base_url=base_url, timeout=5) as client:
+                health = client.get("/health").json()
+            if health.get("ready"):
+                ready.add(health["worker_pid"])
+                if len(ready) >= workers:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.05)
+    if not ready:
+        raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+    print(f"  warning: only {len(ready)} of {workers} workers answered before the timeout")
+
+def start_server(workers: int, port: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    server_env = dict(os.environ, SERVER_WORKERS=str(workers), SERVER_HOST="127.0.0.1", SERVER_PORT=str(port),
+                      **(env or {}))
+    process = subprocess.Popen([sys.executable, "-m", "backend.main"], env=server_env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(f"http://127.0.0.1:{port}", workers)
+    except Exception:
+        stop_server(process)
+        raise
+    return process
+
+def stop_server(process: subprocess.Popen):
+    """SIGTERM to the supervisor, which shuts its workers down gracefully."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def _drive(base_url: str, scenario: str, students: int, requests: int, concurrency: int,
+                 seed: int) -> Dict[str, Any]:
+    import httpx
+    build = default_scenarios(students, random.Random(seed))[scenario]
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one():
+            nonlocal errors
+            for i in counter:
+                method, path, body = build(i)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started_at = time.time()
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        finished_at = time.time()
+    return {"latencies": latencies, "errors": errors, "started_at": started_at, "finished_at": finished_at}
+
+def _client_process(base_url: str, scenario: str, students: int, requests: int, concurrency: int, seed: int,
+                    results):
+    results.put(asyncio.run(_drive(base_url, scenario, students, requests, concurrency, seed)))
+
+def run_clients(base_url: str, scenario: str, students: int, requests: int, concurrency: int,
+                clients: int) -> Dict[str, Any]:
+    """Split ``requests`` and ``concurrency`` over ``clients`` processes and merge their timings."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(target=_client_process, args=(
+            base_url, scenario, students, requests // clients + (i < requests % clients),
+            max(1, concurrency // clients), 1000 + i, results,
+        ))
+        for i in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    parts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    latencies = [latency for part in parts for latency in part["latencies"]]
+    wall = max(p["finished_at"] for p in parts) - min(p["started_at"] for p in parts)
+    result = summarize(latencies, wall, sum(p["errors"] for p in parts))
+    result.update(concurrency=concurrency, clients=clients)
+    return result
+
+def run_scaling(students: int, worker_counts: List[int], requests: int = 2000, concurrency: int = 64,
+                clients: int = 4, scenarios: Optional[List[str]] = None,
+                env: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Benchmark each scenario at each worker count; results are keyed ``<scenario>@<workers>w``.
+
+    Every result also gets ``speedup`` over the smallest worker count and
+    ``efficiency`` (speedup per added worker; 1.0 is perfectly linear).
+    """
+    selected = scenarios or DEFAULT_SCENARIOS
+    unknown = [name for name in selected if name not in default_scenarios(students, random.Random())]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+    worker_counts = sorted(set(worker_counts))
+    results: Dict[str, Dict[str, Any]] = {}
+    for workers in worker_counts:
+        port = _free_port()
+        print(f"  {workers} worker(s) on port {port} ...")
+        server = start_server(workers, port, env)
+        try:
+            for scenario in selected:
+                result = run_clients(f"http://127.0.0.1:{port}", scenario, students, requests, concurrency,
+                                     clients)
+                result.update(workers=workers, cpu_count=os.cpu_count())
+                results[f"{scenario}@{workers}w"] = result
+                print(f"    {scenario}: {result['throughput_rps']:.0f} req/s, "
+                      f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+        finally:
+            stop_server(server)
+
+    base_workers = worker_counts[0]
+    for scenario in selected:
+        base = results[f"{scenario}@{base_workers}w"]["throughput_rps"]
+        for workers in worker_counts:
+            result = results[f"{scenario}@{workers}w"]
+            result["speedup"] = result["throughput_rps"] / base if base else 0.0
+            result["efficiency"] = result["speedup"] / (workers / base_workers)
+    return results
@@ -0,0 +1,118 @@
+"""Synthetic data for benchmarks: students, conversation histories and activity logs."""
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from sqlalchemy import func, insert
+from sqlalchemy.engine import make_url
+from backend.models.database import (
+    Base, Student, ConversationMemory, ActivityLog, SessionLocal, engine, init_db
+)
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Aisha", "Wei",
+               "Carlos", "Fatima", "Hiroshi", "Olga", "Kwame", "Priya", "Mateo", "Ingrid", "Omar", "Yuki"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+              "Okafor", "Nakamura", "Petrov", "Haddad", "Nguyen", "Kowalski", "Silva", "Cohen", "Patel", "Kim"]
+DEPARTMENTS = ["Computer Science", "Mathematics", "Physics", "Biology", "Chemistry", "History", "Economics",
+               "Engineering"]
+EVENT_TYPES = ["student_created", "student_updated", "tool_call", "login", "course_registered"]
+USER_MESSAGES = ["how many students are there", "list students", "students per department",
+                 "show department activity", "what is the add/drop deadline", "find student smith"]
+
+def reset_database():
+    """Drop all benchmark-relevant data by recreating the schema (the SQLite file is deleted outright)."""
+    url = make_url(str(engine.url))
+    engine.dispose()
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(url.database + suffix):
+                os.remove(url.database + suffix)
+    else:
+        Base.metadata.drop_all(bind=engine)
+    init_db()
+
+def _insert_chunked(model, rows, chunk_size: int = 10000) -> int:
+    total = 0
+    chunk = []
+    db = SessionLocal()
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                db.execute(insert(model), chunk)
+                db.commit()
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            db.execute(insert(model), chunk)
+            db.commit()
+            total += len(chunk)
+    finally:
+        db.close()
+    return total
+
+def seed(students: int = 10000, conversations: int = 1000, turns_per_conversation: int = 10,
+         activity_events: int = 50000, reset: bool = False, random_seed: int = 42) -> Dict[str, Any]:
+    """Fill the configured database with synthetic rows.
+
+    Refuses to touch a database that already has students unless ``reset``
+    is set, so pointing it at a real ``campus.db`` by mistake is harmless.
+    """
+    if reset:
+        reset_database()
+    else:
+        init_db()
+        db = SessionLocal()
+        try:
+            existing = db.query(func.count(Student.id)).scalar()
+        finally:
+            db.close()
+        if existing:
+            raise RuntimeError(f"Database already has {existing} students; pass reset=True (--reset) to replace them")
+
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+
+    def student_rows():
+        for i in range(students):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield {
+                "name": f"{first} {last}",
+                "student_id": f"B{i:07d}",
+                "email": f"{first.lower()}.{last.lower()}{i}@campus.edu",
+                "department": rng.choice(DEPARTMENTS),
+                "onboarded_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+                "active": rng.random() < 0.9,
+            }
+
+    def conversation_rows():
+        for c in range(conversations):
+            start = now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600))
+            for t in range(turns_per_conversation):
+                user_turn = t % 2 == 0
+                yield {
+                    "session_id": f"bench-{c}",
+                    "role": "user" if user_turn else "assistant",
+                    "message": rng.choice(USER_MESSAGES) if user_turn else "There are 10000 students in the system.",
+                    "created_at": start + timedelta(seconds=5 * t),
+                }
+
+    def activity_rows():
+        for _ in range(activity_events):
+            yield {
+                "student_id": f"B{rng.randrange(max(students, 1)):07d}",
+                "event_type": rng.choice(EVENT_TYPES),
+                "timestamp": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+            }
+
+    counts = {
+        "students": _insert_chunked(Student, student_rows()),
+        "conversation_turns": _insert_chunked(ConversationMemory, conversation_rows()),
+        "activity_events": _insert_chunked(ActivityLog, activity_rows()),
+    }
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    return counts
@@ -0,0 +1,38 @@
+import math
+import resource
+import sys
+from typing import Any, Dict, List, Optional
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0,
+              first_token: Optional[List[float]] = None) -> Dict[str, Any]:
+    """Throughput and latency percentiles (ms) for one benchmark; latencies are in seconds."""
+    ordered = sorted(latencies)
+    ms = [v * 1000 for v in ordered]
+    result = {
+        "count": len(ordered),
+        "errors": errors,
+        "throughput_rps": len(ordered) / wall_seconds if wall_seconds > 0 else 0.0,
+        "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": ms[-1] if ms else 0.0,
+    }
+    if first_token:
+        ttft = sorted(v * 1000 for v in first_token)
+        result.update(ttft_p50_ms=percentile(ttft, 50), ttft_p95_ms=percentile(ttft, 95),
+                      ttft_p99_ms=percentile(ttft, 99))
+    return result
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
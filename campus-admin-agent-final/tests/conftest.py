@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point everything at a scratch directory before the backend loads
+_scratch = tempfile.mkdtemp(prefix="campus-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_scratch}/campus.db",
+    "GROQ_API_KEY": "",
+    "GROQ_BASE_URL": "",
+    "PDF_STORAGE_PATH": os.path.join(_scratch, "pdfs"),
+    "VECTOR_DB_PATH": os.path.join(_scratch, "vector_db"),
+    "NOTIFICATION_FILE_PATH": os.path.join(_scratch, "notifications.jsonl"),
+    "NOTIFICATION_WORKERS": "0",
+    "SERVER_WORKERS": "1",
+    "SHARED_STATE_URL": "memory://",
+    "COUNTERS_RECONCILE_INTERVAL": "0",
+    "PROFILER_ENABLED": "false",
+})
+
+import pytest
+from backend.models.database import Base, engine, init_db
+from backend.shared_state import shared_state
+from backend.tools.activity_log import activity_logger
+from backend.tools.cache import invalidate_student_caches
+from backend.tools.campus_analytics import rollup_engine
+from backend.tools.counters import counters
+from backend.tools.student_management import import_students
+from backend.tools.student_search import student_index
+from backend.agent.memory import memory_store
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    init_db()
+    student_index.setup()
+    yield
+    activity_logger.close()
+    memory_store.close()
+
+@pytest.fixture(autouse=True)
+def clean_state(database):
+    """Every test starts from empty tables, fresh counters and empty caches."""
+    activity_logger.flush()
+    memory_store.flush()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence")
+    shared_state.flushall()
+    with memory_store._lock:
+        memory_store._sessions.clear()
+    rollup_engine._refreshed_at = None
+    counters.rebuild()
+    invalidate_student_caches()
+    yield
+
+def make_students(count: int, department: str = "CS", prefix: str = "S", active: bool = True):
+    """Import ``count`` students; returns their student IDs."""
+    rows = [{"name": f"Student {prefix}{i}", "student_id": f"{prefix}{i:05d}",
+             "email": f"{prefix.lower()}{i}@campus.local", "department": department} for i in range(count)]
+    result = import_students(rows)
+    assert result["success"], result
+    ids = [row["student_id"] for row in rows]
+    if not active:
+        from backend.tools.student_management import bulk_update_students
+        assert bulk_update_students(student_ids=ids, set_active=False)["success"]
+    return ids
+
+@pytest.fixture
+def students():
+    return make_students
+
+@pytest.fixture
+def client():
+    """API client without the lifespan: tests call the pieces they need directly."""
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    return TestClient(app)
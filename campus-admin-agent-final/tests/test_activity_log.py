@@ -0,0 +1,97 @@
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from backend.models.database import engine
+from backend.tools.activity_log import ActivityLogger, get_activity_events
+
+@pytest.fixture
+def inserts():
+    """Number of INSERT statements sent for activity_logs."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO activity_logs"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+def _logger(monkeypatch, **options):
+    """A logger whose background writer never starts, so only explicit flushes write."""
+    logger = ActivityLogger(flush_interval=60, **options)
+    monkeypatch.setattr(logger, "_ensure_writer", lambda: None)
+    return logger
+
+def test_flush_writes_in_batches(monkeypatch, inserts):
+    logger = _logger(monkeypatch, batch_size=3)
+    for i in range(7):
+        assert logger.log("student_viewed", f"S{i}")
+    assert logger.flush() == 7 and len(inserts) == 3
+    assert logger.flush() == 0
+    assert logger.metrics()["written"] == 7 and logger.metrics()["max_queue_depth"] == 7
+    assert len(get_activity_events(limit=10)["events"]) == 7
+
+def test_writer_thread_flushes_on_its_own_and_close_drains():
+    logger = ActivityLogger(batch_size=2, flush_interval=0.05)
+    logger.log("student_viewed", "S1")
+    deadline = time.monotonic() + 5
+    while logger.written == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert logger.written == 1
+    logger._stopping.set()
+    logger._writer.join(timeout=5)
+    # Queued after the writer stopped; close still writes it
+    logger.log("student_viewed", "S2")
+    logger.close()
+    assert logger.written == 2 and logger._writer is None
+
+def test_block_policy_waits_for_the_writer(monkeypatch):
+    logger = _logger(monkeypatch, max_queue=2, overflow_policy="block", block_timeout=5)
+    logger.log("a")
+    logger.log("b")
+    flusher = threading.Timer(0.1, logger.flush)
+    flusher.start()
+    assert logger.log("c") is True
+    flusher.join()
+    logger.flush()
+    logger.log("d")
+    logger.log("e")
+    # From the event loop the event is dropped rather than waited for
+    started = time.monotonic()
+    assert logger.log("f", block=False) is False
+    assert time.monotonic() - started < 1
+    assert logger.metrics()["dropped"] == 1
+
+def test_block_policy_gives_up_after_the_timeout(monkeypatch):
+    logger = _logger(monkeypatch, max_queue=1, overflow_policy="block", block_timeout=0.05)
+    logger.log("a")
+    assert logger.log("b") is False and logger.dropped == 1
+
+def test_drop_policies_count_instead_of_blocking(monkeypatch):
+    newest = _logger(monkeypatch, max_queue=2, overflow_policy="drop_newest", block_timeout=5)
+    oldest = _logger(monkeypatch, max_queue=2, overflow_policy="drop_oldest", block_timeout=5)
+    started = time.monotonic()
+    for name in "abc":
+        newest.log(name)
+        oldest.log(name)
+    assert time.monotonic() - started < 1
+    assert [e["event_type"] for e in newest._queue] == ["a", "b"] and newest.dropped == 1
+    assert [e["event_type"] for e in oldest._queue] == ["b", "c"] and oldest.dropped == 1
+    with pytest.raises(ValueError):
+        ActivityLogger(overflow_policy="drop_everything")
+
+def test_events_page_newest_first(monkeypatch):
+    logger = _logger(monkeypatch)
+    for i in range(5):
+        logger.log("student_viewed" if i % 2 else "student_created", f"S{i}", {"n": i})
+    logger.flush()
+    first = get_activity_events(limit=2)
+    assert [e["student_id"] for e in first["events"]] == ["S4", "S3"]
+    second = get_activity_events(limit=2, before=first["next_before"])
+    third = get_activity_events(limit=2, before=second["next_before"])
+    assert [e["student_id"] for e in second["events"] + third["events"]] == ["S2", "S1", "S0"]
+    assert third["next_before"] is None
+    created = get_activity_events(event_type="student_created")["events"]
+    assert [(e["student_id"], e["details"]) for e in created] == [("S4", {"n": 4}), ("S2", {"n": 2}), ("S0", {"n": 0})]
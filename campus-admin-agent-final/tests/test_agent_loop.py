@@ -0,0 +1,118 @@
+import asyncio
+import json
+import threading
+import time
+import httpx
+import pytest
+from backend.agent import fake_groq
+from backend.agent.core import CampusAdminAgent
+from backend.agent.llm import LLMClient
+from backend.config import settings
+from backend.tools import TOOLS
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Hands requests to the fake Groq app and keeps their JSON bodies."""
+
+    def __init__(self, **options):
+        self.inner = httpx.ASGITransport(app=fake_groq.create_app(first_token_delay=0, token_delay=0, **options))
+        self.bodies = []
+
+    async def handle_async_request(self, request):
+        self.bodies.append(json.loads(await request.aread()))
+        return await self.inner.handle_async_request(request)
+
+@pytest.fixture
+def transport():
+    return RecordingTransport()
+
+@pytest.fixture
+def agent(transport):
+    agent = CampusAdminAgent()
+    agent.llm = LLMClient(api_key="fake", base_url="http://fake-groq", transport=transport)
+    return agent
+
+def _reply(agent, message):
+    async def run():
+        try:
+            return await agent._collect(agent._llm_reply([{"role": "user", "content": message}], "loop"))
+        finally:
+            await agent.llm.aclose()
+    return asyncio.run(run())
+
+def test_tool_results_go_back_to_the_model(agent, transport, students):
+    students(3)
+    reply = _reply(agent, "use get_total_students")
+    assert reply == "Tool results: get_total_students: 3"
+    first, second = transport.bodies
+    assert "tools" in first
+    call = second["messages"][-2]["tool_calls"][0]
+    assert call["function"]["name"] == "get_total_students"
+    assert second["messages"][-1] == {"role": "tool", "tool_call_id": call["id"], "name": "get_total_students",
+                                      "content": "3"}
+
+def test_last_step_is_made_without_tools(agent, transport, monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_MAX_STEPS", 1)
+    reply = _reply(agent, "use get_total_students")
+    # Offered the tool, the fake would have called it; without tools it has to answer
+    assert [("tools" in body) for body in transport.bodies] == [False]
+    assert reply.endswith("You said: use get_total_students")
+
+def test_time_budget_ends_the_loop_and_times_out_slow_tools(agent, transport, monkeypatch):
+    def slow_total():
+        """Slow read."""
+        time.sleep(0.5)
+        return 0
+
+    monkeypatch.setitem(TOOLS, "get_total_students", slow_total)
+    monkeypatch.setattr(settings, "AGENT_TIME_BUDGET", 0.05)
+    started = time.monotonic()
+    reply = _reply(agent, "use get_total_students")
+    # Tools get at least 0.1s once the budget is spent, and the next model call has to answer
+    assert time.monotonic() - started < 0.45
+    assert reply == 'Tool results: get_total_students: {"error": "Tool get_total_students timed out"}'
+    assert [("tools" in body) for body in transport.bodies] == [True, False]
+
+def test_each_loop_gets_its_own_client_and_closes_it(agent):
+    for _ in range(3):
+        assert _reply(agent, "hello").startswith("This is a canned reply")
+    assert agent.llm.metrics()["clients"] == 0
+
+    async def leak():
+        await agent.llm.complete([{"role": "user", "content": "hi"}])
+    asyncio.run(leak())
+    asyncio.run(leak())
+    # The first loop ended without closing its client; the second loop drops it instead of reusing it
+    assert agent.llm.metrics()["clients"] == 1 and agent.llm.abandoned_clients == 1
+
+def test_blocking_calls_use_the_running_server_loop(agent):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(agent.llm.complete([{"role": "user", "content": "warm"}]), loop).result(5)
+        assert agent.llm.main_loop is loop
+        reply = agent.handle_message("sync", "hello from a script")
+        assert reply.endswith("You said: hello from a script")
+        assert agent.llm.metrics()["clients"] == 1
+    finally:
+        asyncio.run_coroutine_threadsafe(agent.llm.aclose(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+    assert agent.llm.metrics()["clients"] == 0
+
+def test_in_flight_count_is_exact_across_loops(agent):
+    async def burst():
+        try:
+            await asyncio.gather(*[agent.llm.complete([{"role": "user", "content": "hi"}]) for _ in range(5)])
+        finally:
+            await agent.llm.aclose()
+
+    # Each thread runs its own loop, so the counter is updated from several threads at once
+    threads = [threading.Thread(target=asyncio.run, args=(burst(),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    metrics = agent.llm.metrics()
+    assert (metrics["in_flight"], metrics["clients"]) == (0, 0)
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from backend.models.database import ActivityLog, SessionLocal, Student
+from backend.tools.counters import counters
+from backend.tools.student_management import (
+    get_activity_event_counts, get_department_activity_breakdown, get_onboarding_counts,
+    get_students_by_department, get_total_students, update_student,
+)
+
+def test_department_counts_from_sql(students):
+    students(3, "CS", prefix="C")
+    students(2, "Math", prefix="M")
+    update_student("C00000", active=False)
+    counters.invalidate()
+
+    assert get_total_students() == 5
+    assert get_students_by_department() == {"CS": 3, "Math": 2}
+    assert get_department_activity_breakdown() == {
+        "CS": {"active": 2, "inactive": 1, "total": 3},
+        "Math": {"active": 2, "inactive": 0, "total": 2},
+    }
+
+def test_onboarding_counts_by_interval():
+    db = SessionLocal()
+    days = [datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 17), datetime(2024, 1, 3, 8), datetime(2024, 2, 10, 12)]
+    db.add_all(Student(name=f"N{i}", student_id=f"O{i}", email=f"o{i}@x", onboarded_at=day)
+               for i, day in enumerate(days))
+    db.commit()
+    db.close()
+
+    daily = get_onboarding_counts("day")
+    assert [(c["period"], c["count"]) for c in daily["counts"]] == [
+        ("2024-01-01", 2), ("2024-01-03", 1), ("2024-02-10", 1),
+    ]
+    monthly = get_onboarding_counts("month", start=datetime(2024, 1, 2))
+    assert [(c["period"], c["count"]) for c in monthly["counts"]] == [("2024-01-01", 1), ("2024-02-01", 1)]
+    # 2024-01-01 and 2024-01-03 fall in the ISO week starting Monday 2024-01-01
+    weekly = get_onboarding_counts("week", end=datetime(2024, 2, 1))
+    assert [(c["period"], c["count"]) for c in weekly["counts"]] == [("2024-01-01", 3)]
+    assert "error" in get_onboarding_counts("year")
+
+def test_activity_event_counts_within_range():
+    now = datetime.utcnow()
+    db = SessionLocal()
+    db.add_all([
+        ActivityLog(student_id="A", event_type="student_created", timestamp=now - timedelta(days=2)),
+        ActivityLog(student_id="A", event_type="student_updated", timestamp=now - timedelta(hours=1)),
+        ActivityLog(student_id="B", event_type="student_updated", timestamp=now - timedelta(minutes=5)),
+    ])
+    db.commit()
+    db.close()
+
+    assert get_activity_event_counts() == {"student_created": 1, "student_updated": 2}
+    assert get_activity_event_counts(start=now - timedelta(days=1)) == {"student_updated": 2}
+    assert get_activity_event_counts(end=now - timedelta(minutes=30)) == {"student_created": 1, "student_updated": 1}
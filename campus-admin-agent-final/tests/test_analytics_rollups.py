@@ -0,0 +1,118 @@
+import threading
+from datetime import datetime
+from backend.models.database import AnalyticsRollup, SessionLocal, Student, engine as db_engine, init_db
+from backend.tools.campus_analytics import RollupEngine, get_onboarding_timeseries
+from backend.tools.student_management import add_student, delete_student
+from backend.tools.student_search import search_students, student_index
+
+DAY = datetime(2024, 3, 1, 10)
+
+def _add(*ids, department="CS"):
+    db = SessionLocal()
+    db.add_all(Student(id=i, name=f"N{i}", student_id=f"R{i}", email=f"r{i}@x", department=department,
+                       onboarded_at=DAY) for i in ids)
+    db.commit()
+    db.close()
+
+def _onboarded():
+    db = SessionLocal()
+    try:
+        return {dim: value for dim, value in db.query(AnalyticsRollup.dimension, AnalyticsRollup.value)
+                .filter(AnalyticsRollup.metric == "onboarding_daily")}
+    finally:
+        db.close()
+
+def test_refresh_counts_only_new_rows():
+    engine = RollupEngine(chunk_size=2)
+    _add(1, 2, 3)
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 3}
+    _add(4, 5, department="Math")
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 2}
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 0}
+    assert _onboarded() == {"CS": 3, "Math": 2}
+    series = get_onboarding_timeseries("month")["series"]
+    assert series == [{"period": "2024-03-01T00:00:00", "total": 5, "by_department": {"CS": 3, "Math": 2}}]
+
+def test_rows_committed_out_of_id_order_are_counted_late():
+    engine = RollupEngine(lag_ids=10, lag_seconds=60)
+    # Id 2 was handed to a transaction that commits after the one holding id 3
+    _add(1, 3)
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 2}
+    _add(2)
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 1}
+    assert engine.late_rows == 1 and _onboarded() == {"CS": 3}
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 0}
+
+def test_missing_ids_are_given_up_after_the_lag():
+    engine = RollupEngine(lag_ids=10, lag_seconds=0)
+    _add(1, 3)
+    engine.refresh(["onboarding_daily"])
+    engine.refresh(["onboarding_daily"])
+    _add(2)
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 0}
+    assert _onboarded() == {"CS": 2}
+
+def test_concurrent_refreshes_count_every_row_once():
+    _add(*range(1, 301))
+    engines = [RollupEngine(chunk_size=7) for _ in range(3)]
+    errors = []
+
+    def refresh(engine):
+        try:
+            engine.refresh(["onboarding_daily"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=refresh, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert _onboarded() == {"CS": 300}
+    assert sum(engine.rows_rolled_up for engine in engines) == 300
+
+def test_counts_are_added_to_existing_buckets():
+    engine = RollupEngine()
+    for _ in range(2):
+        db = SessionLocal()
+        engine._add_counts(db, "onboarding_daily", {(DAY, "CS"): 2, (DAY, "Math"): 1})
+        db.commit()
+        db.close()
+    assert _onboarded() == {"CS": 4, "Math": 2}
+
+def test_ids_of_deleted_newest_rows_are_not_reused():
+    engine = RollupEngine()
+    add_student("A", "A1", "a@x", "CS")
+    add_student("B", "B1", "b@x", "CS")
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 2}
+    delete_student("B1")
+    add_student("C", "C1", "c@x", "Math")
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 1}
+    assert sum(_onboarded().values()) == 3
+
+def test_tables_without_autoincrement_are_rebuilt():
+    add_student("A", "A1", "a@x", "CS")
+    add_student("B", "B1", "b@x", "CS")
+    RollupEngine().refresh(["onboarding_daily"])
+    with db_engine.begin() as conn:
+        # What an older schema looked like: a plain INTEGER PRIMARY KEY and a reusable id
+        conn.exec_driver_sql("DELETE FROM students WHERE student_id = 'B1'")
+        ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'students'").scalar()
+        conn.exec_driver_sql("ALTER TABLE students RENAME TO students_new")
+        conn.exec_driver_sql(ddl.replace("AUTOINCREMENT", ""))
+        conn.exec_driver_sql("INSERT INTO students SELECT * FROM students_new")
+        conn.exec_driver_sql("DROP TABLE students_new")
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'students'")
+    init_db()
+    student_index.setup()
+    # As after a restart: the new process has not reserved any ids yet
+    engine = RollupEngine()
+    with db_engine.connect() as conn:
+        assert "AUTOINCREMENT" in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE name = 'students'").scalar()
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 0}
+    add_student("Marie Curie", "C1", "c@x", "Math")
+    assert engine.refresh(["onboarding_daily"]) == {"onboarding_daily": 1}
+    # The search triggers survived the rebuild
+    assert [s["student_id"] for s in search_students("Curie")["students"]] == ["C1"]
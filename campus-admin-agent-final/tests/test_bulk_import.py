@@ -0,0 +1,94 @@
+import asyncio
+import json
+import httpx
+from backend.main import app
+from backend.models.database import SessionLocal, Student
+from backend.tools.counters import counters
+from backend.tools.student_management import add_student, import_students
+
+def _names():
+    db = SessionLocal()
+    try:
+        return {sid: name for sid, name in db.query(Student.student_id, Student.name)}
+    finally:
+        db.close()
+
+async def _chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+async def _post(url: str, content, **kwargs) -> httpx.Response:
+    # Unlike TestClient, the ASGI transport hands the app the body chunk by chunk as it is produced
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.post(url, content=content, **kwargs)
+
+def test_import_reports_bad_and_duplicate_rows(students):
+    students(1)
+    result = import_students([
+        {"name": "A", "student_id": "N1", "email": "a@x"},
+        {"name": "B", "student_id": "N1", "email": "b@x"},
+        {"name": "C", "student_id": "S00000", "email": "c@x"},
+        {"name": "D", "email": "d@x"},
+    ], chunk_size=2)
+    assert result["inserted"] == 1 and result["failed"] == 3
+    assert [e["row"] for e in result["errors"]] == [2, 3, 4]
+    assert counters.total() == 2
+
+def test_csv_import_handles_quoted_newlines_and_split_characters():
+    body = ('\ufeffname,student_id,email,department\n'
+            '"Zoë\nSecond line",Q1,zoe@x,Ingeniería\n'
+            'Łukasz,Q2,l@x,CS\n').encode("utf-8")
+    # One-byte chunks split every multi-byte character and the quoted newline across reads
+    response = asyncio.run(_post("/students/bulk?format=csv", _chunked(body, 1),
+                                 headers={"content-type": "text/csv"}))
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+    assert _names() == {"Q1": "Zoë\nSecond line", "Q2": "Łukasz"}
+
+def test_malformed_rows_do_not_abort_the_import(client):
+    body = ("name,student_id,email\n"
+            f"Long,L0,{'x' * 200000}\n"
+            "Ok,L1,ok@x\n").encode()
+    response = client.post("/students/bulk?format=csv", content=body)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["inserted"] == 1
+    assert result["errors"][0]["row"] == 1 and "field larger" in result["errors"][0]["error"]
+
+def test_ndjson_import_and_invalid_lines(client):
+    lines = [json.dumps({"name": "A", "student_id": "J1", "email": "a@x"}), "[1, 2]", "{oops", "",
+             json.dumps({"name": "B", "student_id": "J2", "email": "b@x", "department": "Math"})]
+    response = client.post("/students/bulk", content="\n".join(lines).encode())
+    result = response.json()
+    assert result["inserted"] == 2
+    assert [e["row"] for e in result["errors"]] == [2, 3]
+    assert sorted(_names()) == ["J1", "J2"]
+
+def test_non_utf8_body_is_rejected(client):
+    response = client.post("/students/bulk?format=csv", content=b"name,student_id,email\n\xff\xfe,X,y\n")
+    assert response.status_code == 400
+    assert _names() == {}
+
+def test_slow_upload_does_not_block_other_writers():
+    """While the body is still arriving, other requests can write students."""
+    async def scenario():
+        arrived, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_body():
+            yield b"name,student_id,email\nA,U1,a@x\n"
+            arrived.set()
+            await release.wait()
+            yield b"B,U2,b@x\n"
+
+        upload = asyncio.create_task(_post("/students/bulk?format=csv&chunk_size=1", slow_body()))
+        await arrived.wait()
+        await asyncio.sleep(0.1)
+        # With an import transaction open since the first row this would wait out the busy timeout and fail
+        written = await asyncio.wait_for(asyncio.to_thread(add_student, "During", "U3", "d@x"), 3)
+        release.set()
+        return written, await upload
+
+    written, response = asyncio.run(scenario())
+    assert written["success"]
+    assert response.json()["inserted"] == 2
+    assert sorted(_names()) == ["U1", "U2", "U3"]
@@ -0,0 +1,82 @@
+from backend.models.database import SessionLocal, Student
+from backend.tools import student_management
+from backend.tools.counters import counters
+from backend.tools.student_management import (
+    bulk_delete_students, bulk_update_students, get_students_by_department, update_student,
+)
+from backend.tools.student_search import StudentSearchIndex, search_students
+
+def _rows():
+    db = SessionLocal()
+    try:
+        return {sid: (department, active) for sid, department, active
+                in db.query(Student.student_id, Student.department, Student.active)}
+    finally:
+        db.close()
+
+def test_dry_run_matches_the_real_update(students):
+    students(6, "CS", prefix="C")
+    students(3, "Math", prefix="M")
+    update_student("C00001", active=False)
+    update_student("C00004", active=False)
+    before = _rows()
+
+    preview = bulk_update_students(department="CS", set_active=False, dry_run=True)
+    assert _rows() == before
+    assert preview == {"success": True, "dry_run": True, "matched": 6, "by_department": {"CS": 6},
+                       "would_change": 4}
+    result = bulk_update_students(department="CS", set_active=False, chunk_size=4)
+    assert (result["matched"], result["updated"]) == (preview["matched"], preview["would_change"])
+    assert not any(active for sid, (_, active) in _rows().items() if sid.startswith("C"))
+
+def test_dry_run_by_ids_reports_missing_ones(students):
+    students(3, "CS")
+    preview = bulk_delete_students(student_ids=["S00000", "S00002", "NOPE"], dry_run=True)
+    assert (preview["matched"], preview["would_change"], preview["missing"]) == (2, 2, ["NOPE"])
+    result = bulk_delete_students(student_ids=["S00000", "S00002", "NOPE"])
+    assert (result["matched"], result["deleted"], result["missing"]) == (2, 2, ["NOPE"])
+    assert list(_rows()) == ["S00001"]
+
+def test_ids_and_filters_intersect(students):
+    students(3, "CS", prefix="C")
+    students(3, "Math", prefix="M")
+    ids = ["C00000", "C00001", "M00000", "M00001"]
+    result = bulk_update_students(student_ids=ids, department="Math", set_department="Physics")
+    # Listed students outside the filter are reported missing and left alone
+    assert (result["matched"], result["updated"], result["missing"]) == (2, 2, ["C00000", "C00001"])
+    rows = _rows()
+    assert [sid for sid, (department, _) in sorted(rows.items()) if department == "Physics"] == ["M00000", "M00001"]
+    assert rows["C00000"] == ("CS", True)
+    assert bulk_delete_students(student_ids=ids, department="CS", active=False, dry_run=True)["matched"] == 0
+
+def test_chunks_cover_every_row_once(students):
+    ids = students(25, "CS")
+    by_filter = bulk_update_students(department="CS", set_department="Math", chunk_size=10)
+    assert (by_filter["matched"], by_filter["updated"], by_filter["chunks"]) == (25, 25, 3)
+    by_ids = bulk_delete_students(student_ids=ids[:17] + ids[:3], chunk_size=5)
+    # Repeated ids are matched once
+    assert (by_ids["matched"], by_ids["deleted"], by_ids["chunks"]) == (17, 17, 4)
+    assert sorted(_rows()) == ids[17:]
+
+def test_counters_and_search_follow_bulk_writes(students):
+    students(4, "CS")
+    bulk_update_students(student_ids=["S00000", "S00001"], set_department="Math")
+    bulk_delete_students(student_ids=["S00002"])
+    assert get_students_by_department() == {"CS": 1, "Math": 2}
+    assert counters.total() == 3
+    assert [s["student_id"] for s in search_students("Student S2")["students"]] == []
+
+def test_bulk_operations_need_a_target():
+    assert "error" in bulk_delete_students()
+    assert "error" in bulk_update_students(student_ids=["X"])
+    assert "error" in bulk_update_students(department="CS", set_active=True, chunk_size=-1)
+
+def test_trigram_search_follows_bulk_writes(students, monkeypatch):
+    index = StudentSearchIndex(backend="trigram")
+    index.setup()
+    monkeypatch.setattr(student_management, "student_index", index)
+    students(3, "CS")
+    bulk_update_students(student_ids=["S00000"], set_department="Astronomy")
+    bulk_delete_students(student_ids=["S00001"])
+    assert [s["student_id"] for s in index.search("astronomy", 10)] == ["S00000"]
+    assert index.metrics()["indexed_students"] == 2
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from backend.agent.core import CampusAdminAgent
+from backend.tools import execute_tool
+from backend.tools.cache import (
+    TTLCache, invalidate_student_caches, normalize_prompt, response_cache, tool_cache, tool_cache_key,
+)
+from backend.tools.student_management import add_student, update_student
+
+def test_entries_expire_and_the_least_recently_used_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" was used least recently
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    time.sleep(0.06)
+    assert cache.get("a", "gone") == "gone"
+    assert cache.metrics()["entries"] == 1 and cache.metrics()["hits"] == 3
+
+def test_values_read_before_an_invalidation_are_refused():
+    cache = TTLCache(max_entries=10, ttl=60)
+    generation = cache.generation()
+    cache.invalidate()
+    cache.put("stale", "read before the write", generation)
+    assert cache.get("stale") is None
+    cache.put("fresh", "read after the write", cache.generation())
+    assert cache.get("fresh") == "read after the write"
+
+def test_tool_results_are_cached_until_a_write(students):
+    students(1)
+    key = tool_cache_key("get_student", {"student_id": "S00000"})
+    first = execute_tool("get_student", student_id="S00000")
+    assert tool_cache.get(key) == first
+    update_student("S00000", department="Math")
+    assert tool_cache.get(key) is None
+    assert execute_tool("get_student", student_id="S00000")["student"]["department"] == "Math"
+    # Errors are never cached
+    execute_tool("get_student", student_id="NOPE")
+    assert tool_cache.get(tool_cache_key("get_student", {"student_id": "NOPE"})) is None
+
+def test_slow_read_racing_a_write_does_not_repopulate(students):
+    students(1)
+    generation = tool_cache.generation()
+    invalidate_student_caches()
+    tool_cache.put(tool_cache_key("get_total_students", {}), 99, generation)
+    assert execute_tool("get_total_students") == 1
+
+def test_prompts_are_normalized():
+    assert normalize_prompt("  How many   STUDENTS?! ") == "how many students"
+    assert normalize_prompt("list students, by department") == normalize_prompt("List students by-department")
+
+def test_rule_based_replies_are_shared_until_a_write(students):
+    students(2)
+    agent = CampusAdminAgent()
+    agent.llm = None
+    first = asyncio.run(agent._async_rule_based("a", "How many students?"))
+    assert response_cache.get(normalize_prompt("how many students")) == first
+    assert asyncio.run(agent._async_rule_based("b", "how many students")) == first
+    add_student("New", "N1", "n1@campus.local")
+    after = asyncio.run(agent._async_rule_based("a", "How many students?"))
+    assert after != first and "3" in after
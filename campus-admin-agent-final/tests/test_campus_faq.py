@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from backend.tools.campus_faq import FAQIndex, HashingEmbedder, chunk_text
+
+LIBRARY = "The library opens at 8am and closes at midnight during exam weeks."
+PARKING = "Parking permits are issued by the transport office for one semester."
+HOUSING = "Housing applications for dormitory rooms close in May."
+
+def _write(folder, name, text):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+def _index(tmp_path):
+    return FAQIndex(str(tmp_path / "docs"), str(tmp_path / "index"))
+
+def test_chunks_overlap_and_cover_every_word():
+    words = [f"w{i}" for i in range(12)]
+    chunks = chunk_text(" ".join(words), chunk_words=5, overlap=2)
+    assert chunks == ["w0 w1 w2 w3 w4", "w3 w4 w5 w6 w7", "w6 w7 w8 w9 w10", "w9 w10 w11"]
+    assert chunk_text("just a few words", chunk_words=5, overlap=2) == ["just a few words"]
+    assert chunk_text("  \n ") == []
+
+def test_embeddings_are_deterministic_and_normalized():
+    texts = [LIBRARY, PARKING, ""]
+    first = HashingEmbedder(dim=256).embed(texts)
+    again = HashingEmbedder(dim=256).embed(texts)
+    assert first.shape == (3, 256) and first.dtype == np.float32
+    assert np.array_equal(first, again)
+    assert np.allclose(np.linalg.norm(first[:2], axis=1), 1.0) and not first[2].any()
+    assert first[0] @ first[1] < 0.5
+
+def test_ingest_reembeds_only_changed_files(tmp_path):
+    docs = tmp_path / "docs"
+    _write(docs, "library.txt", LIBRARY)
+    _write(docs, "parking.md", PARKING)
+    index = _index(tmp_path)
+    assert index.ingest() == {"success": True, "changed": ["library.txt", "parking.md"], "removed": [], "chunks": 2}
+    assert index.ingest()["changed"] == []
+
+    _write(docs, "parking.md", PARKING + " Permits cost 50 dollars.")
+    _write(docs, "housing.txt", HOUSING)
+    os.remove(docs / "library.txt")
+    result = index.ingest()
+    assert (result["changed"], result["removed"], result["chunks"]) == (["housing.txt", "parking.md"], ["library.txt"], 2)
+    # The new files were swapped in whole and no temporary file was left behind
+    assert sorted(os.listdir(tmp_path / "index")) == ["index.json", "vectors.npy"]
+    assert isinstance(index._vectors, np.memmap)
+
+    reopened = _index(tmp_path)
+    reopened.load()
+    assert isinstance(reopened._vectors, np.memmap) and reopened._vectors.shape == (2, index.embedder.dim)
+    assert reopened.search_many(["parking permit cost"])[0][0]["source"] == "parking.md"
+
+def test_search_many_ranks_each_query_separately(tmp_path):
+    docs = tmp_path / "docs"
+    _write(docs, "library.txt", LIBRARY)
+    _write(docs, "parking.txt", PARKING)
+    _write(docs, "housing.txt", HOUSING)
+    index = _index(tmp_path)
+    index.ingest()
+    results = index.search_many(["when does the library close", "dormitory housing applications", "zzz"], top_k=2)
+    assert [r["source"] for r in results[0]][:1] == ["library.txt"]
+    assert [r["source"] for r in results[1]][:1] == ["housing.txt"]
+    assert all(a["score"] >= b["score"] for r in results[:2] for a, b in zip(r, r[1:]))
+    # Chunks that share nothing with the query are not returned
+    assert results[2] == []
+    assert _index(tmp_path / "empty").search_many(["library"]) == [[]]
@@ -0,0 +1,72 @@
+from backend.api import students as students_api
+from backend.instrumentation import TOOL_DURATION
+from backend.tools.cache import http_body_cache, student_version
+from backend.tools.student_management import update_student
+
+def _get(client, url, etag=None, **params):
+    return client.get(url, params=params, headers={"If-None-Match": etag} if etag else {})
+
+def test_listing_revalidates_until_a_write(client, students):
+    students(2)
+    first = _get(client, "/students")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+    again = _get(client, "/students", etag)
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    # Weak and list forms of the header match too
+    assert _get(client, "/students", f'"other", W/{etag}').status_code == 304
+
+    created = client.post("/students", json={"name": "New", "student_id": "N1", "email": "n1@campus.local"})
+    assert created.status_code == 200
+    after_write = _get(client, "/students", etag)
+    assert after_write.status_code == 200 and after_write.headers["etag"] != etag
+    assert [s["student_id"] for s in after_write.json()["students"]] == ["S00000", "S00001", "N1"]
+    assert _get(client, "/students", after_write.headers["etag"]).status_code == 304
+
+def test_one_etag_covers_every_student_read(client, students):
+    students(1)
+    etag = _get(client, "/students/S00000").headers["etag"]
+    for url in ("/students", "/analytics/total-students", "/analytics/students-by-department"):
+        assert _get(client, url, etag).status_code == 304
+    client.put("/students/S00000", json={"department": "Math"})
+    student = _get(client, "/students/S00000", etag)
+    assert student.status_code == 200 and student.json()["student"]["department"] == "Math"
+    totals = _get(client, "/analytics/students-by-department", etag)
+    assert totals.json() == {"students_by_department": {"Math": 1}}
+
+def test_query_variants_are_cached_separately(client, students):
+    students(3)
+    page = _get(client, "/students", limit=1).json()
+    rest = _get(client, "/students", limit=2, after=page["next_after"]).json()
+    assert [s["student_id"] for s in page["students"]] == ["S00000"]
+    assert [s["student_id"] for s in rest["students"]] == ["S00001", "S00002"]
+
+def _json_listing_calls():
+    return {labels[1]: value["count"] for labels, value in TOOL_DURATION.snapshot().items()
+            if labels[0] == "list_students_json"}
+
+def test_json_listing_is_timed_like_a_tool(client, students, monkeypatch):
+    students(1)
+    before = _json_listing_calls()
+    assert _get(client, "/students").status_code == 200
+    assert _json_listing_calls().get("success", 0) == before.get("success", 0) + 1
+
+    monkeypatch.setattr(students_api, "list_students_json", lambda **kwargs: {"error": "database is locked"})
+    failed = _get(client, "/students", limit=3)
+    assert failed.status_code == 500 and failed.json()["detail"] == "database is locked"
+    assert _json_listing_calls().get("error", 0) == before.get("error", 0) + 1
+
+def test_writes_bump_the_version_and_refuse_stale_bodies(students):
+    students(1)
+    etag, _ = student_version.current()
+    generation = http_body_cache.generation()
+    update_student("S00000", department="Math")
+    changed, _ = student_version.current()
+    assert changed != etag
+    # A body encoded from data read before the write is never cached
+    http_body_cache.put("stale", b"{}", generation)
+    assert http_body_cache.get("stale") is None
+    # Failed writes leave the version alone
+    assert "error" in update_student("NOPE", department="Math")
+    assert student_version.current()[0] == changed
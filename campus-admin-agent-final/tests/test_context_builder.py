@@ -0,0 +1,41 @@
+import random
+from backend.agent.context import ContextBuilder, estimate_tokens
+
+def _turn(i, rng):
+    role = "user" if i % 2 == 0 else "assistant"
+    return {"role": role, "content": " ".join(f"w{i}x{j}" for j in range(rng.randint(1, 60)))}
+
+def test_incremental_builds_match_a_fresh_build():
+    rng = random.Random(7)
+    builder = ContextBuilder(token_budget=300, max_message_tokens=80)
+    turns = []
+    for i in range(60):
+        turns.append(_turn(i, rng))
+        # A sliding window like the one memory returns, and a budget that moves with the message length
+        history = turns[-20:]
+        message = "q" * rng.randint(1, 200)
+        built = builder.build("s", history, message)
+        assert built == ContextBuilder(300, 80).build("s", history, message)
+        remaining = 300 - builder.system_tokens - estimate_tokens(message) - 4
+        _, used = builder._history_messages("s", history, remaining)
+        assert used <= remaining
+
+def test_only_new_turns_are_compacted(monkeypatch):
+    builder = ContextBuilder(token_budget=10000, max_message_tokens=400)
+    history = [{"role": "user", "content": f"message {i}"} for i in range(20)]
+    builder.build("s", history, "hi")
+    seen = []
+    compacted = builder.compacted
+    monkeypatch.setattr(builder, "compacted", lambda content: (seen.append(content), compacted(content))[1])
+    history = history[2:] + [{"role": "assistant", "content": "reply"}, {"role": "user", "content": "next"}]
+    built = builder.build("s", history, "hi")
+    assert seen == ["next", "reply"]
+    assert [m["content"] for m in built[1:-1]] == [m["content"] for m in history]
+
+def test_budget_change_is_not_served_from_the_cache():
+    builder = ContextBuilder(token_budget=10000, max_message_tokens=400)
+    history = [{"role": "user", "content": "word " * 30} for _ in range(10)]
+    roomy, _ = builder._history_messages("s", history, 1000)
+    tight, used = builder._history_messages("s", history, 80)
+    assert len(roomy) == 10 and used <= 80
+    assert tight[0]["content"] == f"({10 - (len(tight) - 1)} earlier messages omitted to fit the context window)"
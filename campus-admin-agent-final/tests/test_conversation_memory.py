@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+from backend import main
+from backend.agent import memory
+from backend.agent.memory import ConversationStore
+from backend.models.database import ConversationMemory, SessionLocal
+
+def _stored():
+    db = SessionLocal()
+    try:
+        return [m for (m,) in db.query(ConversationMemory.message).order_by(ConversationMemory.id)]
+    finally:
+        db.close()
+
+class FailingSession:
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_failed_flushes_keep_only_the_newest_turns(monkeypatch):
+    store = ConversationStore(max_pending=3, flush_interval=60)
+    for i in range(2):
+        store.save("s", "user", f"m{i}")
+    monkeypatch.setattr(memory, "SessionLocal", FailingSession)
+    assert store.flush() == 0
+    for i in range(2, 5):
+        store.save("s", "user", f"m{i}")
+    assert store.flush() == 0
+    assert store.metrics()["pending_writes"] == 3 and store.dropped == 2
+    monkeypatch.undo()
+    assert store.flush() == 3
+    store.close()
+    assert _stored() == ["m2", "m3", "m4"]
+    # The session's cached history still has every turn
+    assert [t["content"] for t in store.load("s")] == ["m4", "m3", "m2", "m1", "m0"]
+
+def test_old_turns_are_pruned_periodically(monkeypatch):
+    db = SessionLocal()
+    db.add_all([
+        ConversationMemory(session_id="s", role="user", message="old",
+                           created_at=datetime.utcnow() - timedelta(days=100)),
+        ConversationMemory(session_id="s", role="user", message="new", created_at=datetime.utcnow()),
+    ])
+    db.commit()
+    db.close()
+
+    async def run():
+        task = asyncio.create_task(main.prune_memory_periodically(0.01))
+        for _ in range(200):
+            if _stored() == ["new"]:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+    asyncio.run(run())
+    assert _stored() == ["new"]
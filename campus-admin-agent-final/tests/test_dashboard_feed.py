@@ -0,0 +1,75 @@
+import asyncio
+import json
+from backend.tools.analytics_feed import DashboardBroadcaster, _diff
+from backend.tools.student_management import add_student, update_student
+
+def _state(total, active, **departments):
+    return {"total_students": total, "active_students": active,
+            "departments": {name: {"total": t, "active": a} for name, (t, a) in departments.items()}}
+
+def test_diff_reports_only_changes():
+    old = _state(3, 3, CS=(2, 2), Math=(1, 1))
+    assert _diff(old, old) == {}
+    assert _diff(old, _state(3, 2, CS=(2, 1), Math=(1, 1))) == {"active_students": 2,
+                                                                "departments": {"CS": {"total": 2, "active": 1}}}
+    assert _diff(old, _state(3, 3, CS=(3, 3))) == {"departments": {"CS": {"total": 3, "active": 3}, "Math": None}}
+
+def _parse(event):
+    assert event.startswith("data: ")
+    return json.loads(event[len("data: "):])
+
+async def _next(events):
+    return _parse(await asyncio.wait_for(events.__anext__(), 5))
+
+def test_subscriber_gets_a_snapshot_then_one_delta_per_burst(students):
+    students(2, "CS")
+
+    async def scenario():
+        feed = DashboardBroadcaster(interval=0.05)
+        events = feed.events(heartbeat_interval=5)
+        snapshot = await _next(events)
+        await asyncio.to_thread(add_student, "Ada", "A1", "ada@campus.local", "Math")
+        await asyncio.to_thread(update_student, "S00000", active=False)
+        delta = await _next(events)
+        await events.aclose()
+        await feed.close()
+        return snapshot, delta, feed.metrics()
+
+    snapshot, delta, metrics = asyncio.run(scenario())
+    assert snapshot == {"type": "snapshot", "seq": 0, **_state(2, 2, CS=(2, 2))}
+    assert delta == {"type": "delta", "seq": 1, "total_students": 3,
+                     "departments": {"CS": {"total": 2, "active": 1}, "Math": {"total": 1, "active": 1}}}
+    assert metrics["published"] == 1 and metrics["subscribers"] == 0
+
+def test_slow_subscriber_is_resynced_with_a_snapshot(students):
+    students(1, "CS")
+
+    async def scenario():
+        feed = DashboardBroadcaster(interval=60, queue_size=2)
+        events = feed.events(heartbeat_interval=5)
+        await _next(events)
+        # More deltas than the subscriber's queue holds arrive before it reads any
+        for total in range(2, 6):
+            feed._publish(_state(total, total, CS=(total, total)))
+        resync = await _next(events)
+        feed._publish(_state(9, 9, CS=(9, 9)))
+        after = await _next(events)
+        await feed.close()
+        return resync, after, feed.resyncs
+
+    resync, after, resyncs = asyncio.run(scenario())
+    assert resync == {"type": "snapshot", "seq": 4, **_state(5, 5, CS=(5, 5))}
+    assert after["type"] == "delta" and after["seq"] == 5 and resyncs == 1
+
+def test_close_ends_every_stream(students):
+    async def scenario():
+        feed = DashboardBroadcaster(interval=60)
+        streams = [feed.events(heartbeat_interval=5) for _ in range(3)]
+        for events in streams:
+            await _next(events)
+        await feed.close()
+        return [[chunk async for chunk in events] for events in streams], feed.metrics()
+
+    remaining, metrics = asyncio.run(scenario())
+    assert remaining == [[], [], []]
+    assert metrics["running"] is False and metrics["max_subscribers"] == 3
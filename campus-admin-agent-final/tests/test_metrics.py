@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import re
+import time
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from backend.api.metrics import publish_worker_metrics, render_worker_metrics
+from backend.instrumentation import (
+    REQUEST_DB_QUERIES, REQUEST_DURATION, SLOW_REQUESTS, MetricsMiddleware, registry,
+)
+from backend.shared_state import shared_key, shared_state
+from backend.tools.executor import tool_executor
+from backend.tools.student_management import get_student
+
+async def _lookups(request):
+    # Each lookup runs on an executor thread, not the thread serving the request
+    for _ in range(int(request.path_params["count"])):
+        await tool_executor.run(get_student, "S00000")
+    return PlainTextResponse("ok")
+
+async def _slow(request):
+    await asyncio.sleep(0.02)
+    return PlainTextResponse("ok")
+
+async def _stream(request):
+    async def events():
+        await asyncio.sleep(0.02)
+        yield "data: {}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def _get(*paths):
+    app = MetricsMiddleware(Starlette(routes=[
+        Route("/lookups/{count}", _lookups), Route("/slow", _slow), Route("/stream", _stream),
+    ]), slow_request_ms=10)
+
+    async def requests():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [(await client.get(path)).status_code for path in paths]
+
+    return asyncio.run(requests())
+
+def _count(histogram, *labels):
+    return histogram.snapshot().get(labels, {"count": 0, "sum": 0})
+
+def test_requests_are_labelled_by_route_template_and_count_executor_queries(students):
+    students(1)
+    before = _count(REQUEST_DB_QUERIES, "/lookups/{count}")
+    assert _get("/lookups/3", "/lookups/2") == [200, 200]
+    after = _count(REQUEST_DB_QUERIES, "/lookups/{count}")
+    assert after["count"] == before["count"] + 2 and after["sum"] == before["sum"] + 5
+    assert not any(labels[1].startswith("/lookups/") and labels[1] != "/lookups/{count}"
+                   for labels in REQUEST_DURATION.snapshot())
+
+def test_app_routes_use_their_templates(client, students):
+    students(1)
+    before = _count(REQUEST_DURATION, "GET", "/students/{student_id}", 200)["count"]
+    assert client.get("/students/S00000").status_code == 200
+    assert _count(REQUEST_DURATION, "GET", "/students/{student_id}", 200)["count"] == before + 1
+
+def test_event_streams_are_never_logged_as_slow():
+    slow = SLOW_REQUESTS._values.get(("/slow",), 0)
+    stream = SLOW_REQUESTS._values.get(("/stream",), 0)
+    assert _get("/slow", "/stream") == [200, 200]
+    assert SLOW_REQUESTS._values.get(("/slow",), 0) == slow + 1
+    assert SLOW_REQUESTS._values.get(("/stream",), 0) == stream
+    # Still timed like any other request
+    assert _count(REQUEST_DURATION, "GET", "/stream", 200)["count"] >= 1
+
+_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_SAMPLE = re.compile(rf'({_NAME})(\{{{_NAME}="(?:[^"\\]|\\.)*"(?:,{_NAME}="(?:[^"\\]|\\.)*")*\}})? (\S+)$')
+
+def test_render_is_valid_prometheus_text(client, students):
+    students(1)
+    client.get("/students/S00000")
+    text = registry.render()
+    assert text.endswith("\n")
+    types = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram") and name not in types
+            types[name] = kind
+            continue
+        match = _SAMPLE.match(line)
+        assert match, line
+        name = match.group(1)
+        base = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+        assert base in types, line
+        float(match.group(3))
+
+    # Buckets are cumulative and end with +Inf, which equals the count
+    buckets = [line for line in text.splitlines()
+               if line.startswith('campus_http_request_duration_seconds_bucket{method="GET",'
+                                  'route="/students/{student_id}",status="200"')]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and 'le="+Inf"' in buckets[-1]
+    total = next(line for line in text.splitlines() if line.startswith(
+        'campus_http_request_duration_seconds_count{method="GET",route="/students/{student_id}",status="200"}'))
+    assert int(total.rsplit(" ", 1)[1]) == counts[-1]
+
+def test_profiler_can_be_toggled_over_http(client):
+    started = client.post("/metrics/profiler", json={"enabled": True, "interval": 0.001})
+    assert started.status_code == 200 and started.json()["running"] is True
+    time.sleep(0.05)
+    stopped = client.post("/metrics/profiler", json={"enabled": False})
+    assert stopped.json()["running"] is False and stopped.json()["samples"] > 0
+    assert client.get("/metrics/profiler").text.strip()
+    assert client.post("/metrics/profiler", json={"enabled": True, "interval": 0}).status_code == 422
+
+def _publish_as(pid, at, text):
+    shared_state.hset(shared_key("metrics:workers"), str(pid), json.dumps({"at": at, "text": text}))
+
+def test_workers_metrics_are_merged_with_their_pid(client, students):
+    students(1)
+    client.get("/students/S00000")
+    publish_worker_metrics()
+    _publish_as(1, time.time(), registry.render({"worker_pid": 1}))
+    _publish_as(2, time.time() - 60, registry.render({"worker_pid": 2}))
+    text = render_worker_metrics(interval=10)
+    samples = [line for line in text.splitlines() if not line.startswith("#")]
+    pids = {re.search(r'worker_pid="(\d+)"', line).group(1) for line in samples}
+    assert pids == {"1", str(os.getpid())}
+    # One header per metric even though two workers reported it
+    assert text.count("# TYPE campus_http_request_duration_seconds histogram") == 1
+    assert f'route="/students/{{student_id}}",status="200",worker_pid="1",le="+Inf"' in text
+    # The worker that stopped publishing is forgotten
+    assert set(shared_state.hgetall(shared_key("metrics:workers"))) == {"1", str(os.getpid())}
+
+def test_profiler_responses_name_their_worker(client):
+    assert client.post("/metrics/profiler", json={"enabled": False}).json()["pid"] == os.getpid()
+    assert client.get("/metrics/profiler").headers["x-worker-pid"] == str(os.getpid())
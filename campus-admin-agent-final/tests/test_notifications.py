@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from backend.models.database import NotificationOutbox, SessionLocal
+from backend.shared_state import InMemoryRedis
+from backend.tools import notifications
+from backend.tools.notifications import (
+    NotificationDispatcher, RateLimiter, announce_to_department, enqueue_notification,
+)
+from backend.tools.student_management import add_student, bulk_update_students, update_student
+
+def _outbox():
+    db = SessionLocal()
+    try:
+        return {row.idempotency_key: row for row in db.query(NotificationOutbox).all()}
+    finally:
+        db.close()
+
+class RecordingTransport:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+
+    def send_batch(self, messages):
+        self.sent.extend(m["idempotency_key"] for m in messages)
+        return {m["id"]: "refused" for m in messages if m["recipient"] in self.fail}
+
+def _dispatcher(**options):
+    dispatcher = NotificationDispatcher(workers=options.pop("workers", 1), retry_base_delay=0, **options)
+    dispatcher._transport = RecordingTransport()
+    return dispatcher
+
+def test_welcome_key_is_derived_from_the_student():
+    assert add_student("Ada", "W1", "ada@campus.local", "CS")["success"]
+    db = SessionLocal()
+    # Re-enqueueing the same event is ignored by the outbox
+    enqueue_notification(db, "welcome:W1", "ada@campus.local", "Welcome to campus", "again", student_id="W1")
+    db.commit()
+    db.close()
+    outbox = _outbox()
+    assert list(outbox) == ["welcome:W1"]
+    assert outbox["welcome:W1"].body.startswith("Hi Ada, welcome!")
+
+def test_department_change_keys_count_moves_per_student(students):
+    students(2, "CS")
+    update_student("S00000", department="Math")
+    update_student("S00000", department="CS")
+    bulk_update_students(student_ids=["S00000", "S00001"], set_department="Physics")
+    keys = sorted(k for k in _outbox() if k.startswith("department-change:"))
+    assert keys == [
+        "department-change:S00000:0", "department-change:S00000:1", "department-change:S00000:2",
+        "department-change:S00001:0",
+    ]
+    assert _outbox()["department-change:S00001:0"].body == "Hi Student S1, you have moved from CS to Physics."
+
+def test_interleaved_moves_each_get_a_notice(students):
+    students(1, "CS")
+    interleaved = []
+
+    def move_concurrently(session, flush_context, instances):
+        # The first move has read the student but not written yet when the second one runs start to finish
+        if not interleaved:
+            interleaved.append(True)
+            other = threading.Thread(target=update_student, args=("S00000",), kwargs={"department": "Physics"})
+            other.start()
+            other.join()
+
+    event.listen(SessionLocal, "before_flush", move_concurrently)
+    try:
+        assert update_student("S00000", department="Math")["success"]
+    finally:
+        event.remove(SessionLocal, "before_flush", move_concurrently)
+    notices = {k: row.body for k, row in _outbox().items() if k.startswith("department-change:")}
+    assert notices == {
+        "department-change:S00000:0": "Hi Student S0, you have moved from CS to Physics.",
+        "department-change:S00000:1": "Hi Student S0, you have moved from CS to Math.",
+    }
+
+def test_announcement_without_key_is_not_queued_twice(students):
+    students(3, "CS")
+    first = announce_to_department("CS", "Exams", "Hi {name}")
+    second = announce_to_department("CS", "Exams", "Hi {name}")
+    assert first["queued"] == 3 and second["queued"] == 0
+    assert first["idempotency_key"] == second["idempotency_key"]
+    assert announce_to_department("CS", "Exams", "Hi {name}", idempotency_key="resend")["queued"] == 3
+
+def test_dispatch_sends_retries_and_gives_up(students):
+    students(2, "CS")
+    dispatcher = _dispatcher(max_attempts=2)
+    dispatcher._transport.fail = {"s1@campus.local"}
+    announce_to_department("CS", "Exams", "Hi {name}", idempotency_key="exams")
+
+    assert dispatcher.dispatch_once() == 2
+    outbox = _outbox()
+    assert outbox["announcement:exams:S00000"].status == "sent"
+    assert outbox["announcement:exams:S00001"].status == "pending"
+    assert outbox["announcement:exams:S00001"].attempts == 1
+
+    assert dispatcher.dispatch_once() == 1
+    assert _outbox()["announcement:exams:S00001"].status == "failed"
+    assert (dispatcher.sent, dispatcher.retried, dispatcher.failed) == (1, 1, 1)
+
+def test_workers_requeue_claims_abandoned_after_start():
+    dispatcher = _dispatcher(poll_interval=0.02, claim_timeout=0.2)
+    dispatcher.start()
+    try:
+        # A worker in another process claimed this row and died; the claim is younger than the timeout
+        db = SessionLocal()
+        db.add(NotificationOutbox(idempotency_key="orphan", recipient="x@campus.local", subject="s", body="b",
+                                  status="sending", claimed_by="dead", claimed_at=datetime.utcnow(),
+                                  next_attempt_at=datetime.utcnow()))
+        db.commit()
+        db.close()
+        deadline = time.monotonic() + 5
+        while _outbox()["orphan"].status != "sent" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        dispatcher.stop()
+    assert _outbox()["orphan"].status == "sent"
+    assert dispatcher.recovered == 1
+
+def test_recover_stale_leaves_recent_claims():
+    db = SessionLocal()
+    now = datetime.utcnow()
+    for key, claimed_at in (("old", now - timedelta(minutes=10)), ("new", now)):
+        db.add(NotificationOutbox(idempotency_key=key, recipient="x", status="sending", claimed_by="w",
+                                  claimed_at=claimed_at, next_attempt_at=now))
+    db.commit()
+    db.close()
+    assert _dispatcher(claim_timeout=300).recover_stale() == 1
+    outbox = _outbox()
+    assert (outbox["old"].status, outbox["new"].status) == ("pending", "sending")
+
+def test_rate_limiter_sleeps_off_the_deficit(monkeypatch):
+    slept = []
+    monkeypatch.setattr(notifications.time, "sleep", slept.append)
+    limiter = RateLimiter(rate=10, burst=2)
+    limiter.acquire(2)
+    assert slept == []
+    limiter.acquire(5)
+    assert abs(slept[0] - 0.5) < 0.05
+
+def test_shared_rate_limiter_is_one_bucket(monkeypatch):
+    slept = []
+    monkeypatch.setattr(notifications.time, "sleep", slept.append)
+    store = InMemoryRedis()
+    first, second = RateLimiter(10, burst=1, store=store), RateLimiter(10, burst=1, store=store)
+    first.acquire(1)
+    second.acquire(1)
+    second.acquire(1)
+    # The second limiter pays for the first one's reservation as well as its own
+    assert slept and abs(slept[-1] - 0.2) < 0.05
+    assert RateLimiter(0).acquire(1000) is None
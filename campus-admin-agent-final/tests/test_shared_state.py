@@ -0,0 +1,120 @@
+import multiprocessing
+import time
+import pytest
+from backend.models.database import SessionLocal, Student
+from backend.shared_state import InMemoryRedis, SQLiteSharedState, create_shared_state, is_cross_process
+from backend.tools.cache import DataVersion, TTLCache
+from backend.tools.counters import StudentCounters
+from backend.tools.student_search import StudentSearchIndex
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryRedis()
+    return SQLiteSharedState(str(tmp_path / "shared.db"))
+
+def test_strings_and_expiry(store):
+    assert store.get("k") is None
+    assert store.set("k", 1) and store.get("k") == "1"
+    assert store.set("k", 2, nx=True) is None and store.get("k") == "1"
+    assert store.incr("n") == 1 and store.incr("n", 5) == 6
+    assert store.incrbyfloat("f", 0.5) == 0.5
+    store.set("short", "x", ex=0.05)
+    time.sleep(0.1)
+    assert store.get("short") is None
+    assert store.expire("missing", 10) is False
+    assert store.delete("k", "n", "nothing") == 2
+
+def test_hashes(store):
+    assert store.hset("h", mapping={"a": 1, "b": 2}) == 2
+    assert store.hset("h", "a", 3) == 0
+    assert store.hsetnx("h", "a", 9) is False and store.hsetnx("h", "c", 4) is True
+    assert store.hincrby("h", "b", 10) == 12
+    assert store.hgetall("h") == {"a": "3", "b": "12", "c": "4"}
+    assert store.hdel("h", "a", "zz") == 1 and store.hget("h", "a") is None
+    store.hdel("h", "b", "c")
+    assert store.hgetall("h") == {}
+
+def test_lists_follow_redis_ranges(store):
+    assert store.rpush("l", *"abcde") == 5
+    assert store.lrange("l", 0, -1) == list("abcde")
+    assert store.lrange("l", -2, -1) == ["d", "e"]
+    store.ltrim("l", -3, -1)
+    assert store.lrange("l", 0, -1) == ["c", "d", "e"]
+    with pytest.raises(TypeError):
+        store.hget("l", "x")
+
+def _increment(path, times):
+    store = SQLiteSharedState(path)
+    for _ in range(times):
+        store.incr("count")
+        store.hincrby("hash", "count")
+
+def test_sqlite_commands_are_atomic_across_processes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_increment, args=(path, 200)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    store = SQLiteSharedState(path)
+    assert store.get("count") == "800" and store.hget("hash", "count") == "800"
+
+def test_store_urls(tmp_path):
+    assert isinstance(create_shared_state("memory://"), InMemoryRedis)
+    assert is_cross_process(create_shared_state(f"sqlite:///{tmp_path}/s.db"))
+    with pytest.raises(ValueError):
+        create_shared_state("ftp://nowhere")
+
+def test_version_syncs_other_workers_caches(tmp_path):
+    path = str(tmp_path / "shared.db")
+    mine, theirs = DataVersion("students", SQLiteSharedState(path)), DataVersion("students", SQLiteSharedState(path))
+    cache = TTLCache(10, 60, mine)
+    hooks = []
+    mine.add_sync_hook(lambda: (hooks.append(1), cache.invalidate()))
+    assert mine.current()[0] == theirs.current()[0]
+    cache.put("key", "value")
+    theirs.bump()
+    assert cache.get("key") is None
+    assert hooks == [1] and mine.external_changes == 1
+    assert mine.current()[0] == theirs.current()[0]
+    # This worker's own writes are not "external"
+    mine.bump()
+    mine.sync()
+    assert mine.external_changes == 1
+
+def test_counters_are_built_once(students):
+    students(3)
+    store = InMemoryRedis()
+    first, restarted = StudentCounters(store), StudentCounters(store)
+    assert first.ensure_built() is True
+    first.student_added("CS")
+    # A restarting worker keeps the live counts instead of rebuilding over other workers' increments
+    assert restarted.ensure_built() is False
+    assert restarted.total() == 4
+    fresh = StudentCounters(InMemoryRedis())
+    fresh._store.set(fresh._key + ":rebuilding", 1, nx=True)
+    assert fresh.ensure_built() is False and fresh.total() is None
+
+def _search_ids(index, query):
+    return [r["student_id"] for r in index.search(query, 10)]
+
+def test_trigram_index_resyncs_after_other_workers_writes(students):
+    students(2)
+    index = StudentSearchIndex("trigram")
+    index.setup()
+    db = SessionLocal()
+    db.add(Student(name="Grace Hopper", student_id="G1", email="grace@campus.local", department="CS"))
+    db.commit()
+    db.close()
+    assert _search_ids(index, "hopper") == []
+    index.external_change()
+    # Stale until the rebuild lands: searches go to the database instead
+    assert _search_ids(index, "Hopper") == ["G1"]
+    deadline = time.monotonic() + 5
+    while index._stale and time.monotonic() < deadline:
+        time.sleep(0.01)
+    fallbacks = index.fallback_searches
+    assert _search_ids(index, "hoper") == ["G1"]
+    assert index.fallback_searches == fallbacks and index.resyncs == 1
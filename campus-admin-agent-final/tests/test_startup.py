@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import pytest
+from backend import main
+from backend.startup import StartupState
+
+@pytest.fixture
+def state(monkeypatch):
+    state = StartupState()
+    monkeypatch.setattr(main, "startup_state", state)
+    return state
+
+def _health(client):
+    return client.get("/health/live").status_code, client.get("/health/ready")
+
+def test_not_ready_while_a_required_phase_runs(client, state):
+    release = threading.Event()
+
+    async def run():
+        state.begin_startup()
+        await state.run_phase("schema", lambda: None)
+        warm_up = state.run_in_background("warm_up", release.wait)
+        index = state.run_in_background("index", lambda: None, required=False)
+        state.startup_complete()
+        await index
+        during = _health(client)
+        release.set()
+        await warm_up
+        return during, _health(client)
+
+    (live, ready), (live_after, ready_after) = asyncio.run(run())
+    assert live == 200 and ready.status_code == 503 and ready.json()["status"] == "starting"
+    assert ready.json()["phases"]["warm_up"]["status"] == "running"
+    assert live_after == 200 and ready_after.status_code == 200 and ready_after.json()["ready"]
+
+def test_optional_phases_never_hold_readiness_back(client, state):
+    def fail():
+        raise RuntimeError("index unavailable")
+
+    async def run():
+        state.begin_startup()
+        await state.run_phase("schema", lambda: None)
+        await state.run_phase("index", fail, required=False)
+        await state.run_phase("rollups", lambda: {"error": "locked"}, required=False)
+        state.startup_complete()
+
+    asyncio.run(run())
+    live, ready = _health(client)
+    assert live == 200 and ready.status_code == 200
+    index = ready.json()["phases"]["index"]
+    assert (index["status"], index["required"], index["error"]) == ("failed", False, "index unavailable")
+
+def test_a_failed_required_phase_keeps_the_process_unready(client, state):
+    def fail():
+        raise RuntimeError("boom")
+
+    async def run():
+        state.begin_startup()
+        await state.run_phase("schema", lambda: None)
+        warm_up = state.run_in_background("warm_up", lambda: {"error": "database is locked"})
+        state.startup_complete()
+        await warm_up
+        with pytest.raises(RuntimeError):
+            await state.run_phase("counters", fail)
+
+    asyncio.run(run())
+    live, ready = _health(client)
+    assert live == 200 and ready.status_code == 503
+    phases = ready.json()["phases"]
+    assert phases["warm_up"]["status"] == "failed" and phases["warm_up"]["error"] == "database is locked"
+    assert phases["counters"]["status"] == "failed" and phases["counters"]["error"] == "boom"
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from backend.agent.streaming import END_OF_STREAM, iterate_in_executor, sse_stream
+
+async def _chunks(*items, delay=0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+def _collect(chunks, **options):
+    async def run():
+        return [event async for event in sse_stream(chunks, **options)]
+    return asyncio.run(run())
+
+def _payloads(events):
+    return [json.loads(event[len("data: "):]) for event in events if event.startswith("data: ")]
+
+def test_small_chunks_are_coalesced():
+    events = _collect(_chunks("a", "b", "c", END_OF_STREAM), flush_interval=5, max_batch_chars=100)
+    assert _payloads(events) == [{"content": "abc", "complete": False}, {"content": "", "complete": True}]
+
+def test_batches_are_cut_at_max_batch_chars():
+    events = _collect(_chunks("ab", "cd", "e", END_OF_STREAM), flush_interval=5, max_batch_chars=3)
+    assert [p["content"] for p in _payloads(events)] == ["abcd", "e", ""]
+
+def test_buffer_is_flushed_after_flush_interval():
+    events = _collect(_chunks("a", "b", END_OF_STREAM, delay=0.1), flush_interval=0.01, max_batch_chars=100)
+    assert [p["content"] for p in _payloads(events)] == ["a", "b", ""]
+
+def test_heartbeats_while_the_agent_is_silent():
+    events = _collect(_chunks("late", END_OF_STREAM, delay=0.2), heartbeat_interval=0.05, flush_interval=0)
+    assert events[0] == ": heartbeat\n\n" and events.count(": heartbeat\n\n") >= 2
+    assert [p["content"] for p in _payloads(events)] == ["late", ""]
+
+def test_producer_errors_become_an_error_event():
+    async def failing():
+        yield "partial"
+        raise RuntimeError("LLM went away")
+
+    events = _collect(failing(), flush_interval=5)
+    assert _payloads(events) == [{"content": "partial", "complete": False}, {"error": "LLM went away"}]
+
+def test_disconnect_ends_the_stream_and_cancels_the_producer():
+    closed = asyncio.Event()
+
+    async def silent():
+        try:
+            await asyncio.sleep(60)
+            yield "never"
+        finally:
+            closed.set()
+
+    async def run():
+        checks = []
+
+        async def is_disconnected():
+            checks.append(True)
+            return len(checks) > 1
+
+        events = [event async for event in sse_stream(silent(), is_disconnected, heartbeat_interval=0.02)]
+        return events, closed.is_set()
+
+    events, producer_closed = asyncio.run(asyncio.wait_for(run(), 5))
+    assert events == [": heartbeat\n\n"] and producer_closed
+
+def test_closing_an_executor_iteration_closes_the_iterator():
+    closed = []
+
+    def rows():
+        try:
+            yield from range(1000)
+        finally:
+            closed.append(True)
+
+    async def run():
+        batches = iterate_in_executor(rows(), batch_size=10)
+        first = await batches.__anext__()
+        await batches.aclose()
+        return first
+
+    assert asyncio.run(run()) == list(range(10)) and closed == [True]
@@ -0,0 +1,59 @@
+from backend.shared_state import shared_key, shared_state
+from backend.tools.counters import counters
+from backend.tools.student_management import (
+    add_student, bulk_delete_students, bulk_update_students, delete_student, get_department_activity_breakdown,
+    get_students_by_department, get_total_students, import_students, update_student,
+)
+
+def _sql_counts():
+    # What a rebuild from the students table would store
+    return counters._load()
+
+def test_writes_keep_counters_equal_to_the_table(students):
+    students(3, "CS", prefix="C")
+    add_student("Ada", "A1", "ada@campus.local", "Math")
+    update_student("C00000", department="Math")
+    update_student("C00001", active=False)
+    delete_student("C00002")
+    import_students([{"name": "B", "student_id": "B1", "email": "b@x", "department": "Physics"},
+                     {"name": "C", "student_id": "C00001", "email": "dup@x"}])
+    bulk_update_students(department="Math", set_active=False)
+    bulk_delete_students(department="Physics")
+    assert counters._read() == _sql_counts()
+    assert get_department_activity_breakdown() == {
+        "CS": {"active": 0, "inactive": 1, "total": 1},
+        "Math": {"active": 0, "inactive": 2, "total": 2},
+    }
+
+def test_reads_are_served_from_counters(students, monkeypatch):
+    students(2, "CS")
+
+    def load():
+        raise AssertionError("counted from the database")
+
+    monkeypatch.setattr(counters, "_load", load)
+    hits = counters.hits
+    assert get_total_students() == 2 and get_students_by_department() == {"CS": 2}
+    assert counters.hits == hits + 2
+
+def test_emptied_department_disappears(students):
+    students(1, "CS")
+    update_student("S00000", department="Math")
+    assert get_students_by_department() == {"Math": 1}
+    assert counters._read()[2] == {"Math": 1}
+
+def test_invalidated_counters_fall_back_to_sql(students):
+    students(2, "CS")
+    counters.invalidate()
+    misses = counters.misses
+    assert get_total_students() == 2 and counters.misses == misses + 1
+    assert counters.metrics()["ready"] is False
+    assert counters.ensure_built() is True and counters.total() == 2
+
+def test_reconcile_repairs_drift(students):
+    students(3, "CS")
+    assert counters.reconcile() is False
+    shared_state.hincrby(shared_key("counters:students"), "total", 5)
+    assert counters.total() == 8
+    assert counters.reconcile() is True
+    assert counters.total() == 3 and counters.drift_corrections == 1
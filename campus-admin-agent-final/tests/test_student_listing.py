@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pytest
+from backend.agent.core import CampusAdminAgent
+from backend.agent.streaming import END_OF_STREAM
+from backend.tools.student_management import DEFAULT_PAGE_SIZE, iter_students, list_students, resolve_fields
+
+def test_keyset_pages_cover_every_student_once(students):
+    ids = students(25)
+    seen, after, pages = [], None, 0
+    while True:
+        page = list_students(limit=10, after=after)
+        seen.extend(s["student_id"] for s in page["students"])
+        pages += 1
+        after = page["next_after"]
+        if after is None:
+            break
+    assert seen == ids and pages == 3
+
+def test_listing_filters_and_projects_columns(students):
+    students(3, "CS", prefix="C")
+    students(2, "Math", prefix="M")
+    page = list_students(department="Math", fields=["email"])
+    assert page["students"] == [{"id": 4, "email": "m0@campus.local"}, {"id": 5, "email": "m1@campus.local"}]
+    assert page["next_after"] is None
+    assert "Invalid field" in list_students(fields=["password"])["error"]
+    with pytest.raises(ValueError):
+        resolve_fields(["nope"])
+
+def test_iter_students_reads_in_batches(students):
+    ids = students(12)
+    assert [s["student_id"] for s in iter_students(batch_size=5)] == ids
+    assert [s["student_id"] for s in iter_students(after=10, batch_size=5)] == ids[10:]
+
+def test_ndjson_listing_streams_everything(client, students):
+    ids = students(150)
+    response = client.get("/students", params={"format": "ndjson", "fields": "student_id"})
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["student_id"] for r in rows] == ids
+
+def test_json_listing_pages_with_cursor(client, students):
+    students(3)
+    first = client.get("/students", params={"limit": 2}).json()
+    assert [s["student_id"] for s in first["students"]] == ["S00000", "S00001"]
+    second = client.get("/students", params={"limit": 2, "after": first["next_after"]}).json()
+    assert [s["student_id"] for s in second["students"]] == ["S00002"] and second["next_after"] is None
+
+async def _streamed(agent, message):
+    chunks = [chunk async for chunk in agent._stream_rule_based("stream", message)]
+    assert chunks[-1] == END_OF_STREAM
+    return "".join(chunks[:-1])
+
+@pytest.mark.parametrize("count", [3, DEFAULT_PAGE_SIZE, DEFAULT_PAGE_SIZE + 5])
+def test_chat_and_stream_list_the_same_page(students, count):
+    students(count)
+    agent = CampusAdminAgent()
+    agent.llm = None
+    message = "how many students? list students by department"
+    reply = asyncio.run(agent._async_rule_based("chat", message))
+    assert asyncio.run(_streamed(agent, message)) == reply
+    assert reply.count("\n- Student") == min(count, DEFAULT_PAGE_SIZE)
+    if count > DEFAULT_PAGE_SIZE:
+        assert f"use GET /students?after={DEFAULT_PAGE_SIZE} for the rest" in reply
+    else:
+        assert "for the rest" not in reply
@@ -0,0 +1,115 @@
+import time
+import pytest
+from backend.models.database import SessionLocal, Student
+from backend.tools import student_management
+from backend.tools.student_management import add_student, delete_student, import_students, update_student
+from backend.tools.student_search import StudentSearchIndex, search_students, student_index
+
+def _ids(result):
+    return [s["student_id"] for s in result["students"]]
+
+@pytest.fixture
+def trigram_index(monkeypatch):
+    """A trigram index wired to the write tools in place of the FTS5 one."""
+    index = StudentSearchIndex(backend="trigram")
+    index.setup()
+    monkeypatch.setattr(student_management, "student_index", index)
+    return index
+
+def _found(index, query):
+    return [s["student_id"] for s in index.search(query, 10)]
+
+def test_fts_ranks_name_matches_first_and_pages(students):
+    assert student_index.backend == "fts5"
+    add_student("Grace Hopper", "G1", "grace@campus.local", "CS")
+    add_student("Alan Turing", "T1", "alan@campus.local", "Grace Hall")
+    add_student("Gracey Smith", "G2", "gs@campus.local", "Math")
+    result = search_students("grace", limit=2)
+    # Every word is a prefix; a hit in the name outranks one in the department
+    assert _ids(result) == ["G1", "G2"] and result["next_offset"] == 2
+    assert result["students"][0]["score"] >= result["students"][1]["score"]
+    rest = search_students("grace", limit=2, offset=2)
+    assert _ids(rest) == ["T1"] and rest["next_offset"] is None
+    assert _ids(search_students("hopper gra")) == ["G1"]
+    assert _ids(search_students("!!!")) == []
+
+def test_fts_follows_every_kind_of_write(students):
+    students(3, "CS")
+    update_student("S00000", name="Ada Lovelace")
+    update_student("S00002", department="Astronomy")
+    delete_student("S00001")
+    assert _ids(search_students("lovelace")) == ["S00000"]
+    assert _ids(search_students("Student S1")) == []
+    assert _ids(search_students("astronomy")) == ["S00002"]
+
+def test_trigram_index_tolerates_typos(trigram_index):
+    add_student("Ada Lovelace", "A1", "ada@campus.local", "Math")
+    add_student("Alan Turing", "T1", "alan@campus.local", "CS")
+    results = trigram_index.search("lovelase", 10)
+    assert [s["student_id"] for s in results] == ["A1"] and 0.5 <= results[0]["score"] < 1
+
+def test_trigram_index_follows_every_kind_of_write(trigram_index):
+    add_student("Ada Lovelace", "A1", "ada@campus.local", "Math")
+    assert _found(trigram_index, "lovelace") == ["A1"]
+    update_student("A1", name="Ada Byron")
+    assert _found(trigram_index, "lovelace") == [] and _found(trigram_index, "byron") == ["A1"]
+    import_students([{"name": "Grace Hopper", "student_id": "G1", "email": "grace@campus.local"},
+                     {"name": "Alan Turing", "student_id": "T1", "email": "alan@campus.local"}])
+    assert _found(trigram_index, "hopper") == ["G1"]
+    delete_student("G1")
+    delete_student("T1")
+    assert _found(trigram_index, "hopper") == [] and _found(trigram_index, "turing") == []
+    assert trigram_index.metrics()["indexed_students"] == 1
+
+def test_import_indexes_only_the_rows_it_inserted(trigram_index, monkeypatch):
+    add_student("Ada Lovelace", "A1", "ada@campus.local", "Math")
+    indexed = []
+    monkeypatch.setattr(trigram_index, "students_imported", indexed.extend)
+    result = import_students([{"name": "Grace Hopper", "student_id": "G1", "email": "grace@campus.local"},
+                              {"name": "Ada Again", "student_id": "A1", "email": "ada2@campus.local"}])
+    assert result["inserted"] == 1 and indexed == ["G1"]
+
+def test_trigram_index_resyncs_after_another_workers_write(trigram_index):
+    add_student("Ada Lovelace", "A1", "ada@campus.local", "Math")
+    # Another worker inserts a student; this process only learns that something changed
+    db = SessionLocal()
+    db.add(Student(name="Grace Hopper", student_id="G1", email="grace@campus.local", department="CS"))
+    db.commit()
+    db.close()
+    trigram_index.external_change()
+    deadline = time.monotonic() + 5
+    while trigram_index.resyncs == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert trigram_index.resyncs == 1
+    assert _found(trigram_index, "hopper") == ["G1"]
+
+def test_stale_trigram_index_falls_back_to_like(trigram_index):
+    add_student("Ada Lovelace", "A1", "ada@campus.local", "Math")
+    trigram_index._stale = True
+    fallbacks = trigram_index.fallback_searches
+    assert _found(trigram_index, "Lovelace") == ["A1"]
+    assert trigram_index.fallback_searches == fallbacks + 1
+
+def test_like_fallback_treats_wildcards_literally(students):
+    add_student("Percent", "P1", "100%_sure@campus.local", "CS")
+    add_student("Plain", "P2", "1000xsure@campus.local", "CS")
+    index = StudentSearchIndex(backend="trigram")
+    # Not set up yet, so every search is a LIKE scan
+    assert not index.ready
+    assert _found(index, "0%_s") == ["P1"]
+    assert _found(index, "%") == ["P1"]
+    assert _found(index, "_") == ["P1"]
+    assert _found(index, "plain") == ["P2"]
+    assert index.fallback_searches == 4
+
+def test_search_endpoint_pages_and_validates(client, students):
+    students(3, "CS")
+    first = client.get("/students/search", params={"q": "student", "limit": 2})
+    assert first.status_code == 200
+    body = first.json()
+    assert len(body["students"]) == 2 and body["next_offset"] == 2
+    rest = client.get("/students/search", params={"q": "student", "limit": 2, "offset": 2}).json()
+    assert len(rest["students"]) == 1 and rest["next_offset"] is None
+    assert {s["student_id"] for s in body["students"] + rest["students"]} == {"S00000", "S00001", "S00002"}
+    assert client.get("/students/search", params={"q": ""}).status_code == 422
+    assert client.get("/students/search", params={"q": "x", "limit": 0}).status_code == 422
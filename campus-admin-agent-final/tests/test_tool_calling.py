@@ -0,0 +1,52 @@
+import asyncio
+import json
+import time
+from backend.agent.core import CampusAdminAgent
+from backend.agent.tool_calling import execute_tool_calls, serialize_tool_result
+from backend.tools import TOOLS
+
+def _call(name, arguments, call_id="call_1"):
+    return {"id": call_id, "name": name, "arguments": json.dumps(arguments)}
+
+def test_destructive_tools_are_not_offered_to_the_model():
+    agent = CampusAdminAgent()
+    offered = {schema["function"]["name"] for schema in agent.tool_schemas}
+    assert {"delete_student", "bulk_update_students", "bulk_delete_students", "import_students"}.isdisjoint(offered)
+    assert {"get_student", "update_student", "list_students"} <= offered
+
+def test_calls_run_concurrently_and_keep_their_ids(students):
+    students(2, "CS")
+    messages = asyncio.run(execute_tool_calls(
+        [_call("get_student", {"student_id": "S00000"}, "a"), _call("get_total_students", {}, "b"),
+         _call("no_such_tool", {}, "c")],
+        TOOLS, timeout=5,
+    ))
+    assert [m["tool_call_id"] for m in messages] == ["a", "b", "c"]
+    assert json.loads(messages[0]["content"])["student"]["student_id"] == "S00000"
+    assert json.loads(messages[1]["content"]) == 2
+    assert "not found" in json.loads(messages[2]["content"])["error"]
+
+def test_slow_reads_time_out_but_writes_report_their_outcome(monkeypatch):
+    def slow_read():
+        """Slow read."""
+        time.sleep(0.3)
+        return 1
+
+    def slow_write(student_id: str, department: str = None):
+        """Slow write."""
+        time.sleep(0.3)
+        return {"success": True, "student_id": student_id}
+
+    monkeypatch.setitem(TOOLS, "get_total_students", slow_read)
+    monkeypatch.setitem(TOOLS, "update_student", slow_write)
+    tools = {"get_total_students": slow_read, "update_student": slow_write}
+    read, write = asyncio.run(execute_tool_calls(
+        [_call("get_total_students", {}, "r"), _call("update_student", {"student_id": "X"}, "w")],
+        tools, timeout=0.05,
+    ))
+    assert json.loads(read["content"]) == {"error": "Tool get_total_students timed out"}
+    assert json.loads(write["content"]) == {"success": True, "student_id": "X"}
+
+def test_large_results_are_truncated():
+    text = serialize_tool_result({"rows": ["x" * 50] * 10}, max_chars=40)
+    assert text.startswith('{"rows"') and "[truncated" in text
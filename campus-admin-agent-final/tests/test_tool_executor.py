@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+import pytest
+from backend.database.session import _request_db, get_session, release_session
+from backend.models.database import SessionLocal
+from backend.tools.executor import ExecutorSaturated, ToolExecutor, tool_executor
+
+_marker: ContextVar[str] = ContextVar("marker", default="unset")
+
+def test_context_reaches_worker_threads():
+    async def run():
+        _marker.set("request-1")
+        db = SessionLocal()
+        token = _request_db.set(db)
+        try:
+            marker, thread = await tool_executor.run(lambda: (_marker.get(), threading.current_thread().name))
+            # A tool run for the request shares its session instead of opening one
+            shared = await tool_executor.run(get_session)
+            await tool_executor.run(release_session, shared)
+            return marker, thread, shared is db, db.is_active
+        finally:
+            _request_db.reset(token)
+            db.close()
+
+    marker, thread, shared, still_open = asyncio.run(run())
+    assert marker == "request-1" and thread.startswith("tool") and shared and still_open
+
+def test_calls_beyond_the_queue_are_rejected():
+    executor = ToolExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        # The first call takes the only thread, the second one waits for it, the third is refused
+        running = asyncio.ensure_future(executor.run(release.wait))
+        waiting = asyncio.ensure_future(executor.run(lambda: "done"))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(ExecutorSaturated):
+                await executor.run(lambda: "refused")
+        finally:
+            release.set()
+        return await asyncio.gather(running, waiting)
+
+    assert asyncio.run(run()) == [True, "done"]
+    metrics = executor.metrics()
+    assert (metrics["rejected"], metrics["completed"], metrics["max_queue_depth"]) == (1, 2, 1)
+
+def test_saturated_executor_answers_503(client, monkeypatch):
+    monkeypatch.setattr(tool_executor, "max_queue", 0)
+    response = client.get("/students/S00000")
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+    assert "queue is full" in response.json()["detail"]